@@ -1,9 +1,29 @@
+import argparse
+import hashlib
 import os
+import sys
+import tempfile
 import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
-from src.config import BRONZE_PATH, RAW_PATH, get_ingestion_paths
+from src.config import (
+    BRONZE_PATH,
+    INGESTION_BATCH_SIZE,
+    INGESTION_LARGE_FILE_MEMORY_GB,
+    INGESTION_MAX_LARGE_PARALLEL,
+    INGESTION_WORKERS,
+    PARQUET_WRITE_OPTIONS,
+    RAW_PATH,
+    get_ingestion_paths,
+)
+from src.instrumentation import span
+from src.manifest import code_version, load_manifest, same_content, save_manifest, source_fingerprint
+from src import schemas, storage
+from src.storage import write_parquet, write_parquet_batches
 
 # Validação dos paths obrigatórios para ingestão
 get_ingestion_paths()
@@ -14,81 +34,341 @@ files_to_ingest = [
     'credit_card_balance.csv', 'installments_payments.csv'
 ]
 
+# Tabelas gigantes (dezenas de milhões de linhas): o parsing de duas delas ao mesmo
+# tempo pode estourar a memória de máquinas pequenas no modo paralelo.
+large_files = {'bureau_balance.csv', 'installments_payments.csv'}
+
+# Manifesto da camada Bronze (fingerprint das origens + schema/linhas das saídas).
+# Qualquer mudança neste arquivo, nos schemas ou no escritor Parquet (storage.py)
+# muda a versão e força a reingestão.
+MANIFEST_NAME = "_manifest.json"
+INGESTION_CODE_VERSION = code_version(__file__, schemas.__file__, storage.__file__)
+
+def ingestion_version():
+    """Versão da ingestão: código + opções de escrita da Bronze (PARQUET_BRONZE_OPTIONS)."""
+    options = hashlib.sha256(PARQUET_WRITE_OPTIONS["bronze"].encode()).hexdigest()[:8]
+    return f"{INGESTION_CODE_VERSION}-{options}"
+
 def save_atomic_parquet(df, output_path):
     """
-    Implementa Escrita Atômica:
+    Implementa Escrita Atômica (via storage.write_parquet, opções da camada Bronze):
     1. Salva em um arquivo temporário (.tmp).
     2. Se sucesso, renomeia para o final, substituindo o antigo atomicamente.
     Isso previne corrupção de arquivos em caso de falha no meio da escrita.
     """
-    temp_path = output_path + ".tmp"
-    
-    try:
-        # Escrita no arquivo temporário
-        df.to_parquet(
-            temp_path,
-            engine="pyarrow",
-            compression="snappy",
-            index=False
-        )
-        
-        # Operação Atômica: Substitui o arquivo final pelo temporário
-        if os.path.exists(output_path):
-            print(f"Substituindo arquivo existente: {os.path.basename(output_path)}")
-        
-        os.replace(temp_path, output_path)
-        
-    except Exception as e:
-        # Se der erro, limpamos o .tmp
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
-        raise e
+    if os.path.exists(output_path):
+        print(f"Substituindo arquivo existente: {os.path.basename(output_path)}")
+    write_parquet(df, output_path, "bronze")
 
-def process_file(file_name):
-    """Lógica isolada de processamento por arquivo com validações."""
-    input_path = os.path.join(RAW_PATH, file_name)
-    output_name = file_name.replace('.csv', '.parquet')
-    output_path = os.path.join(BRONZE_PATH, output_name)
+def save_atomic_parquet_stream(batches, output_path):
+    """
+    Versão em streaming da escrita atômica (storage.write_parquet_batches):
+    cada lote (DataFrame ou tabela Arrow) vira um row group anexado ao arquivo
+    temporário (.tmp), que só substitui o destino final após o último lote ser
+    gravado com sucesso.
+    O schema é fixado pelo primeiro lote; os demais são convertidos para ele.
+    Retorna o total de linhas gravadas.
+    """
+    if os.path.exists(output_path):
+        print(f"Substituindo arquivo existente: {os.path.basename(output_path)}")
+    rows, _ = write_parquet_batches(
+        batches, output_path, "bronze",
+        mismatch_hint="Registre a coluna em src/schemas.py, aumente INGESTION_BATCH_SIZE "
+                      "ou use INGESTION_BATCH_SIZE=0.",
+    )
+    return rows
+
+def normalize_columns(df):
+    """Transformação leve: nomes de colunas em minúsculas e sem espaços."""
+    df.columns = [col.lower().strip() for col in df.columns]
+    return df
+
+def iter_csv_batches(input_path, batch_size, dtype=None):
+    """Lê o CSV em lotes de `batch_size` linhas, já com colunas normalizadas."""
+    with pd.read_csv(input_path, chunksize=batch_size, dtype=dtype) as reader:
+        for chunk in reader:
+            yield normalize_columns(chunk)
+
+def csv_dtypes(input_path, file_name):
+    """
+    dtype do read_csv para as colunas categóricas do registro: lidas sempre como
+    texto, para que um lote só com dígitos (ex.: status '0'..'5') não vire número.
+    """
+    categorical = set(schemas.string_columns(file_name))
+    header = pd.read_csv(input_path, nrows=0).columns
+    return {raw: str for raw in header if raw.lower().strip() in categorical}
+
+def iter_typed_batches(input_path, file_name, batch_size):
+    """
+    Lotes do CSV como tabelas Arrow já convertidas para o schema registrado
+    (src/schemas.py). `batch_size` <= 0 lê o arquivo inteiro em um único lote.
+    """
+    dtype = csv_dtypes(input_path, file_name)
+    if batch_size > 0:
+        chunks = iter_csv_batches(input_path, batch_size, dtype)
+    else:
+        chunks = [normalize_columns(pd.read_csv(input_path, dtype=dtype))]
+
+    for chunk in chunks:
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        yield schemas.apply_schema(table, file_name)
+
+def bronze_name(file_name):
+    """Nome do Parquet na Bronze: minúsculo (POS_CASH_balance.csv -> pos_cash_balance.parquet)."""
+    return file_name.lower().replace('.csv', '.parquet')
+
+def manifest_path():
+    return os.path.join(BRONZE_PATH, MANIFEST_NAME)
+
+def is_up_to_date(fingerprint, previous, output_path):
+    """A origem não mudou, o código é o mesmo e a saída registrada ainda está lá."""
+    return (
+        same_content(fingerprint, (previous or {}).get("source"))
+        and previous.get("code_version") == ingestion_version()
+        and os.path.exists(output_path)
+        and os.path.getsize(output_path) == previous.get("output_size")
+    )
+
+def manifest_entry(fingerprint, output_path):
+    """Entrada do manifesto: fingerprint da origem + schema e linhas da saída (do footer)."""
+    metadata = pq.read_metadata(output_path)
+    return {
+        "source": fingerprint,
+        "code_version": ingestion_version(),
+        "output": os.path.basename(output_path),
+        "output_size": os.path.getsize(output_path),
+        "rows": metadata.num_rows,
+        "schema": [[field.name, str(field.type)] for field in metadata.schema.to_arrow_schema()],
+    }
+
+def process_file(file_name, batch_size=None, previous=None, force=False, raw_path=None, bronze_path=None):
+    """
+    Lógica isolada de processamento por arquivo com validações.
+    `batch_size` (padrão: INGESTION_BATCH_SIZE) define o modo de leitura:
+    > 0 lê o CSV em lotes (streaming, memória limitada); <= 0 lê o arquivo inteiro.
+    `previous` é a entrada do manifesto da última ingestão: se a origem e o código
+    não mudaram, o arquivo é pulado (a menos que `force=True`).
+    `raw_path` / `bronze_path` (padrão: RAW_PATH / BRONZE_PATH) são passados pelo
+    modo paralelo, para que o worker não dependa do estado herdado do processo pai.
+
+    Retorna um dict com o resultado (status SUCESSO/PULADO/ERRO, linhas, tempo,
+    mensagem e entrada de manifesto), para que a execução paralela possa reportar
+    em ordem determinística.
+    """
+    if batch_size is None:
+        batch_size = INGESTION_BATCH_SIZE
+
+    input_path = os.path.join(raw_path or RAW_PATH, file_name)
+    output_name = bronze_name(file_name)
+    output_path = os.path.join(bronze_path or BRONZE_PATH, output_name)
+    result = {"file": file_name, "output": output_name, "status": "PULADO",
+              "rows": 0, "elapsed": 0.0, "message": "", "manifest": previous}
     
     # --- Validação Prévia ---
     if not os.path.exists(input_path):
-        print(f"PULADO: {file_name} não encontrado na origem.")
-        return
+        result["message"] = "não encontrado na origem"
+        return result
     
     # Verifica se o arquivo não está vazio (evita criar parquets vazios)
     if os.path.getsize(input_path) == 0:
-        print(f"PULADO: {file_name} está vazio.")
-        return
+        result["message"] = "está vazio"
+        return result
 
     try:
         start_time = time.time()
+
+        # --- Ingestão Incremental ---
+        fingerprint = source_fingerprint(input_path, (previous or {}).get("source"))
+        if not force and is_up_to_date(fingerprint, previous, output_path):
+            result.update(message="sem alterações desde a última ingestão",
+                          rows=previous["rows"],
+                          manifest=dict(previous, source=fingerprint))
+            return result
+
         print(f"Variáveis: Lendo {file_name}...")
         
-        # Leitura
-        df = pd.read_csv(input_path)
+        # Leitura (em lotes ou completa) + tipagem pelo registro de schemas
+        # ---(Controlled Overwrite) --- escrita incremental no .tmp e troca atômica
+        with span(f"ingest:{file_name}", bytes_in=os.path.getsize(input_path)) as event:
+            n_rows = save_atomic_parquet_stream(
+                iter_typed_batches(input_path, file_name, batch_size), output_path
+            )
+            event.update(rows_out=n_rows, bytes=os.path.getsize(output_path))
         
-        # Transformação leve
-        df.columns = [col.lower().strip() for col in df.columns]
-        
-        # ---(Controlled Overwrite) ---
-        save_atomic_parquet(df, output_path)
-        
-        elapsed = time.time() - start_time
-        print(f"SUCESSO: {output_name} ({df.shape[0]} linhas) - {elapsed:.2f}s")
+        result.update(status="SUCESSO", rows=n_rows, elapsed=time.time() - start_time,
+                      manifest=manifest_entry(fingerprint, output_path))
         
     except Exception as e:
-        print(f"ERRO CRÍTICO em {file_name}: {str(e)}")
+        result.update(status="ERRO", message=str(e))
+
+    return result
+
+def schema_report(file_name, batch_size=None):
+    """
+    Compara, para um arquivo de origem, a representação inferida pelo pandas
+    (antes) com a tipada pelo registro (depois): bytes em memória e em disco.
+    Grava as duas versões em arquivos temporários; a camada Bronze não é alterada.
+    """
+    if batch_size is None or batch_size <= 0:
+        batch_size = INGESTION_BATCH_SIZE if INGESTION_BATCH_SIZE > 0 else 500_000
+    input_path = os.path.join(RAW_PATH, file_name)
+    dtype = csv_dtypes(input_path, file_name)
+    report = {"file": file_name, "memory_before": 0, "memory_after": 0}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {"before": os.path.join(tmp, "before.parquet"),
+                 "after": os.path.join(tmp, "after.parquet")}
+
+        def batches(typed):
+            for chunk in iter_csv_batches(input_path, batch_size, dtype if typed else None):
+                if typed:
+                    table = schemas.apply_schema(pa.Table.from_pandas(chunk, preserve_index=False), file_name)
+                    report["memory_after"] += table.nbytes
+                    yield table
+                else:
+                    report["memory_before"] += int(chunk.memory_usage(deep=True, index=False).sum())
+                    yield chunk
+
+        save_atomic_parquet_stream(batches(typed=False), paths["before"])
+        save_atomic_parquet_stream(batches(typed=True), paths["after"])
+        report["disk_before"] = os.path.getsize(paths["before"])
+        report["disk_after"] = os.path.getsize(paths["after"])
+
+    return report
+
+def format_schema_report(report):
+    mb = 1024 ** 2
+    return (
+        f"{report['file']:<28} memória {report['memory_before'] / mb:9.1f} -> {report['memory_after'] / mb:9.1f} MB"
+        f" | disco {report['disk_before'] / mb:8.1f} -> {report['disk_after'] / mb:8.1f} MB"
+    )
+
+def format_result(result):
+    """Linha de log de um resultado de process_file."""
+    if result["status"] == "SUCESSO":
+        return f"SUCESSO: {result['output']} ({result['rows']} linhas) - {result['elapsed']:.2f}s"
+    if result["status"] == "PULADO":
+        return f"PULADO: {result['file']} {result['message']}."
+    return f"ERRO CRÍTICO em {result['file']}: {result['message']}"
+
+def large_file_slots():
+    """
+    Quantas tabelas gigantes podem ser lidas ao mesmo tempo no modo paralelo.
+    Usa INGESTION_MAX_LARGE_PARALLEL se definido; senão, 1 slot a cada
+    INGESTION_LARGE_FILE_MEMORY_GB de memória física (mínimo 1).
+    """
+    if INGESTION_MAX_LARGE_PARALLEL > 0:
+        return INGESTION_MAX_LARGE_PARALLEL
+    try:
+        total_gb = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / 1024**3
+    except (AttributeError, ValueError, OSError):
+        return 1
+    return max(1, int(total_gb // INGESTION_LARGE_FILE_MEMORY_GB))
+
+def run_parallel(file_names, workers, manifest=None, force=False):
+    """
+    Executa process_file em um pool de processos, respeitando o limite de
+    tabelas gigantes simultâneas. Retorna os resultados na ordem de `file_names`.
+    Diretórios e tamanho de lote vão como argumentos: os workers funcionam igual com
+    fork, forkserver ou spawn (que reimporta o módulo sem o estado do pai).
+    """
+    manifest = manifest or {}
+    max_large = large_file_slots()
+    pending = list(file_names)
+    results = {}
+    running = {}
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while pending or running:
+            # Submete o que couber, sem ultrapassar o limite de arquivos gigantes
+            n_large = sum(1 for f in running.values() if f in large_files)
+            for file_name in list(pending):
+                if len(running) >= workers:
+                    break
+                if file_name in large_files:
+                    if n_large >= max_large:
+                        continue
+                    n_large += 1
+                pending.remove(file_name)
+                future = pool.submit(process_file, file_name, batch_size=INGESTION_BATCH_SIZE,
+                                     previous=manifest.get(file_name), force=force,
+                                     raw_path=RAW_PATH, bronze_path=BRONZE_PATH)
+                running[future] = file_name
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                file_name = running.pop(future)
+                try:
+                    results[file_name] = future.result()
+                except Exception as e:
+                    # Falha do próprio worker (ex.: processo morto por falta de memória)
+                    results[file_name] = {"file": file_name, "status": "ERRO", "rows": 0,
+                                          "elapsed": 0.0, "message": str(e),
+                                          "manifest": manifest.get(file_name)}
+
+    return [results[f] for f in file_names]
+
+def has_failures(results):
+    return any(r["status"] == "ERRO" for r in results)
 
-def run_ingestion():
+def run_ingestion(workers=None, force=False):
+    """
+    Ingere todos os arquivos de `files_to_ingest`.
+    `workers` (padrão: INGESTION_WORKERS) > 1 ativa o modo paralelo.
+    Arquivos inalterados segundo o manifesto são pulados, a menos que `force=True`.
+    Retorna a lista de resultados na ordem de `files_to_ingest`.
+    """
+    if workers is None:
+        workers = INGESTION_WORKERS
     os.makedirs(BRONZE_PATH, exist_ok=True)
     
     print(f"Iniciando Ingestão")
     print(f"Origem: {RAW_PATH}")
     print(f"Destino: {BRONZE_PATH}")
+    if workers > 1:
+        print(f"Modo paralelo: {workers} workers (máx. {large_file_slots()} tabela(s) gigante(s) simultânea(s))")
     print("-" * 40)
+
+    manifest = load_manifest(manifest_path())
     
-    for file_name in files_to_ingest:
-        process_file(file_name)
+    if workers > 1:
+        results = run_parallel(files_to_ingest, workers, manifest, force)
+        for result in results:
+            print(format_result(result))
+    else:
+        results = []
+        for file_name in files_to_ingest:
+            result = process_file(file_name, previous=manifest.get(file_name), force=force)
+            print(format_result(result))
+            results.append(result)
+
+    # Atualiza o manifesto (falhas mantêm a entrada anterior: a saída antiga segue intacta)
+    for result in results:
+        if result.get("manifest"):
+            manifest[result["file"]] = result["manifest"]
+    save_manifest(manifest, manifest_path())
+
+    counts = {status: sum(1 for r in results if r["status"] == status)
+              for status in ("SUCESSO", "PULADO", "ERRO")}
+    print("-" * 40)
+    print(f"Resumo: {counts['SUCESSO']} sucesso(s), {counts['PULADO']} pulado(s), {counts['ERRO']} erro(s)")
+    return results
 
 if __name__ == "__main__":
-    run_ingestion()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Ingestão Raw (CSV) -> Bronze (Parquet)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Processos em paralelo (padrão: INGESTION_WORKERS)")
+    parser.add_argument("--force", action="store_true",
+                        help="Reingere todos os arquivos, ignorando o manifesto")
+    parser.add_argument("--schema-report", action="store_true",
+                        help="Só compara bytes em memória/disco antes e depois da tipagem (não grava a Bronze)")
+    args = parser.parse_args()
+
+    if args.schema_report:
+        for file_name in files_to_ingest:
+            if os.path.exists(os.path.join(RAW_PATH, file_name)):
+                print(format_schema_report(schema_report(file_name)))
+        sys.exit(0)
+
+    results = run_ingestion(workers=args.workers, force=args.force)
+    sys.exit(1 if has_failures(results) else 0)
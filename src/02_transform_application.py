@@ -2,48 +2,32 @@ import os
 
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 
-from src.config import BRONZE_PATH, SILVER_PATH
+from src.config import APPLICATION_BATCH_SIZE, APPLICATION_TRANSFORM_MODE, BRONZE_PATH, SILVER_PATH
+from src.storage import iter_batches, read_parquet, write_parquet, write_parquet_batches
 
-def save_atomic_parquet(df, filepath):
-    """Garante integridade na escrita do arquivo (Idempotência)."""
-    temp_path = filepath + ".tmp"
-    try:
-        df.to_parquet(temp_path, index=False)
-        os.replace(temp_path, filepath)
-    except Exception as e:
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
-        raise e
-
-def process_application_data():
-    print("Iniciando Higienização da Tabela Application...")
-    os.makedirs(SILVER_PATH, exist_ok=True)
-
-    # 2. Carga Unificada (Train + Test)
-    # Motivo: Garantir tratamento idêntico de categorias e nulos
-    print("Lendo camada Bronze...")
-    df_train = pd.read_parquet(os.path.join(BRONZE_PATH, "application_train.parquet"))
-    df_test = pd.read_parquet(os.path.join(BRONZE_PATH, "application_test.parquet"))
-    
-    df_train['is_train'] = True
-    df_test['is_train'] = False
-    
-    # Concatena para processamento em lote
-    df = pd.concat([df_train, df_test], ignore_index=True)
-    
-    # ==============================================================================
-    # LIMPEZA E CORREÇÃO
-    # ==============================================================================
-    
-    # Integridade de Linhas
-    original_len = len(df)
-    df = df.drop_duplicates(subset=['sk_id_curr'], keep='first')
-    if len(df) < original_len:
-        print(f"Removidas {original_len - len(df)} duplicatas de SK_ID_CURR")
+def fill_category(series, fill_value='XNA'):
+    """
+    Preenche nulos com `fill_value` e devolve `category` com categorias ordenadas,
+    tanto para texto (object) quanto para colunas já categóricas vindas da Bronze.
+    """
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        return series.fillna(fill_value).astype('category')
+    if fill_value not in series.cat.categories:
+        series = series.cat.add_categories([fill_value])
+    series = series.fillna(fill_value).cat.remove_unused_categories()
+    return series.cat.reorder_categories(sorted(series.cat.categories))
 
+def derive_features(df):
+    """
+    Tratativas e features linha a linha da application (mesmo resultado por lote
+    ou na tabela inteira): anomalia de DAYS_EMPLOYED, anos, ratios, moradia e
+    fontes externas.
+    """
     # Tratamento da Anomalia Identificada
-    print(f"Tratando anomalia '365243' em DAYS_EMPLOYED...")
     anomalia_mask = df['days_employed'] == 365243
     df['days_employed_anom'] = anomalia_mask.astype(int)
     df['days_employed'] = df['days_employed'].replace(365243, np.nan)
@@ -72,6 +56,56 @@ def process_application_data():
     # Consolidação de Fontes Externas (Top Correlações Negativas)
     # Unifica o sinal de ext_source_1, 2 e 3 em uma média robusta
     df['ext_source_mean'] = df[['ext_source_1', 'ext_source_2', 'ext_source_3']].mean(axis=1)
+    return df
+
+def process_application_data(mode=None):
+    """
+    Fato application (Bronze -> Silver). `mode` (padrão: APPLICATION_TRANSFORM_MODE):
+    "two_pass" (memória limitada ao lote, ver transform_two_pass) ou "concat"
+    (train + test concatenados em memória).
+    """
+    if mode is None:
+        mode = APPLICATION_TRANSFORM_MODE
+    print("Iniciando Higienização da Tabela Application...")
+    os.makedirs(SILVER_PATH, exist_ok=True)
+    train_path = os.path.join(BRONZE_PATH, "application_train.parquet")
+    test_path = os.path.join(BRONZE_PATH, "application_test.parquet")
+    outputs = (os.path.join(SILVER_PATH, "fact_application_train.parquet"),
+               os.path.join(SILVER_PATH, "fact_application_test.parquet"))
+    if mode == "two_pass":
+        shapes = transform_two_pass(train_path, test_path, *outputs)
+    else:
+        shapes = transform_concat(train_path, test_path, *outputs)
+    print(f"Sucesso! Train: {shapes[0]} | Test: {shapes[1]}")
+    print(f"      (Features de Moradia preservadas via flag: 'flag_has_housing_info')")
+    print(f"      (Anomalia de emprego tratada e preservada em: 'days_employed_anom')")
+
+def transform_concat(train_path, test_path, train_output, test_output):
+    """Modo "concat": train + test numa única tabela em memória (pico ~3-4x a application)."""
+    # 2. Carga Unificada (Train + Test)
+    # Motivo: Garantir tratamento idêntico de categorias e nulos
+    print("Lendo camada Bronze...")
+    df_train = read_parquet(train_path)
+    df_test = read_parquet(test_path)
+    
+    df_train['is_train'] = True
+    df_test['is_train'] = False
+    
+    # Concatena para processamento em lote
+    df = pd.concat([df_train, df_test], ignore_index=True)
+    
+    # ==============================================================================
+    # LIMPEZA E CORREÇÃO
+    # ==============================================================================
+    
+    # Integridade de Linhas
+    original_len = len(df)
+    df = df.drop_duplicates(subset=['sk_id_curr'], keep='first')
+    if len(df) < original_len:
+        print(f"Removidas {original_len - len(df)} duplicatas de SK_ID_CURR")
+
+    print(f"Tratando anomalia '365243' em DAYS_EMPLOYED...")
+    df = derive_features(df)
 
     # ==============================================================================
     # OTIMIZAÇÃO E SALVAMENTO
@@ -79,12 +113,16 @@ def process_application_data():
     
     # Tratamento de Categorias
     # Preenche nulos em texto com 'XNA' (Not Available)
-    cat_cols = df.select_dtypes(include=['object', 'string']).columns
+    # (a Bronze já entrega as colunas de texto como category, ver src/schemas.py)
+    cat_cols = df.select_dtypes(include=['object', 'string', 'category']).columns
     for col in cat_cols:
-        df[col] = df[col].fillna('XNA').astype('category')
+        df[col] = fill_category(df[col])
 
     # Separação Final
     print("Salvando Camada Silver...")
+
+    # Fatos clusterizados por SK_ID_CURR (mesma ordem das dimensões; ver 03_analytical_layer)
+    df = df.sort_values('sk_id_curr', kind='stable', ignore_index=True)
     
     df_train_silver = df[df['is_train'] == True].drop(columns=['is_train'])
     
@@ -92,14 +130,152 @@ def process_application_data():
     cols_drop_test = ['is_train', 'target'] if 'target' in df.columns else ['is_train']
     df_test_silver = df[df['is_train'] == False].drop(columns=cols_drop_test, errors='ignore')
 
-    try:
-        save_atomic_parquet(df_train_silver, os.path.join(SILVER_PATH, "fact_application_train.parquet"))
-        save_atomic_parquet(df_test_silver, os.path.join(SILVER_PATH, "fact_application_test.parquet"))
-        print(f"Sucesso! Train: {df_train_silver.shape} | Test: {df_test_silver.shape}")
-        print(f"      (Features de Moradia preservadas via flag: 'flag_has_housing_info')")
-        print(f"      (Anomalia de emprego tratada e preservada em: 'days_employed_anom')")
-    except Exception as e:
-        print(f"Erro crítico ao salvar: {e}")
+    write_parquet(df_train_silver, train_output, "silver")
+    write_parquet(df_test_silver, test_output, "silver")
+    return df_train_silver.shape, df_test_silver.shape
+
+# ==============================================================================
+# MODO EM DUAS PASSADAS (memória limitada ao lote)
+# ==============================================================================
+
+def _has_nulls(path, column):
+    """Nulos na coluna, pelas estatísticas do footer (lê a coluna só se faltarem)."""
+    metadata = pq.read_metadata(path)
+    index = metadata.schema.names.index(column)
+    counts = [metadata.row_group(i).column(index).statistics for i in range(metadata.num_row_groups)]
+    if all(stats is not None and stats.has_null_count for stats in counts):
+        return sum(stats.null_count for stats in counts) > 0
+    return pq.read_table(path, columns=[column]).column(column).null_count > 0
+
+def _pandas_dtype(path, field):
+    """dtype que `to_pandas` daria à coluna na tabela inteira (inteiros com nulos viram float64)."""
+    if pa.types.is_dictionary(field.type) or pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+        return np.dtype(object)
+    if pa.types.is_integer(field.type) and _has_nulls(path, field.name):
+        return np.dtype('float64')
+    if pa.types.is_boolean(field.type) and _has_nulls(path, field.name):
+        return np.dtype(object)
+    return np.dtype(field.type.to_pandas_dtype())
+
+def concat_dtypes(paths):
+    """
+    {coluna: dtype} que pd.concat daria às tabelas (ordem: colunas da primeira,
+    depois as novas de cada seguinte). Texto fica como object.
+    """
+    per_table = [{f.name: _pandas_dtype(path, f) for f in pq.read_schema(path)} for path in paths]
+    columns = list(dict.fromkeys(c for dtypes in per_table for c in dtypes))
+    result = {}
+    for col in columns:
+        present = [dtypes[col] for dtypes in per_table if col in dtypes]
+        if any(d == object for d in present):
+            result[col] = np.dtype(object)
+            continue
+        common = np.result_type(*present)
+        if len(present) < len(per_table) and common.kind in 'iub':
+            common = np.dtype('float64') if common.kind in 'iu' else np.dtype(object)
+        result[col] = common
+    return result
+
+def scan_application(paths, dtypes, batch_size):
+    """
+    Primeira passada (projetada): ids, linhas mantidas após a deduplicação de
+    sk_id_curr entre as tabelas (primeira ocorrência), vocabulários das colunas de
+    texto nas linhas mantidas e presença da anomalia 365243 em DAYS_EMPLOYED.
+    """
+    ids = [pq.read_table(path, columns=['sk_id_curr']).column('sk_id_curr').to_numpy() for path in paths]
+    keep_all = ~pd.Series(np.concatenate(ids)).duplicated(keep='first').to_numpy()
+    bounds = np.cumsum([0] + [len(i) for i in ids])
+    keeps = [keep_all[bounds[i]:bounds[i + 1]] for i in range(len(paths))]
+
+    text_cols = [c for c, d in dtypes.items() if d == object]
+    values = {col: set() for col in text_cols}
+    has_null = dict.fromkeys(text_cols, False)
+    anomaly = False
+    for path, keep in zip(paths, keeps):
+        available = set(pq.read_schema(path).names)
+        columns = [c for c in text_cols + ['days_employed'] if c in available]
+        missing = [c for c in text_cols if c not in available]
+        offset = 0
+        for batch in iter_batches(path, columns=columns, batch_size=batch_size):
+            mask = pa.array(keep[offset:offset + batch.num_rows])
+            offset += batch.num_rows
+            batch = batch.filter(mask)
+            for col in columns:
+                column = batch.column(col)
+                if col == 'days_employed':
+                    anomaly = anomaly or bool(pc.any(pc.equal(column, 365243)).as_py())
+                    continue
+                if pa.types.is_dictionary(column.type):
+                    column = column.dictionary_decode()
+                has_null[col] = has_null[col] or column.null_count > 0
+                values[col].update(v for v in pc.unique(column.drop_null()).to_pylist())
+        for col in missing:
+            has_null[col] = has_null[col] or keep.any()
+
+    vocabularies = {}
+    for col in text_cols:
+        categories = values[col] | ({'XNA'} if has_null[col] else set())
+        vocabularies[col] = pd.CategoricalDtype(sorted(categories))
+    return ids, keeps, vocabularies, anomaly
+
+def _transform_frame(df, columns, dtypes, vocabularies, days_employed_dtype):
+    """Segunda passada: um lote da application com os dtypes e categorias fixados."""
+    df = df.reindex(columns=columns)
+    for col in columns:
+        if col not in vocabularies and df[col].dtype != dtypes[col]:
+            df[col] = df[col].astype(dtypes[col])
+    df = derive_features(df)
+    df['days_employed'] = df['days_employed'].astype(days_employed_dtype)
+    for col, dtype in vocabularies.items():
+        df[col] = fill_category(df[col]).cat.set_categories(dtype.categories)
+    return df
+
+def transform_two_pass(train_path, test_path, train_output, test_output, batch_size=None):
+    """
+    Modo "two_pass": a primeira passada lê só o necessário para fixar o que depende
+    das duas tabelas juntas (dtypes da concatenação, ids duplicados, vocabulários das
+    categorias, anomalia); a segunda transforma e grava train e test lote a lote, com
+    dicionários fixos (códigos de categoria iguais entre train e test). O resultado é
+    idêntico ao modo "concat". Se os ids mantidos de uma tabela não estiverem em ordem
+    crescente, essa tabela é transformada inteira para ser ordenada por sk_id_curr.
+    """
+    batch_size = batch_size or APPLICATION_BATCH_SIZE
+    paths = [train_path, test_path]
+    print("Primeira passada: dtypes, duplicatas e vocabulários...")
+    dtypes = concat_dtypes(paths)
+    ids, keeps, vocabularies, anomaly = scan_application(paths, dtypes, batch_size)
+    removed = sum(len(k) - int(k.sum()) for k in keeps)
+    if removed:
+        print(f"Removidas {removed} duplicatas de SK_ID_CURR")
+    days_employed_dtype = np.dtype('float64') if anomaly or dtypes['days_employed'].kind == 'f' \
+        else dtypes['days_employed']
+
+    print("Segunda passada: transformando e salvando Camada Silver por lotes...")
+    shapes = []
+    for path, output, table_ids, keep, drop in (
+            (train_path, train_output, ids[0], keeps[0], []),
+            (test_path, test_output, ids[1], keeps[1], ['target'])):
+        columns = [c for c in dtypes if c not in drop]
+
+        def frames():
+            kept_ids = table_ids[keep]
+            if len(kept_ids) > 1 and not np.all(kept_ids[1:] > kept_ids[:-1]):
+                print(f"{os.path.basename(path)}: sk_id_curr fora de ordem, ordenando a tabela inteira")
+                df = read_parquet(path)[keep]
+                df = df.iloc[np.argsort(df['sk_id_curr'].to_numpy(), kind='stable')]
+                yield _transform_frame(df.reset_index(drop=True), columns, dtypes, vocabularies,
+                                       days_employed_dtype)
+                return
+            offset = 0
+            for batch in iter_batches(path, batch_size=batch_size):
+                mask = keep[offset:offset + batch.num_rows]
+                offset += batch.num_rows
+                df = batch.to_pandas()[mask].reset_index(drop=True)
+                yield _transform_frame(df, columns, dtypes, vocabularies, days_employed_dtype)
+
+        # Escrita atômica em streaming: cada DataFrame vira um row group
+        shapes.append(write_parquet_batches(frames(), output, "silver"))
+    return tuple(shapes)
 
 if __name__ == "__main__":
     process_application_data()
\ No newline at end of file
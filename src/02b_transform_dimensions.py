@@ -1,52 +1,260 @@
 import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 
-from src.config import BRONZE_PATH, SILVER_PATH
+from src.config import (
+    BRONZE_PATH,
+    DIMENSIONS_PARTITION_WORKERS,
+    DIMENSIONS_PARTITIONS,
+    DIMENSIONS_STATE,
+    SILVER_PATH,
+)
+from src.instrumentation import span
+from src.manifest import load_manifest, save_manifest
+from src.segment_agg import aggregate_state, finalize_state, group_agg, merge_pairs, merge_state
+from src.storage import iter_batches, partition_by_key, read_parquet, write_parquet
+
+# Colunas (e filtros opcionais de linhas, formato pyarrow) que cada dimensão lê da
+# Bronze. Só esses column chunks são lidos/decodificados do Parquet.
+BRONZE_READS = {
+    "bureau": {"columns": [
+        'sk_id_curr', 'sk_id_bureau', 'credit_active', 'days_credit', 'amt_credit_sum',
+        'amt_credit_sum_debt', 'amt_credit_max_overdue',
+    ]},
+    "bureau_balance": {"columns": ['sk_id_bureau', 'status']},
+    "previous_application": {"columns": [
+        'sk_id_curr', 'sk_id_prev', 'amt_application', 'amt_credit',
+        'name_contract_status', 'days_decision',
+    ]},
+    "installments_payments": {"columns": [
+        'sk_id_curr', 'sk_id_prev', 'days_instalment', 'days_entry_payment',
+        'amt_instalment', 'amt_payment',
+    ]},
+    "credit_card_balance": {"columns": [
+        'sk_id_curr', 'sk_id_prev', 'months_balance', 'amt_balance',
+        'amt_credit_limit_actual', 'amt_drawings_atm_current', 'sk_dpd',
+    ]},
+    "pos_cash_balance": {"columns": [
+        'sk_id_curr', 'sk_id_prev', 'months_balance', 'cnt_instalment_future',
+        'name_contract_status', 'sk_dpd',
+    ]},
+}
+
+# Janelas de recência (meses antes do pedido) das features *_LAST{N}M_*
+RECENCY_WINDOWS = (3, 6, 12)
+DAYS_PER_MONTH = 30
+
+def read_bronze(name):
+    """Lê uma tabela Bronze com a projeção/filtros declarados em BRONZE_READS."""
+    return read_parquet(os.path.join(BRONZE_PATH, f"{name}.parquet"), **BRONZE_READS.get(name, {}))
 
 def save_atomic_parquet(df, filename):
-    """Garante escrita segura (Idempotência)."""
-    filepath = os.path.join(SILVER_PATH, filename)
-    temp_path = filepath + ".tmp"
-    try:
-        df.to_parquet(temp_path, index=False)
-        os.replace(temp_path, filepath)
-        print(f"Salvo: {filename} | Formato: {df.shape}")
-    except Exception as e:
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
-        print(f"Erro ao salvar {filename}: {e}")
+    """Garante escrita segura (Idempotência): escrita atômica com as opções da Silver."""
+    write_parquet(df, os.path.join(SILVER_PATH, filename), "silver")
+    print(f"Salvo: {filename} | Formato: {df.shape}")
+
+def add_recency_windows(df, months, columns):
+    """
+    Cria last{N}m_<coluna> para cada janela de RECENCY_WINDOWS: o valor da linha se
+    ela cai nos últimos N meses antes do pedido (`months` >= -N, relativo à data da
+    aplicação) e NaN fora da janela. A janela é um filtro por linha, então as features
+    entram no mesmo dicionário de agregações (uma ordenação por cliente e reduções por
+    segmento que ignoram NaN), no modo particionado e no estado dos deltas.
+    """
+    recent = {n: np.asarray(months >= -n) for n in RECENCY_WINDOWS}
+    for col in columns:
+        values = df[col].to_numpy()
+        values = values.astype(np.result_type(values.dtype, np.float32), copy=False)
+        for n, mask in recent.items():
+            df[f'last{n}m_{col}'] = np.where(mask, values, np.nan)
+    return df
+
+def recency_agg(columns):
+    """Agregações das colunas de janela: {coluna: funções} -> {last{N}m_<coluna>: funções}."""
+    return {f'last{n}m_{col}': funcs for col, funcs in columns.items() for n in RECENCY_WINDOWS}
+
+def _aggregate_partition(aggregate, path):
+    return aggregate(pd.read_parquet(path))
+
+def aggregate_partitioned(name, aggregate, n_partitions, workers=1):
+    """
+    Modo out-of-core: particiona a tabela Bronze por hash de sk_id_curr em
+    `n_partitions` arquivos temporários e agrega cada partição separadamente
+    (em paralelo se `workers` > 1). Como cada cliente fica inteiro numa única
+    partição, e na ordem original de linhas, o resultado é idêntico ao groupby
+    em memória (inclusive o nunique de sk_id_prev).
+    """
+    with tempfile.TemporaryDirectory(dir=SILVER_PATH, prefix=f"_part_{name}_") as tmp:
+        paths = partition_by_key(
+            os.path.join(BRONZE_PATH, f"{name}.parquet"), 'sk_id_curr', n_partitions, tmp,
+            columns=BRONZE_READS.get(name, {}).get("columns"),
+        )
+        print(f"Agregando {len(paths)} partições de {name} ({workers} worker(s))...")
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                parts = list(pool.map(_aggregate_partition, [aggregate] * len(paths), paths))
+        else:
+            parts = [_aggregate_partition(aggregate, path) for path in paths]
+
+    result = pd.concat(parts, ignore_index=True)
+    return result.sort_values('sk_id_curr', kind='stable', ignore_index=True)
+
+def build_dimension(name, aggregate, filename, n_partitions=None, workers=None):
+    """
+    Lê a tabela Bronze `name`, agrega por cliente com `aggregate` e salva `filename`.
+    `n_partitions` (padrão: DIMENSIONS_PARTITIONS) > 1 ativa o modo particionado.
+    """
+    if n_partitions is None:
+        n_partitions = DIMENSIONS_PARTITIONS
+    if workers is None:
+        workers = DIMENSIONS_PARTITION_WORKERS
+
+    if DIMENSIONS_STATE:
+        # Estado mergeável (sidecar) e dimensão finalizada a partir dele
+        with span(f"groupby_agg:{name}", partitions=n_partitions) as event:
+            if n_partitions > 1:
+                state, pairs, dtypes = build_state_partitioned(name, n_partitions, workers)
+            else:
+                _, prepare, spec, _ = DIMENSION_AGGREGATIONS[name]
+                state, pairs, dtypes = aggregate_state(prepare(read_bronze(name)), 'sk_id_curr', spec)
+            result = finalize_dimension(name, state, pairs, dtypes)
+            event["rows_out"] = len(result)
+        save_atomic_parquet(result, filename)
+        save_state(filename, state, pairs, dtypes)
+        return
+
+    drop_state(filename)
+    if n_partitions > 1:
+        with span(f"groupby_agg:{name}", partitions=n_partitions) as event:
+            result = aggregate_partitioned(name, aggregate, n_partitions, workers)
+            event["rows_out"] = len(result)
+    else:
+        df = read_bronze(name)
+        with span(f"groupby_agg:{name}", rows_in=len(df)) as event:
+            result = aggregate(df)
+            event["rows_out"] = len(result)
+    save_atomic_parquet(result, filename)
 
 # ==============================================================================
 # BUREAU & BUREAU BALANCE
 # ==============================================================================
+def _merge_status_counts(ids, counts):
+    """Soma contagens parciais (ids repetidos entre lotes) em uma linha por id."""
+    order = np.argsort(ids, kind='stable')
+    ids, counts = ids[order], counts[order]
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    return ids[starts], np.add.reduceat(counts, starts, axis=0)
+
+def _collapse_partials(partial_ids, partial_counts, n_status):
+    """Une as contagens parciais (com vocabulários de tamanhos diferentes) em uma só."""
+    if not partial_ids:
+        return [np.array([], dtype=np.int64)], [np.zeros((0, n_status), dtype=np.int64)]
+    padded = [np.pad(c, ((0, 0), (0, n_status - c.shape[1]))) for c in partial_counts]
+    ids, counts = _merge_status_counts(np.concatenate(partial_ids), np.concatenate(padded))
+    return [ids], [counts]
+
+def count_bureau_status(batches, key='sk_id_bureau', column='status'):
+    """
+    Contagem de meses por status para cada empréstimo, lote a lote.
+    Equivale a get_dummies(status) + groupby(key).sum(), mas sem materializar a
+    matriz one-hot: usa os códigos de dicionário do status e bincount por lote, e
+    mescla as contagens parciais. Memória O(#empréstimos x #status).
+    Retorna DataFrame [key, status_<valor>...] com colunas em ordem alfabética.
+    """
+    vocab = {}
+    partial_ids, partial_counts = [], []
+
+    for batch in batches:
+        status = batch.column(column)
+        if not pa.types.is_dictionary(status.type):
+            status = pc.dictionary_encode(status.cast(pa.string()))
+        # Dicionário do lote -> códigos globais (o vocabulário cresce sob demanda)
+        local_to_global = np.array(
+            [vocab.setdefault(v, len(vocab)) for v in status.dictionary.to_pylist()], dtype=np.int64
+        )
+        valid = status.indices.is_valid().to_numpy(zero_copy_only=False)
+        if not valid.any():
+            continue
+        codes = local_to_global[status.indices.to_numpy(zero_copy_only=False)[valid].astype(np.int64)]
+        ids = batch.column(key).to_numpy(zero_copy_only=False)[valid]
+
+        uniq, inverse = np.unique(ids, return_inverse=True)
+        counts = np.bincount(inverse * len(vocab) + codes, minlength=len(uniq) * len(vocab))
+        partial_ids.append(uniq)
+        partial_counts.append(counts.reshape(len(uniq), len(vocab)))
+
+        # Mescla as parciais periodicamente para manter a memória proporcional aos empréstimos
+        if len(partial_ids) >= 16:
+            partial_ids, partial_counts = _collapse_partials(partial_ids, partial_counts, len(vocab))
+
+    partial_ids, partial_counts = _collapse_partials(partial_ids, partial_counts, len(vocab))
+    ids, counts = partial_ids[0], partial_counts[0]
+
+    names = sorted(vocab)
+    result = pd.DataFrame({key: ids})
+    for name in names:
+        result[f'{column}_{name}'] = counts[:, vocab[name]].astype(np.int64)
+    return result
+
+def prepare_bureau(bureau, balance_agg):
+    """Junta as contagens de status do bureau_balance a cada empréstimo e cria flags/ratios."""
+    with span("merge:bureau_balance", rows_in=len(bureau)) as event:
+        bureau = bureau.merge(balance_agg, on='sk_id_bureau', how='left')
+        event["rows_out"] = len(bureau)
+    bureau['is_active'] = (bureau['credit_active'] == 'Active').astype(int)
+    bureau['debt_ratio'] = bureau['amt_credit_sum_debt'] / bureau['amt_credit_sum']
+    bureau['debt_ratio'] = bureau['debt_ratio'].replace([np.inf, -np.inf], np.nan)
+    return bureau
+
+BUREAU_AGG = {
+    'sk_id_bureau': 'count',
+    'days_credit': ['min', 'mean'],
+    'amt_credit_sum': ['sum', 'max'],
+    'amt_credit_sum_debt': ['sum'],
+    'amt_credit_max_overdue': ['max'],
+    'is_active': ['sum'],
+    'status_1': ['sum'], # Atrasos leves no balance
+    'status_5': ['sum']  # Atrasos graves no balance
+}
+
 def process_bureau():
     print("Processando: Bureau e Bureau Balance...")
-    bureau = pd.read_parquet(os.path.join(BRONZE_PATH, "bureau.parquet"))
-    balance = pd.read_parquet(os.path.join(BRONZE_PATH, "bureau_balance.parquet"))
+    bureau = read_bronze("bureau")
 
-    # Agrega Bureau Balance por Empréstimo
-    balance_dummies = pd.get_dummies(balance[['sk_id_bureau', 'status']], columns=['status'])
-    balance_agg = balance_dummies.groupby('sk_id_bureau').sum().reset_index()
+    # Agrega Bureau Balance por Empréstimo (contagem de meses por status, em streaming)
+    with span("count_status:bureau_balance") as event:
+        balance_agg = count_bureau_status(iter_batches(
+            os.path.join(BRONZE_PATH, "bureau_balance.parquet"), **BRONZE_READS["bureau_balance"]
+        ))
+        event["rows_out"] = len(balance_agg)
     
     # Junta com Bureau e cria Ratios
-    bureau = bureau.merge(balance_agg, on='sk_id_bureau', how='left')
-    bureau['is_active'] = (bureau['credit_active'] == 'Active').astype(int)
-    bureau['debt_ratio'] = bureau['amt_credit_sum_debt'] / bureau['amt_credit_sum']
-    bureau['debt_ratio'] = bureau['debt_ratio'].replace([np.inf, -np.inf], np.nan)
+    bureau = prepare_bureau(bureau, balance_agg)
 
     # Agrega por Cliente (SK_ID_CURR)
-    bureau_agg = bureau.groupby('sk_id_curr').agg({
-        'sk_id_bureau': 'count',
-        'days_credit': ['min', 'mean'],
-        'amt_credit_sum': ['sum', 'max'],
-        'amt_credit_sum_debt': ['sum'],
-        'amt_credit_max_overdue': ['max'],
-        'is_active': ['sum'],
-        'status_1': ['sum'], # Atrasos leves no balance
-        'status_5': ['sum']  # Atrasos graves no balance
-    })
+    if DIMENSIONS_STATE:
+        with span("groupby_agg:bureau", rows_in=len(bureau)) as event:
+            state, pairs, dtypes = aggregate_state(bureau, 'sk_id_curr', BUREAU_AGG)
+            # Dono de cada empréstimo e contagens de meses de empréstimos sem linha no
+            # bureau (para os deltas de bureau_balance, ver upsert_bureau)
+            pairs["_loans"] = bureau[['sk_id_bureau', 'sk_id_curr']]
+            orphan = ~balance_agg['sk_id_bureau'].isin(pairs["_loans"]['sk_id_bureau'])
+            pairs["_pending"] = _status_counts(balance_agg[orphan])
+            result = finalize_dimension("bureau", state, pairs, dtypes)
+            event["rows_out"] = len(result)
+        save_atomic_parquet(result, "dim_bureau.parquet")
+        save_state("dim_bureau.parquet", state, pairs, dtypes)
+        return
+
+    drop_state("dim_bureau.parquet")
+    with span("groupby_agg:bureau", rows_in=len(bureau)) as event:
+        bureau_agg = group_agg(bureau, 'sk_id_curr', BUREAU_AGG)
+        event["rows_out"] = len(bureau_agg)
     
     bureau_agg.columns = ['BUREAU_' + '_'.join(col).upper() for col in bureau_agg.columns]
     save_atomic_parquet(bureau_agg.reset_index(), "dim_bureau.parquet")
@@ -54,10 +262,8 @@ def process_bureau():
 # ==============================================================================
 # PREVIOUS APPLICATION
 # ==============================================================================
-def process_previous_application():
-    print("Processando: Previous Application...")
-    prev = pd.read_parquet(os.path.join(BRONZE_PATH, "previous_application.parquet"))
-    
+def prepare_previous_application(prev):
+    """Tratativas linha a linha de previous_application (antes da agregação)."""
     # TRATATIVA EDA: Substituir 365243 por NaN 
     cols_dias = [col for col in prev.columns if 'days_' in col]
     for col in cols_dias:
@@ -66,88 +272,317 @@ def process_previous_application():
     # Flags de Negócio
     prev['is_approved'] = (prev['name_contract_status'] == 'Approved').astype(int)
     prev['is_refused'] = (prev['name_contract_status'] == 'Refused').astype(int)
+    return prev
+
+PREVIOUS_APPLICATION_AGG = {
+    'sk_id_prev': 'count',
+    'amt_application': ['min', 'max', 'mean'],
+    'amt_credit': ['sum'],
+    'is_approved': ['sum', 'mean'],
+    'is_refused': ['sum', 'mean'],
+    'days_decision': ['max', 'mean']
+}
+
+def aggregate_previous_application(prev, engine=None):
+    """Agrega previous_application por cliente (uma linha por sk_id_curr)."""
+    prev = prepare_previous_application(prev)
 
     # Agrega por Cliente
-    prev_agg = prev.groupby('sk_id_curr').agg({
-        'sk_id_prev': 'count',
-        'amt_application': ['min', 'max', 'mean'],
-        'amt_credit': ['sum'],
-        'is_approved': ['sum', 'mean'],
-        'is_refused': ['sum', 'mean'],
-        'days_decision': ['max', 'mean']
-    })
+    prev_agg = group_agg(prev, 'sk_id_curr', PREVIOUS_APPLICATION_AGG, engine=engine)
     
     prev_agg.columns = ['PREV_' + '_'.join(col).upper() for col in prev_agg.columns]
-    save_atomic_parquet(prev_agg.reset_index(), "dim_previous_app.parquet")
+    return prev_agg.reset_index()
+
+def process_previous_application():
+    print("Processando: Previous Application...")
+    build_dimension("previous_application", aggregate_previous_application, "dim_previous_app.parquet")
 
 # ==============================================================================
 # INSTALLMENTS PAYMENTS
 # ==============================================================================
-def process_installments():
-    print(" Processando: Installments Payments...")
-    inst = pd.read_parquet(os.path.join(BRONZE_PATH, "installments_payments.parquet"))
-    
+def prepare_installments(inst):
+    """Tratativas linha a linha de installments_payments (antes da agregação)."""
     # TRATATIVA: Dias de atraso e Fração de Pagamento
     inst['days_past_due'] = (inst['days_entry_payment'] - inst['days_instalment']).clip(lower=0)
     inst['payment_fraction'] = inst['amt_payment'] / inst['amt_instalment']
     inst['payment_fraction'] = inst['payment_fraction'].replace([np.inf, -np.inf], np.nan)
+
+    # Atraso recente: parcelas com vencimento nos últimos 3/6/12 meses
+    return add_recency_windows(inst, inst['days_instalment'] / DAYS_PER_MONTH, INSTALLMENTS_WINDOWS)
+
+INSTALLMENTS_WINDOWS = {'days_past_due': ['max', 'mean']}
+
+INSTALLMENTS_AGG = {
+    'sk_id_prev': 'nunique',
+    'days_past_due': ['max', 'mean', 'sum'],
+    'payment_fraction': ['mean', 'min'],
+    'amt_payment': ['sum', 'mean'],
+    **recency_agg(INSTALLMENTS_WINDOWS),
+}
+
+def aggregate_installments(inst, engine=None):
+    """Agrega installments_payments por cliente (uma linha por sk_id_curr)."""
+    inst = prepare_installments(inst)
     
-    inst_agg = inst.groupby('sk_id_curr').agg({
-        'sk_id_prev': 'nunique',
-        'days_past_due': ['max', 'mean', 'sum'],
-        'payment_fraction': ['mean', 'min'],
-        'amt_payment': ['sum', 'mean']
-    })
+    inst_agg = group_agg(inst, 'sk_id_curr', INSTALLMENTS_AGG, engine=engine)
     
     inst_agg.columns = ['INSTAL_' + '_'.join(col).upper() for col in inst_agg.columns]
-    save_atomic_parquet(inst_agg.reset_index(), "dim_installments.parquet")
+    return inst_agg.reset_index()
+
+def process_installments():
+    print(" Processando: Installments Payments...")
+    build_dimension("installments_payments", aggregate_installments, "dim_installments.parquet")
 
 # ==============================================================================
 # CREDIT CARD BALANCE
 # ==============================================================================
-def process_credit_card():
-    print("Processando: Credit Card Balance...")
-    cc = pd.read_parquet(os.path.join(BRONZE_PATH, "credit_card_balance.parquet"))
-    
+def prepare_credit_card(cc):
+    """Tratativas linha a linha de credit_card_balance (antes da agregação)."""
     # TRATATIVA EDA: 20% nulos nas colunas de amount. (sem movimentação)
     amt_cols = [col for col in cc.columns if 'amt_' in col]
     cc[amt_cols] = cc[amt_cols].fillna(0)
     
     # TRATATIVA EDA: Capturando o risco de saques no caixa eletrônico (ATM)
     cc['has_atm_drawing'] = (cc['amt_drawings_atm_current'] > 0).astype(int)
+
+    # Saldo, fração de meses com saque ATM e atraso nos últimos 3/6/12 meses
+    return add_recency_windows(cc, cc['months_balance'], CREDIT_CARD_WINDOWS)
+
+CREDIT_CARD_WINDOWS = {'amt_balance': ['mean'], 'has_atm_drawing': ['mean'], 'sk_dpd': ['max', 'mean']}
+
+CREDIT_CARD_AGG = {
+    'sk_id_prev': 'nunique',
+    'months_balance': ['min', 'count'],
+    'amt_balance': ['max', 'mean'],
+    'amt_credit_limit_actual': ['max'],
+    'has_atm_drawing': ['sum', 'mean'],
+    **recency_agg(CREDIT_CARD_WINDOWS),
+}
+
+def aggregate_credit_card(cc, engine=None):
+    """Agrega credit_card_balance por cliente (uma linha por sk_id_curr)."""
+    cc = prepare_credit_card(cc)
     
-    cc_agg = cc.groupby('sk_id_curr').agg({
-        'sk_id_prev': 'nunique',
-        'months_balance': ['min', 'count'],
-        'amt_balance': ['max', 'mean'],
-        'amt_credit_limit_actual': ['max'],
-        'has_atm_drawing': ['sum', 'mean']
-    })
+    cc_agg = group_agg(cc, 'sk_id_curr', CREDIT_CARD_AGG, engine=engine)
     
     cc_agg.columns = ['CC_' + '_'.join(col).upper() for col in cc_agg.columns]
-    save_atomic_parquet(cc_agg.reset_index(), "dim_credit_card.parquet")
+    return cc_agg.reset_index()
+
+def process_credit_card():
+    print("Processando: Credit Card Balance...")
+    build_dimension("credit_card_balance", aggregate_credit_card, "dim_credit_card.parquet")
 
 # ==============================================================================
 #  POS CASH BALANCE
 # ==============================================================================
-def process_pos_cash():
-    print("Processando: POS Cash Balance...")
-    pos = pd.read_parquet(os.path.join(BRONZE_PATH, "pos_cash_balance.parquet"))
-    
+def prepare_pos_cash(pos):
+    """Tratativas linha a linha de pos_cash_balance (antes da agregação)."""
     # TRATATIVA EDA: O status Active domina (~91.5%). Incluindo Completed também.
     pos['is_active'] = (pos['name_contract_status'] == 'Active').astype(int)
     pos['is_completed'] = (pos['name_contract_status'] == 'Completed').astype(int)
+
+    # Atraso (DPD) nos últimos 3/6/12 meses
+    return add_recency_windows(pos, pos['months_balance'], POS_CASH_WINDOWS)
+
+POS_CASH_WINDOWS = {'sk_dpd': ['max', 'mean']}
+
+POS_CASH_AGG = {
+    'sk_id_prev': 'nunique',
+    'months_balance': ['min', 'count'],
+    'cnt_instalment_future': ['max', 'mean'],
+    'is_active': ['sum', 'mean'],
+    'is_completed': ['sum'],
+    **recency_agg(POS_CASH_WINDOWS),
+}
+
+def aggregate_pos_cash(pos, engine=None):
+    """Agrega pos_cash_balance por cliente (uma linha por sk_id_curr)."""
+    pos = prepare_pos_cash(pos)
     
-    pos_agg = pos.groupby('sk_id_curr').agg({
-        'sk_id_prev': 'nunique',
-        'months_balance': ['min', 'count'],
-        'cnt_instalment_future': ['max', 'mean'],
-        'is_active': ['sum', 'mean'],
-        'is_completed': ['sum']
-    })
+    pos_agg = group_agg(pos, 'sk_id_curr', POS_CASH_AGG, engine=engine)
     
     pos_agg.columns = ['POS_' + '_'.join(col).upper() for col in pos_agg.columns]
-    save_atomic_parquet(pos_agg.reset_index(), "dim_pos_cash.parquet")
+    return pos_agg.reset_index()
+
+def process_pos_cash():
+    print("Processando: POS Cash Balance...")
+    build_dimension("pos_cash_balance", aggregate_pos_cash, "dim_pos_cash.parquet")
+
+# ==============================================================================
+# ESTADO MERGEÁVEL E ATUALIZAÇÃO INCREMENTAL (deltas da Bronze)
+# ==============================================================================
+# Tabela Bronze -> (prefixo das colunas, tratativas por linha, agregações, arquivo Silver)
+DIMENSION_AGGREGATIONS = {
+    "bureau": ("BUREAU", None, BUREAU_AGG, "dim_bureau.parquet"),
+    "previous_application": ("PREV", prepare_previous_application, PREVIOUS_APPLICATION_AGG,
+                             "dim_previous_app.parquet"),
+    "installments_payments": ("INSTAL", prepare_installments, INSTALLMENTS_AGG, "dim_installments.parquet"),
+    "credit_card_balance": ("CC", prepare_credit_card, CREDIT_CARD_AGG, "dim_credit_card.parquet"),
+    "pos_cash_balance": ("POS", prepare_pos_cash, POS_CASH_AGG, "dim_pos_cash.parquet"),
+}
+
+def state_path(filename, part):
+    """Arquivo do estado mergeável de uma dimensão: SILVER/_state/<dim>.<parte>."""
+    return os.path.join(SILVER_PATH, "_state", filename.replace(".parquet", f".{part}"))
+
+def save_state(filename, state, pairs, dtypes):
+    """
+    Sidecar da dimensão: estado por cliente (somas, contagens, min/max), pares
+    distintos de cada nunique e os dtypes de entrada (JSON, gravado por último).
+    """
+    os.makedirs(os.path.join(SILVER_PATH, "_state"), exist_ok=True)
+    frames = {"state": state, **{f"pairs_{column}": df for column, df in pairs.items()}}
+    for part, df in frames.items():
+        write_parquet(df, state_path(filename, f"{part}.parquet"), "silver")
+    save_manifest({"dtypes": dtypes, "pairs": sorted(pairs)}, state_path(filename, "json"))
+
+def load_state(filename):
+    """(estado, pares, dtypes) do sidecar; erro se a dimensão foi gerada sem DIMENSIONS_STATE=1."""
+    meta = load_manifest(state_path(filename, "json"))
+    if not meta:
+        raise FileNotFoundError(
+            f"Sem estado incremental para {filename}: gere as dimensões com DIMENSIONS_STATE=1."
+        )
+    state = pd.read_parquet(state_path(filename, "state.parquet"))
+    pairs = {column: pd.read_parquet(state_path(filename, f"pairs_{column}.parquet"))
+             for column in meta["pairs"]}
+    return state, pairs, meta["dtypes"]
+
+def drop_state(filename):
+    """Remove o sidecar (dimensão reconstruída sem estado: o sidecar ficaria desatualizado)."""
+    path = state_path(filename, "json")
+    meta = load_manifest(path)
+    if not meta:
+        return
+    os.remove(path)
+    for part in ["state"] + [f"pairs_{column}" for column in meta["pairs"]]:
+        if os.path.exists(state_path(filename, f"{part}.parquet")):
+            os.remove(state_path(filename, f"{part}.parquet"))
+
+def finalize_dimension(name, state, pairs, dtypes):
+    """Dimensão final (mesmas colunas e dtypes do aggregate_*) a partir do estado."""
+    prefix, _, spec, _ = DIMENSION_AGGREGATIONS[name]
+    agg = finalize_state(state, pairs, 'sk_id_curr', spec, dtypes)
+    agg.columns = [prefix + '_' + '_'.join(col).upper() for col in agg.columns]
+    return agg.reset_index()
+
+def _state_partition(name, path):
+    _, prepare, spec, _ = DIMENSION_AGGREGATIONS[name]
+    return aggregate_state(prepare(pd.read_parquet(path)), 'sk_id_curr', spec)
+
+def build_state_partitioned(name, n_partitions, workers=1):
+    """Estado por partição de sk_id_curr (clientes disjuntos): basta concatenar e ordenar."""
+    with tempfile.TemporaryDirectory(dir=SILVER_PATH, prefix=f"_part_{name}_") as tmp:
+        paths = partition_by_key(
+            os.path.join(BRONZE_PATH, f"{name}.parquet"), 'sk_id_curr', n_partitions, tmp,
+            columns=BRONZE_READS.get(name, {}).get("columns"),
+        )
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                parts = list(pool.map(_state_partition, [name] * len(paths), paths))
+        else:
+            parts = [_state_partition(name, path) for path in paths]
+
+    state = pd.concat([p[0] for p in parts], ignore_index=True)
+    state = state.sort_values('sk_id_curr', kind='stable', ignore_index=True)
+    pairs = {column: merge_pairs([p[1][column] for p in parts], 'sk_id_curr') for column in parts[0][1]}
+    dtypes = {column: str(np.result_type(*[np.dtype(p[2][column]) for p in parts])) for column in parts[0][2]}
+    return state, pairs, dtypes
+
+def _merge_into_state(name, state, pairs, dtypes, deltas):
+    """
+    Dobra estados delta (estado, pares, dtypes) no estado da dimensão: só as linhas dos
+    clientes afetados são recombinadas. Retorna (estado, pares, dtypes, afetados).
+    """
+    affected = np.unique(np.concatenate([d[0]['sk_id_curr'].to_numpy() for d in deltas]))
+    touched = state['sk_id_curr'].isin(affected).to_numpy()
+    merged = merge_state([state[touched]] + [d[0] for d in deltas], 'sk_id_curr')
+    state = pd.concat([state[~touched], merged], ignore_index=True)
+    state = state.sort_values('sk_id_curr', kind='stable', ignore_index=True)
+    for column in [c for c in pairs if not c.startswith('_')]:
+        pairs[column] = merge_pairs([pairs[column]] + [d[1][column] for d in deltas if column in d[1]],
+                                    'sk_id_curr')
+    for delta_dtypes in (d[2] for d in deltas if d[2]):
+        dtypes = {c: str(np.result_type(np.dtype(dtypes[c]), np.dtype(delta_dtypes[c]))) for c in dtypes}
+    return state, pairs, dtypes, affected
+
+def upsert_dimension(name, delta):
+    """
+    Incorpora linhas novas da Bronze `name` (DataFrame `delta`, com as colunas de
+    BRONZE_READS) à dimensão: agrega só o delta, recombina o estado dos clientes
+    afetados e regrava a dimensão a partir do estado. Retorna os sk_id_curr afetados.
+    """
+    _, prepare, spec, filename = DIMENSION_AGGREGATIONS[name]
+    state, pairs, dtypes = load_state(filename)
+    if len(delta) == 0:
+        return np.array([], dtype=np.int64)
+    with span(f"upsert:{name}", rows_in=len(delta)) as event:
+        delta_state = aggregate_state(prepare(delta), 'sk_id_curr', spec)
+        state, pairs, dtypes, affected = _merge_into_state(name, state, pairs, dtypes, [delta_state])
+        result = finalize_dimension(name, state, pairs, dtypes)
+        event["rows_out"] = len(affected)
+    save_atomic_parquet(result, filename)
+    save_state(filename, state, pairs, dtypes)
+    print(f"Atualizado: {filename} | {len(delta)} linhas novas | {len(affected)} clientes afetados")
+    return affected
+
+BUREAU_STATUS_COLUMNS = ['status_1', 'status_5']
+
+def _status_counts(balance_agg):
+    """Contagens de status por empréstimo só com as colunas usadas pela dimensão."""
+    return balance_agg.reindex(columns=['sk_id_bureau'] + BUREAU_STATUS_COLUMNS, fill_value=0)
+
+def upsert_bureau(bureau_delta=None, balance_delta=None):
+    """
+    Versão de `upsert_dimension` para o bureau: empréstimos novos (`bureau_delta`) e
+    meses novos de bureau_balance (`balance_delta`). Meses de empréstimos já
+    conhecidos somam às contagens do dono (o dono de cada empréstimo fica no
+    sidecar); meses de empréstimos ainda desconhecidos ficam pendentes no sidecar
+    até o empréstimo chegar, como na junção da reconstrução completa.
+    """
+    filename = DIMENSION_AGGREGATIONS["bureau"][3]
+    state, pairs, dtypes = load_state(filename)
+    if bureau_delta is None:
+        bureau_delta = pairs["_loans"][:0]  # só meses de bureau_balance
+    if balance_delta is not None and len(balance_delta):
+        batches = pa.Table.from_pandas(balance_delta, preserve_index=False).to_batches()
+        balance_agg = _status_counts(count_bureau_status(batches))
+    else:
+        balance_agg = _status_counts(pd.DataFrame({'sk_id_bureau': pd.Series(dtype='int64')}))
+
+    # Contagens acumuladas de empréstimos sem dono (pendentes) + as do delta
+    pending = pd.concat([pairs.get("_pending", balance_agg[:0]), balance_agg], ignore_index=True)
+    pending = pending.groupby('sk_id_bureau', as_index=False, sort=True).sum()
+    is_new = pending['sk_id_bureau'].isin(bureau_delta['sk_id_bureau'])
+
+    deltas = []
+    if len(bureau_delta):
+        deltas.append(aggregate_state(prepare_bureau(bureau_delta, pending[is_new]), 'sk_id_curr', BUREAU_AGG))
+    # Meses novos de empréstimos já conhecidos: somam às contagens de status do dono
+    known = balance_agg[~balance_agg['sk_id_bureau'].isin(bureau_delta['sk_id_bureau'])]
+    known = known.merge(pairs["_loans"], on='sk_id_bureau', how='inner')
+    if len(known):
+        status_spec = {c: BUREAU_AGG[c] for c in BUREAU_STATUS_COLUMNS}
+        known_state, _, _ = aggregate_state(known, 'sk_id_curr', status_spec)
+        deltas.append((known_state, {}, {}))
+
+    pairs["_loans"] = pd.concat([pairs["_loans"], bureau_delta[['sk_id_bureau', 'sk_id_curr']]],
+                                ignore_index=True)
+    pending = pending[~is_new]
+    pairs["_pending"] = pending[~pending['sk_id_bureau'].isin(pairs["_loans"]['sk_id_bureau'])]
+    if not deltas:
+        save_state(filename, state, pairs, dtypes)
+        return np.array([], dtype=np.int64)
+
+    rows_in = len(bureau_delta) + (0 if balance_delta is None else len(balance_delta))
+    with span("upsert:bureau", rows_in=rows_in) as event:
+        state, pairs, dtypes, affected = _merge_into_state("bureau", state, pairs, dtypes, deltas)
+        result = finalize_dimension("bureau", state, pairs, dtypes)
+        event["rows_out"] = len(affected)
+    save_atomic_parquet(result, filename)
+    save_state(filename, state, pairs, dtypes)
+    print(f"Atualizado: {filename} | {rows_in} linhas novas | {len(affected)} clientes afetados")
+    return affected
 
 def run_pipeline():
     os.makedirs(SILVER_PATH, exist_ok=True)
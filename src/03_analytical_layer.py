@@ -1,61 +1,264 @@
 import os
+import shutil
 
+import numpy as np
 import pandas as pd
+from pandas.api.extensions import take
+from pandas.api.types import is_extension_array_dtype
 
-from src.config import GOLD_PATH, SILVER_PATH
+from src.config import (
+    FEATURE_STORE,
+    GOLD_PARTITION_COLS,
+    GOLD_PATH,
+    GOLD_ROW_GROUP_SIZE,
+    GOLD_SORT_COLS,
+    MODEL_EXPORT,
+    OBT_JOIN_STRATEGY,
+    SILVER_PATH,
+)
+from src.feature_store import build_store, store_path
+from src.gold_sample import build_samples
+from src.instrumentation import span
+from src.manifest import save_manifest
+from src.model_export import export_matrix, matrix_path
+from src.risk_cube import build_risk_cube
+from src.storage import available_columns, read_parquet, write_parquet, write_partitioned_atomic
 
 def save_atomic_parquet(df, filename):
-    filepath = os.path.join(GOLD_PATH, filename)
-    temp_path = filepath + ".tmp"
-    try:
-        df.to_parquet(temp_path, index=False)
-        os.replace(temp_path, filepath)
-        print(f"Salvo: {filename} | Formato: {df.shape}")
-    except Exception as e:
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
-        print(f"Erro ao salvar {filename}: {e}")
-
-def build_obt():
+    """Escrita atômica na Gold (opções de escrita da camada, PARQUET_GOLD_OPTIONS)."""
+    write_parquet(df, os.path.join(GOLD_PATH, filename), "gold")
+    print(f"Salvo: {filename} | Formato: {df.shape}")
+
+def save_partitioned(df, name, partition_cols=None):
+    """
+    Layout opcional da Gold: dataset particionado `name/` (hive) nas chaves
+    `partition_cols` (padrão: GOLD_PARTITION_COLS), para poda de partições e
+    row groups por leitores filtrados (ver storage.read_dataset).
+    """
+    if partition_cols is None:
+        partition_cols = GOLD_PARTITION_COLS
+    if not partition_cols:
+        return
+    n_files = write_partitioned_atomic(
+        df, os.path.join(GOLD_PATH, name), partition_cols,
+        sort_by=GOLD_SORT_COLS, row_group_size=GOLD_ROW_GROUP_SIZE, layer="gold",
+    )
+    print(f"Salvo: {name}/ | Partições: {', '.join(partition_cols)} | Arquivos: {n_files}")
+
+def save_feature_store(df, name):
+    """
+    Store de features para consulta por sk_id_curr (ver src/feature_store.py), se
+    FEATURE_STORE; sem a opção, um store anterior é apagado (ficaria defasado da OBT).
+    """
+    if not FEATURE_STORE:
+        if os.path.exists(store_path(name, GOLD_PATH)):
+            os.remove(store_path(name, GOLD_PATH))
+        return
+    with span("write_feature_store", path=name, rows_in=len(df)) as event:
+        path = build_store(df, store_path(name, GOLD_PATH))
+        event["bytes"] = os.path.getsize(path)
+    print(f"Salvo: {os.path.basename(path)} | Store de features: {len(df)} clientes")
+
+def save_model_matrix(df, name):
+    """
+    Exportação pronta para treino (ver src/model_export.py), se MODEL_EXPORT; sem a
+    opção, uma exportação anterior é apagada.
+    """
+    if not MODEL_EXPORT:
+        if os.path.isdir(matrix_path(name, GOLD_PATH)):
+            shutil.rmtree(matrix_path(name, GOLD_PATH))
+        return
+    with span("write_model_matrix", path=name, rows_in=len(df)) as event:
+        path = export_matrix(df, matrix_path(name, GOLD_PATH))
+        event["bytes"] = sum(e.stat().st_size for e in os.scandir(path))
+    print(f"Salvo: {os.path.basename(path)}/ | Matriz de treino: {len(df)} linhas")
+
+def save_samples(name):
+    """Amostras estratificadas da OBT já gravada (ver src/gold_sample.py), lidas em streaming."""
+    with span("write_samples", path=name) as event:
+        paths = build_samples(os.path.join(GOLD_PATH, f"{name}.parquet"), name)
+        event["bytes"] = sum(os.path.getsize(path) for path in paths)
+
+def save_risk_cube(obt_train):
+    """
+    Cubo de agregados de risco do dashboard (ver src/risk_cube.py), calculado
+    sobre a população de treino inteira, e os limites das faixas usados (JSON).
+    """
+    cube, bins = build_risk_cube(obt_train)
+    save_atomic_parquet(cube, "analytics_risk_cube.parquet")
+    save_manifest(bins, os.path.join(GOLD_PATH, "analytics_risk_cube_bins.json"))
+
+DIMENSION_FILES = [
+    "dim_bureau.parquet", "dim_previous_app.parquet", "dim_installments.parquet",
+    "dim_credit_card.parquet", "dim_pos_cash.parquet",
+]
+
+def read_dimension(filename, dim_columns=None):
+    """
+    Lê uma dimensão Silver. Com `dim_columns`, só a chave e as colunas pedidas
+    que existem nesta dimensão são lidas (projeção resolvida pelo footer).
+    """
+    path = os.path.join(SILVER_PATH, filename)
+    if dim_columns is None:
+        return read_parquet(path)
+    wanted = set(dim_columns)
+    columns = ['sk_id_curr'] + [c for c in available_columns(path) if c in wanted and c != 'sk_id_curr']
+    return read_parquet(path, columns=columns)
+
+def _dim_prefix(dim):
+    # Obtém o nome da primeira coluna (excluindo sk_id_curr) para log
+    return dim.columns[1].split('_')[0] if len(dim.columns) > 1 else "DIM"
+
+def merge_to_obt(fact_df, fact_name, dimensions):
+    """Sequência de LEFT JOINs (hash) por SK_ID_CURR: uma OBT intermediária por dimensão."""
+    print(f"\n Montando OBT para: {fact_name}...")
+    obt = fact_df.copy()
+    
+    # Sequência de LEFT JOINs usando SK_ID_CURR
+    for dim in dimensions:
+        print(f"      -> Fazendo JOIN com Dimensão: {_dim_prefix(dim)}")
+        with span(f"merge:{_dim_prefix(dim)}", rows_in=len(obt)) as event:
+            obt = obt.merge(dim, on='sk_id_curr', how='left')
+            event["rows_out"] = len(obt)
+        
+    return obt
+
+def align_dimension(keys, dim):
+    """
+    Posição de cada chave do fato na dimensão (ordenada e única por sk_id_curr),
+    via busca binária; -1 quando o cliente não existe na dimensão.
+    """
+    dim_keys = dim['sk_id_curr'].to_numpy()
+    if len(dim_keys) == 0:
+        return np.full(len(keys), -1, dtype=np.intp)
+    positions = np.searchsorted(dim_keys, keys)
+    clipped = np.minimum(positions, len(dim_keys) - 1)
+    return np.where(dim_keys[clipped] == keys, clipped, -1)
+
+def align_to_obt(fact_df, fact_name, dimensions):
+    """
+    LEFT JOIN em uma única passada alinhada: as dimensões estão ordenadas por
+    sk_id_curr (saída do groupby da Silver), então cada coluna de dimensão é
+    obtida por take posicional sobre o índice da busca binária, sem OBTs
+    intermediárias. Mesmo resultado do merge (inclusive a promoção int -> float
+    quando falta o cliente na dimensão); a OBT é montada uma única vez no final.
+    """
+    print(f"\n Montando OBT para: {fact_name} (alinhamento por sk_id_curr)...")
+    keys = fact_df['sk_id_curr'].to_numpy()
+    columns = {col: fact_df[col] for col in fact_df.columns}
+
+    for dim in dimensions:
+        if not dim['sk_id_curr'].is_monotonic_increasing:
+            dim = dim.sort_values('sk_id_curr', kind='stable', ignore_index=True)
+        if not dim['sk_id_curr'].is_unique:
+            raise ValueError(f"Dimensão {_dim_prefix(dim)} com sk_id_curr duplicado; use join='merge'.")
+        print(f"      -> Alinhando Dimensão: {_dim_prefix(dim)}")
+        with span(f"align:{_dim_prefix(dim)}", rows_in=len(dim)) as event:
+            indexer = align_dimension(keys, dim)
+            for col in dim.columns:
+                if col != 'sk_id_curr':
+                    values = dim[col]
+                    values = values.array if is_extension_array_dtype(values.dtype) else values.to_numpy()
+                    columns[col] = take(values, indexer, allow_fill=True)
+            event["rows_out"] = len(keys)
+
+    return pd.DataFrame(columns)
+
+def build_obt(dim_columns=None, join=None):
+    """
+    Monta a OBT (fato + dimensões) de treino e teste, com uma única carga das dimensões.
+    `dim_columns` restringe as colunas de dimensão incluídas (padrão: todas).
+    `join` (padrão: OBT_JOIN_STRATEGY) escolhe "aligned" (take posicional) ou "merge".
+    """
     print("[Fase 3] Iniciando Construção da Camada Analítica (Gold / OBT)...")
     os.makedirs(GOLD_PATH, exist_ok=True)
 
     # 1. Carregando Dimensões
     print("Carregando Dimensões (Silver)...")
-    dim_bureau = pd.read_parquet(os.path.join(SILVER_PATH, "dim_bureau.parquet"))
-    dim_prev = pd.read_parquet(os.path.join(SILVER_PATH, "dim_previous_app.parquet"))
-    dim_inst = pd.read_parquet(os.path.join(SILVER_PATH, "dim_installments.parquet"))
-    dim_cc = pd.read_parquet(os.path.join(SILVER_PATH, "dim_credit_card.parquet"))
-    dim_pos = pd.read_parquet(os.path.join(SILVER_PATH, "dim_pos_cash.parquet"))
-
-    # Lista de dimensões para o loop de JOIN
-    dimensions = [dim_bureau, dim_prev, dim_inst, dim_cc, dim_pos]
-
-    # 2. Função interna para fazer o JOIN garantindo a integridade
-    def merge_to_obt(fact_df, fact_name):
-        print(f"\n Montando OBT para: {fact_name}...")
-        obt = fact_df.copy()
-        
-        # Sequência de LEFT JOINs usando SK_ID_CURR
-        for dim in dimensions:
-            # Obtém o nome da primeira coluna (excluindo sk_id_curr) para log
-            dim_prefix = dim.columns[1].split('_')[0] if len(dim.columns) > 1 else "DIM"
-            print(f"      -> Fazendo JOIN com Dimensão: {dim_prefix}")
-            obt = obt.merge(dim, on='sk_id_curr', how='left')
-            
-        return obt
+    dimensions = [read_dimension(f, dim_columns) for f in DIMENSION_FILES]
+
+    # 2. Estratégia de JOIN (alinhamento posicional por padrão)
+    if join is None:
+        join = OBT_JOIN_STRATEGY
+    build = align_to_obt if join == "aligned" else merge_to_obt
 
     # 3. Processando Treino
-    fact_train = pd.read_parquet(os.path.join(SILVER_PATH, "fact_application_train.parquet"))
-    obt_train = merge_to_obt(fact_train, "Treino (Com Target)")
+    fact_train = read_parquet(os.path.join(SILVER_PATH, "fact_application_train.parquet"))
+    obt_train = build(fact_train, "Treino (Com Target)", dimensions)
     save_atomic_parquet(obt_train, "analytics_credit_risk_train.parquet")
+    save_partitioned(obt_train, "analytics_credit_risk_train")
+    save_feature_store(obt_train, "analytics_credit_risk_train")
+    save_model_matrix(obt_train, "analytics_credit_risk_train")
+    save_samples("analytics_credit_risk_train")
+    save_risk_cube(obt_train)
+    del fact_train, obt_train  # pico de memória ~ uma OBT por vez
 
     # 4. Processar Teste
-    fact_test = pd.read_parquet(os.path.join(SILVER_PATH, "fact_application_test.parquet"))
-    obt_test = merge_to_obt(fact_test, "Teste (Sem Target)")
+    fact_test = read_parquet(os.path.join(SILVER_PATH, "fact_application_test.parquet"))
+    obt_test = build(fact_test, "Teste (Sem Target)", dimensions)
     save_atomic_parquet(obt_test, "analytics_credit_risk_test.parquet")
+    save_partitioned(obt_test, "analytics_credit_risk_test")
+    save_feature_store(obt_test, "analytics_credit_risk_test")
+    save_model_matrix(obt_test, "analytics_credit_risk_test")
+    save_samples("analytics_credit_risk_test")
 
     print("\n Camada Ouro concluída!")
 
+def _join_dtype(dim_values, fact_keys, dim_keys):
+    """dtype que o LEFT JOIN dá à coluna: o da dimensão, ou promovido se falta algum cliente."""
+    if np.isin(fact_keys, dim_keys).all():
+        return dim_values.dtype
+    values = dim_values.array if is_extension_array_dtype(dim_values.dtype) else dim_values.to_numpy()
+    return take(values[:0], np.array([-1]), allow_fill=True).dtype
+
+def upsert_obt(ids):
+    """
+    Atualiza na Gold só as linhas dos clientes `ids` (dimensões alteradas por deltas,
+    ver src/incremental.py): remonta essas linhas a partir do fato e das dimensões
+    Silver, substitui-as na OBT de treino e de teste e recalcula o cubo de risco.
+    Os dtypes seguem os de uma reconstrução completa (promoção int -> float apenas se
+    algum cliente do fato continuar sem linha na dimensão).
+    """
+    ids = np.asarray(ids)
+    if len(ids) == 0:
+        return
+    filters = [('sk_id_curr', 'in', ids.tolist())]
+    for fact_name, filename in (("fact_application_train", "analytics_credit_risk_train"),
+                                ("fact_application_test", "analytics_credit_risk_test")):
+        fact_path = os.path.join(SILVER_PATH, f"{fact_name}.parquet")
+        gold_path = os.path.join(GOLD_PATH, f"{filename}.parquet")
+        obt = read_parquet(gold_path)
+        dim_columns = set(obt.columns)
+        dimensions = [read_dimension(f, dim_columns) for f in DIMENSION_FILES]
+
+        with span(f"upsert:{filename}", rows_in=len(ids)) as event:
+            fact_rows = read_parquet(fact_path, filters=filters)
+            new_rows = align_to_obt(fact_rows, f"{fact_name} ({len(fact_rows)} clientes)", dimensions)
+            new_rows = new_rows[obt.columns]
+            for col in obt.columns:
+                if isinstance(obt[col].dtype, pd.CategoricalDtype):
+                    new_rows[col] = new_rows[col].astype(obt[col].dtype)
+            keep = ~obt['sk_id_curr'].isin(ids).to_numpy()
+            obt = pd.concat([obt[keep], new_rows], ignore_index=True)
+            obt = obt.sort_values('sk_id_curr', kind='stable', ignore_index=True)
+
+            fact_keys = obt['sk_id_curr'].to_numpy()
+            for dim in dimensions:
+                dim_keys = dim['sk_id_curr'].to_numpy()
+                for col in dim.columns.drop('sk_id_curr'):
+                    dtype = _join_dtype(dim[col], fact_keys, dim_keys)
+                    if obt[col].dtype != dtype:
+                        obt[col] = obt[col].astype(dtype)
+            event["rows_out"] = len(new_rows)
+
+        save_atomic_parquet(obt, f"{filename}.parquet")
+        save_partitioned(obt, filename)
+        save_feature_store(obt, filename)
+        save_model_matrix(obt, filename)
+        save_samples(filename)
+        if fact_name == "fact_application_train":
+            save_risk_cube(obt)
+        del obt
+
 if __name__ == "__main__":
     build_obt()
\ No newline at end of file
@@ -0,0 +1,291 @@
+"""
+Benchmark do pipeline sobre dados sintéticos (src/synthetic_data.py).
+Gera a camada Raw na escala pedida, roda cada etapa do DAG (ingestão, fato, cada
+dimensão e OBT) num processo novo e registra tempo, pico de RSS, linhas/s e bytes
+gravados num histórico JSON. Falha (exit 1) quando alguma etapa piora além do
+limite em relação à mediana das últimas execuções na mesma escala. Uso:
+
+    python -m src.benchmark --scale 0.01 --threshold 0.25
+    python -m src.benchmark --scale 0.1 --compare-aggregation
+    python -m src.benchmark --scale 0.1 --compare-codecs
+
+Com --compare-aggregation, também compara os motores de agregação das dimensões
+(pandas groupby().agg() x reduções por segmento do NumPy) sobre a Bronze gerada.
+Com --compare-codecs, regrava os Parquet de cada camada com cada configuração de
+escrita (CODEC_SETTINGS) e mede vazão de escrita e de leitura e tamanho em disco.
+"""
+import argparse
+import importlib
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from src.config import BENCHMARK_HISTORY_PATH, BENCHMARK_REGRESSION_THRESHOLD, DATA_QUALITY
+from src.instrumentation import RUN_ID_ENV, peak_rss_mb, start_run
+from src.manifest import load_manifest, save_manifest
+from src.storage import read_parquet, write_options, write_parquet
+from src.synthetic_data import generate
+
+# Variações menores que isso (s) são tratadas como ruído, qualquer que seja o limite
+MIN_REGRESSION_SECONDS = 0.5
+BASELINE_RUNS = 5
+
+# Configurações de escrita comparadas por --compare-codecs (ver storage.write_options)
+CODEC_SETTINGS = {
+    "snappy": {"codec": "snappy"},
+    "snappy-sem-dict": {"codec": "snappy", "dictionary": False},
+    "lz4": {"codec": "lz4"},
+    "zstd-1": {"codec": "zstd", "level": 1},
+    "zstd-3": {"codec": "zstd", "level": 3},
+    "zstd-9": {"codec": "zstd", "level": 9},
+    "zstd-3-rg64k": {"codec": "zstd", "level": 3, "row_group_size": 65_536},
+    "gzip": {"codec": "gzip"},
+    "none": {"codec": "none"},
+}
+
+
+def _parquet_rows(paths):
+    return sum(pq.read_metadata(p).num_rows for p in paths if p.endswith(".parquet") and os.path.exists(p))
+
+
+def _measure_stage(name):
+    """Roda uma etapa do DAG (no processo filho) e devolve suas métricas."""
+    from src.pipeline import build_stages
+    from src.scheduler import run_stage
+
+    stage = next(s for s in build_stages(force=True) if s.name == name)
+    elapsed = run_stage(stage)
+    rows_out = _parquet_rows(stage.outputs)
+    # Entradas CSV (ingestão) não têm contagem barata: usa as linhas gravadas
+    rows_in = _parquet_rows(stage.inputs) or rows_out
+    return {
+        "elapsed": elapsed,
+        "peak_rss_mb": peak_rss_mb(),
+        "rows_in": rows_in,
+        "rows_out": rows_out,
+        "rows_per_s": rows_in / elapsed if elapsed else None,
+        "output_bytes": sum(os.path.getsize(p) for p in stage.outputs if os.path.exists(p)),
+    }
+
+
+def layer_env(workdir):
+    """Variáveis de ambiente que apontam as camadas (e as métricas) para dentro de `workdir`."""
+    return {
+        "RAW_DATA_PATH": os.path.join(workdir, "raw"),
+        "BRONZE_DATA_PATH": os.path.join(workdir, "bronze"),
+        "SILVER_DATA_PATH": os.path.join(workdir, "silver"),
+        "GOLD_DATA_PATH": os.path.join(workdir, "gold"),
+        "METRICS_PATH": os.path.join(workdir, "_metrics.jsonl"),
+        "QUALITY_REPORT_PATH": os.path.join(workdir, "_quality_report.json"),
+    }
+
+
+def run_stages_measured(workdir):
+    """
+    Executa as etapas em ordem topológica, cada uma num processo novo (spawn), para
+    que o pico de RSS seja o da etapa e a configuração seja lida com as camadas de
+    `workdir`. Retorna {etapa: métricas}.
+    """
+    from src.pipeline import DIMENSIONS
+    names = ["ingestao", "fato_application", *DIMENSIONS, *(["qualidade"] if DATA_QUALITY else []), "obt"]
+
+    env = layer_env(workdir)
+    saved = {key: os.environ.get(key) for key in [*env, RUN_ID_ENV]}
+    os.environ.update(env)
+    start_run(env["METRICS_PATH"])
+    try:
+        results = {}
+        for name in names:
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                results[name] = pool.submit(_measure_stage, name).result()
+            print(f"[BENCH] {name}: {results[name]['elapsed']:.2f}s")
+        return results
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+def find_regressions(history, run, threshold, window=BASELINE_RUNS):
+    """
+    Compara tempo e pico de RSS de cada etapa com a mediana das últimas `window`
+    execuções sem regressão na mesma escala. Retorna mensagens (vazio = ok).
+    """
+    previous = [r for r in history if r["scale"] == run["scale"] and not r.get("regressions")][-window:]
+    messages = []
+    for stage, metrics in run["stages"].items():
+        for metric, slack in (("elapsed", MIN_REGRESSION_SECONDS), ("peak_rss_mb", 0.0)):
+            past = [r["stages"][stage][metric] for r in previous
+                    if stage in r["stages"] and r["stages"][stage].get(metric) is not None]
+            current = metrics.get(metric)
+            if not past or current is None:
+                continue
+            baseline = statistics.median(past)
+            if current > baseline * (1 + threshold) and current - baseline > slack:
+                messages.append(f"{stage}: {metric} {current:.2f} vs {baseline:.2f} "
+                                f"(+{(current / baseline - 1) * 100:.0f}%)")
+    return messages
+
+
+def compare_aggregation(workdir, repeat=3):
+    """
+    Tempo (melhor de `repeat`) de cada agregador de dimensão com os dois motores,
+    sobre a Bronze de `workdir`, conferindo que os resultados coincidem.
+    Retorna {dimensão: {"pandas": s, "numpy": s, "rows": n}}.
+    """
+    dims = importlib.import_module("src.02b_transform_dimensions")
+    aggregators = {
+        "previous_application": dims.aggregate_previous_application,
+        "installments_payments": dims.aggregate_installments,
+        "credit_card_balance": dims.aggregate_credit_card,
+        "pos_cash_balance": dims.aggregate_pos_cash,
+    }
+    bronze = layer_env(workdir)["BRONZE_DATA_PATH"]
+    results = {}
+    for name, aggregate in aggregators.items():
+        df = read_parquet(os.path.join(bronze, f"{name}.parquet"), **dims.BRONZE_READS[name])
+        outputs, timings = {}, {}
+        for engine in ("pandas", "numpy"):
+            best = None
+            for _ in range(repeat):
+                frame = df.copy()
+                start = time.perf_counter()
+                outputs[engine] = aggregate(frame, engine=engine)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            timings[engine] = best
+        pd.testing.assert_frame_equal(outputs["numpy"], outputs["pandas"], check_exact=False, rtol=1e-5)
+        results[name] = {**timings, "rows": len(df)}
+    return results
+
+
+def format_aggregation(results):
+    lines = [f"{'Dimensão':<24} {'Linhas':>10} {'pandas (s)':>11} {'numpy (s)':>10} {'Ganho':>7}"]
+    for name, r in results.items():
+        lines.append(f"{name:<24} {r['rows']:>10,} {r['pandas']:>11.3f} {r['numpy']:>10.3f} "
+                     f"{r['pandas'] / r['numpy']:>6.1f}x")
+    return "\n".join(lines)
+
+
+def compare_codecs(workdir, settings=None, repeat=3):
+    """
+    Regrava os Parquet de cada camada de `workdir` com cada configuração de escrita
+    (`settings`, padrão CODEC_SETTINGS; demais opções vêm da camada) e mede, somando os
+    arquivos da camada, vazão de escrita e de leitura (MB/s sobre os bytes em memória,
+    melhor de `repeat`) e tamanho em disco.
+    Retorna {camada: {configuração: {"write_mb_s", "read_mb_s", "size_mb", "memory_mb"}}}.
+    """
+    settings = settings or CODEC_SETTINGS
+    env = layer_env(workdir)
+    results = {}
+    for layer in ("bronze", "silver", "gold"):
+        directory = env[f"{layer.upper()}_DATA_PATH"]
+        paths = sorted(os.path.join(directory, f) for f in os.listdir(directory) if f.endswith(".parquet")) \
+            if os.path.isdir(directory) else []
+        if not paths:
+            continue
+        tables = [pq.read_table(p) for p in paths]
+        memory = sum(t.nbytes for t in tables)
+        results[layer] = {}
+        with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+            for label, overrides in settings.items():
+                options = write_options(layer, **overrides)
+                write_s = read_s = size = 0
+                for i, table in enumerate(tables):
+                    target = os.path.join(tmp, f"{i}.parquet")
+                    best_write = best_read = None
+                    for _ in range(repeat):
+                        start = time.perf_counter()
+                        size_i = write_parquet(table, target, **options)
+                        elapsed = time.perf_counter() - start
+                        best_write = elapsed if best_write is None else min(best_write, elapsed)
+                        start = time.perf_counter()
+                        pq.read_table(target)
+                        elapsed = time.perf_counter() - start
+                        best_read = elapsed if best_read is None else min(best_read, elapsed)
+                    write_s, read_s, size = write_s + best_write, read_s + best_read, size + size_i
+                results[layer][label] = {
+                    "write_mb_s": memory / 1024**2 / write_s, "read_mb_s": memory / 1024**2 / read_s,
+                    "size_mb": size / 1024**2, "memory_mb": memory / 1024**2,
+                }
+    return results
+
+
+def format_codecs(results):
+    lines = [f"{'Camada':<8} {'Configuração':<16} {'Disco (MB)':>11} {'Razão':>7} "
+             f"{'Escrita MB/s':>13} {'Leitura MB/s':>13}"]
+    for layer, by_setting in results.items():
+        for label, r in by_setting.items():
+            lines.append(f"{layer:<8} {label:<16} {r['size_mb']:>11.1f} {r['memory_mb'] / r['size_mb']:>6.1f}x "
+                         f"{r['write_mb_s']:>13.0f} {r['read_mb_s']:>13.0f}")
+    return "\n".join(lines)
+
+
+def format_run(run):
+    lines = [f"{'Etapa':<20} {'Tempo (s)':>10} {'RSS (MB)':>10} {'Linhas/s':>12} {'Saída (MB)':>11}"]
+    for name, m in run["stages"].items():
+        rss = f"{m['peak_rss_mb']:.0f}" if m["peak_rss_mb"] is not None else "-"
+        rate = f"{m['rows_per_s']:,.0f}" if m["rows_per_s"] else "-"
+        lines.append(f"{name:<20} {m['elapsed']:>10.2f} {rss:>10} {rate:>12} "
+                     f"{m['output_bytes'] / 1024**2:>11.1f}")
+    return "\n".join(lines)
+
+
+def run_benchmark(scale=0.01, workdir="data/benchmark", history_path=None, threshold=None, seed=42):
+    """
+    Gera os dados, mede as etapas, grava a execução no histórico e devolve
+    (execução, regressões).
+    """
+    history_path = history_path or BENCHMARK_HISTORY_PATH
+    threshold = BENCHMARK_REGRESSION_THRESHOLD if threshold is None else threshold
+
+    print(f"Gerando dados sintéticos (escala {scale})...")
+    generate(layer_env(workdir)["RAW_DATA_PATH"], scale=scale, seed=seed)
+
+    run = {"timestamp": time.time(), "scale": scale, "seed": seed,
+           "stages": run_stages_measured(workdir)}
+    history = load_manifest(history_path).get("runs", [])
+    run["regressions"] = find_regressions(history, run, threshold)
+
+    os.makedirs(os.path.dirname(history_path) or ".", exist_ok=True)
+    save_manifest({"runs": history + [run]}, history_path)
+    return run, run["regressions"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark das etapas do pipeline com dados sintéticos")
+    parser.add_argument("--scale", type=float, default=0.01, help="Escala dos dados (ex.: 0.01, 1, 10)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workdir", default="data/benchmark",
+                        help="Pasta das camadas do benchmark (padrão: data/benchmark)")
+    parser.add_argument("--history", default=None,
+                        help="Histórico JSON (padrão: BENCHMARK_HISTORY_PATH)")
+    parser.add_argument("--threshold", type=float, default=None,
+                        help="Piora relativa tolerada (padrão: BENCHMARK_REGRESSION_THRESHOLD)")
+    parser.add_argument("--compare-aggregation", action="store_true",
+                        help="Compara os motores de agregação das dimensões (pandas x numpy)")
+    parser.add_argument("--compare-codecs", action="store_true",
+                        help="Compara codecs/opções de escrita Parquet em cada camada")
+    args = parser.parse_args()
+
+    run, regressions = run_benchmark(args.scale, args.workdir, args.history, args.threshold, args.seed)
+    print("\n" + format_run(run))
+    if args.compare_aggregation:
+        print("\n" + format_aggregation(compare_aggregation(args.workdir)))
+    if args.compare_codecs:
+        print("\n" + format_codecs(compare_codecs(args.workdir)))
+    if regressions:
+        print("\nREGRESSÕES:")
+        for message in regressions:
+            print(f"  - {message}")
+        sys.exit(1)
+    print("\nSem regressões.")
@@ -14,6 +14,98 @@ BRONZE_PATH = os.getenv("BRONZE_DATA_PATH", "data/bronze")
 SILVER_PATH = os.getenv("SILVER_DATA_PATH", "data/silver")
 GOLD_PATH = os.getenv("GOLD_DATA_PATH", "data/gold")
 
+# Ingestão em streaming: linhas lidas do CSV por lote (cada lote vira um row group).
+# Limita o pico de memória pelo tamanho do lote, e não pelo tamanho do arquivo.
+# Valor <= 0 desativa o streaming (leitura do CSV inteiro de uma vez).
+INGESTION_BATCH_SIZE = int(os.getenv("INGESTION_BATCH_SIZE", "500000"))
+
+# Ingestão paralela: número de processos (1 = sequencial).
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", "1"))
+# Limite de tabelas gigantes (bureau_balance, installments) lidas ao mesmo tempo.
+# 0 = automático: 1 a cada INGESTION_LARGE_FILE_MEMORY_GB de RAM física.
+INGESTION_MAX_LARGE_PARALLEL = int(os.getenv("INGESTION_MAX_LARGE_PARALLEL", "0"))
+INGESTION_LARGE_FILE_MEMORY_GB = float(os.getenv("INGESTION_LARGE_FILE_MEMORY_GB", "8"))
+
+# Orquestração (src/pipeline.py): processos para etapas independentes (1 = sequencial)
+# e arquivo com a versão de código da última execução bem-sucedida de cada etapa.
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "1"))
+PIPELINE_STATE_PATH = os.getenv("PIPELINE_STATE_PATH", "data/_pipeline_state.json")
+
+# Dimensões out-of-core (02b): nº de partições por hash de sk_id_curr (<= 1 = tudo em
+# memória) e processos que agregam as partições em paralelo.
+DIMENSIONS_PARTITIONS = int(os.getenv("DIMENSIONS_PARTITIONS", "0"))
+DIMENSIONS_PARTITION_WORKERS = int(os.getenv("DIMENSIONS_PARTITION_WORKERS", "1"))
+
+# Fato application (02): "two_pass" (primeira passada projetada fixa dtypes, duplicatas
+# e vocabulários; a segunda transforma e grava train/test por lotes de
+# APPLICATION_BATCH_SIZE linhas) ou "concat" (train + test concatenados em memória).
+APPLICATION_TRANSFORM_MODE = os.getenv("APPLICATION_TRANSFORM_MODE", "two_pass")
+APPLICATION_BATCH_SIZE = int(os.getenv("APPLICATION_BATCH_SIZE", "50000"))
+
+# Estado incremental das dimensões (1 = grava, em SILVER/_state, somas, contagens,
+# min/max e pares distintos por cliente, usados por `src.incremental` para aplicar
+# deltas da Bronze sem reprocessar o histórico).
+DIMENSIONS_STATE = os.getenv("DIMENSIONS_STATE", "0") == "1"
+
+# Montagem da OBT (03): "aligned" (take posicional sobre sk_id_curr ordenado) ou
+# "merge" (sequência de LEFT JOINs do pandas).
+OBT_JOIN_STRATEGY = os.getenv("OBT_JOIN_STRATEGY", "aligned")
+
+# Store de features para consultas por sk_id_curr (src/feature_store.py): 1 = a
+# montagem da OBT grava também um Arrow IPC ordenado por cliente ao lado de cada OBT.
+FEATURE_STORE = os.getenv("FEATURE_STORE", "0") == "1"
+
+# Exportação pronta para treino (src/model_export.py): 1 = a montagem da OBT grava
+# também matriz float32 por coluna, códigos das categóricas, ids e target em .npy.
+MODEL_EXPORT = os.getenv("MODEL_EXPORT", "0") == "1"
+
+# Amostras estratificadas da OBT (src/gold_sample.py): tamanhos separados por vírgula
+# (vazio = desativado), um `<obt>.sample_<n>.parquet` por tamanho, e semente do hash
+# que sorteia os clientes (mesma semente = mesma amostra).
+GOLD_SAMPLE_SIZES = [int(n) for n in os.getenv("GOLD_SAMPLE_SIZES", "50000").split(",") if n.strip()]
+GOLD_SAMPLE_SEED = int(os.getenv("GOLD_SAMPLE_SEED", "42"))
+
+# Agregações das dimensões (02b): "numpy" (reduções por segmento sobre uma ordenação
+# por sk_id_curr, src/segment_agg.py) ou "pandas" (groupby().agg()).
+AGGREGATION_ENGINE = os.getenv("AGGREGATION_ENGINE", "numpy")
+
+# Layout particionado opcional da Gold: chaves de partição hive (vírgula; vazio =
+# desativado), ordenação dentro de cada partição e linhas por row group.
+GOLD_PARTITION_COLS = [c for c in os.getenv("GOLD_PARTITION_COLS", "").split(",") if c.strip()]
+GOLD_SORT_COLS = [c for c in os.getenv("GOLD_SORT_COLS", "sk_id_curr").split(",") if c.strip()]
+GOLD_ROW_GROUP_SIZE = int(os.getenv("GOLD_ROW_GROUP_SIZE", "65536"))
+
+# Escrita Parquet por camada (src/storage.write_parquet): opções separadas por espaço,
+# ex.: PARQUET_GOLD_OPTIONS="codec=zstd level=3 row_group_size=65536 sort_by=sk_id_curr".
+# Opções: codec (snappy, zstd, lz4, gzip, brotli, none), level, dictionary (0/1),
+# row_group_size, statistics (0/1) e sort_by. Vazio = snappy com dicionário e estatísticas.
+PARQUET_WRITE_OPTIONS = {
+    layer: os.getenv(f"PARQUET_{layer.upper()}_OPTIONS", "") for layer in ("bronze", "silver", "gold")
+}
+
+# Qualidade de dados (src/data_quality.py): etapa entre a Silver e a Gold (0 =
+# desativada) e relatório JSON com o resultado de cada regra.
+DATA_QUALITY = os.getenv("DATA_QUALITY", "1") == "1"
+QUALITY_REPORT_PATH = os.getenv("QUALITY_REPORT_PATH", "data/_quality_report.json")
+
+# Cache de camadas em memória (src/layer_cache.py) durante `src.pipeline`: MB de
+# tabelas Arrow recém-gravadas mantidas para as etapas seguintes (0 = desativado).
+# Vale só para etapas que rodam no processo principal (PIPELINE_WORKERS=1).
+LAYER_CACHE_MB = float(os.getenv("LAYER_CACHE_MB", "0"))
+
+# Benchmark (src/benchmark.py): histórico das execuções e piora relativa tolerada
+# por etapa (tempo e pico de RSS) antes de falhar.
+BENCHMARK_HISTORY_PATH = os.getenv("BENCHMARK_HISTORY_PATH", "data/_benchmark_history.json")
+BENCHMARK_REGRESSION_THRESHOLD = float(os.getenv("BENCHMARK_REGRESSION_THRESHOLD", "0.25"))
+
+# Instrumentação (src/instrumentation.py): eventos JSON-lines por etapa/operação
+# (vazio = desativado), resumo da última execução, tracemalloc (1 = ligado; tem custo)
+# e pasta para dumps do cProfile por etapa (vazio = desativado).
+METRICS_PATH = os.getenv("METRICS_PATH", "data/_metrics.jsonl")
+METRICS_REPORT_PATH = os.getenv("METRICS_REPORT_PATH", "data/_run_report.json")
+METRICS_TRACEMALLOC = os.getenv("METRICS_TRACEMALLOC", "0") == "1"
+PROFILE_DIR = os.getenv("PROFILE_DIR", "")
+
 
 def get_ingestion_paths():
     """Retorna (raw_path, bronze_path) para ingestão. Exige RAW e BRONZE configurados."""
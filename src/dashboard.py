@@ -2,6 +2,16 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import os
+import sys
+
+# Permite `streamlit run src/dashboard.py` importar os módulos de src/
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.config import GOLD_PATH
+from src import filter_index, risk_cube
+from src.dashboard_data import load_index, load_table, top_rows
 
 # ==============================================================================
 # 1. CONFIGURAÇÃO DA PÁGINA E CARGA DE DADOS
@@ -12,26 +22,27 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+DETAIL_COLUMNS = ['sk_id_curr', 'target', 'amt_income_total', 'name_contract_type',
+                  'name_education_type', 'ext_source_mean']
+
 # Cache para performance
 @st.cache_data
-def load_data():
-    path = os.path.join("data", "gold", "analytics_credit_risk_train.parquet")
-    
+def load_cube():
+    # Cubo de agregados (Fase 3): KPIs e gráficos exatos sobre a população inteira
+    path = os.path.join(GOLD_PATH, "analytics_risk_cube.parquet")
+
     if not os.path.exists(path):
         return None
-    
+
     try:
-        df = pd.read_parquet(path)
-        # Amostragem de segurança para performance na web (50k linhas)
-        # Se for rodar local com máquina potente, pode aumentar ou remover.
-        return df.sample(50000, random_state=42) if len(df) > 50000 else df
+        return pd.read_parquet(path)
     except Exception as e:
         st.error(f"Erro na leitura: {e}")
         return None
 
-df = load_data()
+cube = load_cube()
 
-if df is None:
+if cube is None:
     st.error("⚠️ Arquivo de dados não encontrado. Verifique se o pipeline (Fase 3) rodou com sucesso.")
     st.stop()
 
@@ -39,8 +50,9 @@ if df is None:
 # 2. CÁLCULO DE REFERÊNCIA GLOBAL (BENCHMARK)
 # ==============================================================================
 # Calculamos os indicadores globais ANTES de qualquer filtro para comparação
-taxa_inadimplencia_global = df['target'].mean() * 100
-renda_media_global = df['amt_income_total'].mean()
+kpis_global = risk_cube.summarize(cube)
+taxa_inadimplencia_global = kpis_global['taxa_inadimplencia']
+renda_media_global = kpis_global['renda_media']
 
 # ==============================================================================
 # 3. BARRA LATERAL (FILTROS)
@@ -48,25 +60,46 @@ renda_media_global = df['amt_income_total'].mean()
 st.sidebar.header("🔍 Filtros de Segmentação")
 st.sidebar.markdown("*Selecione para filtrar. Deixe vazio para ver tudo.*")
 
-# Função auxiliar para filtro inteligente (Vazio = Todos)
-def smart_filter(df, column, selected_options):
-    if not selected_options:
-        return df
-    return df[df[column].isin(selected_options)]
+def options(column):
+    return cube[column].dropna().unique()
 
-# Inputs do Usuário
-sel_contrato = st.sidebar.multiselect("Tipo de Contrato:", df['name_contract_type'].unique())
-sel_genero = st.sidebar.multiselect("Gênero:", df['code_gender'].unique())
-sel_educacao = st.sidebar.multiselect("Nível de Educação:", df['name_education_type'].unique())
+# Índice de bitmaps sobre a OBT (compartilhado entre sessões): filtros fora do cubo
+index = load_index()
 
-# Aplicação dos Filtros
-df_filtered = df.copy()
-df_filtered = smart_filter(df_filtered, 'name_contract_type', sel_contrato)
-df_filtered = smart_filter(df_filtered, 'code_gender', sel_genero)
-df_filtered = smart_filter(df_filtered, 'name_education_type', sel_educacao)
+# Dimensões extras (só no índice): coluna -> rótulo
+EXTRA_FILTERS = {
+    'name_income_type': "Tipo de Renda:",
+    'region_rating_client': "Rating da Região:",
+}
+
+# Inputs do Usuário
+selections = {
+    'name_contract_type': st.sidebar.multiselect("Tipo de Contrato:", options('name_contract_type')),
+    'code_gender': st.sidebar.multiselect("Gênero:", options('code_gender')),
+    'name_education_type': st.sidebar.multiselect("Nível de Educação:", options('name_education_type')),
+}
+if index is not None:
+    for column, label in EXTRA_FILTERS.items():
+        if column in index.bitmaps:
+            selections[column] = st.sidebar.multiselect(label, index.values(column))
+
+# Aplicação dos Filtros (Vazio = Todos): pelas células do cubo ou, se houver filtro
+# em dimensão extra, pelos bitmaps do índice (OR dentro da coluna, AND entre colunas)
+if any(selections.get(column) for column in EXTRA_FILTERS):
+    mask = index.select(selections)
+    kpis = filter_index.summarize(index, mask)
+
+    def risco_por(dimension):
+        return filter_index.rate_by(index, dimension, mask)
+else:
+    cube_filtered = risk_cube.filter_cube(cube, selections)
+    kpis = risk_cube.summarize(cube_filtered)
+
+    def risco_por(dimension):
+        return risk_cube.rate_by(cube_filtered, dimension)
 
 # Se o filtro zerar os dados, avisa o usuário
-if df_filtered.empty:
+if kpis['n_clientes'] == 0:
     st.warning("⚠️ Nenhum dado encontrado para essa combinação de filtros.")
     st.stop()
 
@@ -80,10 +113,10 @@ st.markdown("---")
 # Métricas Principais
 col1, col2, col3, col4 = st.columns(4)
 
-curr_inadimplencia = df_filtered['target'].mean() * 100
-curr_renda = df_filtered['amt_income_total'].mean()
-curr_idade = df_filtered['years_birth'].mean()
-total_clientes = len(df_filtered)
+curr_inadimplencia = kpis['taxa_inadimplencia']
+curr_renda = kpis['renda_media']
+curr_idade = kpis['idade_media']
+total_clientes = kpis['n_clientes']
 
 # Delta: Diferença entre o filtro atual e a média global da empresa
 delta_inad = curr_inadimplencia - taxa_inadimplencia_global
@@ -122,19 +155,11 @@ with c1:
     st.subheader("1. Inadimplência por Faixa de Renda")
     st.caption("Insight: Renda maior está associada a menor risco? (Divisão em Quintis)")
     
-    try:
-        # Criação dos Quintis (E=Pobres, A=Ricos)
-        df_filtered['faixa_renda'] = pd.qcut(
-            df_filtered['amt_income_total'], 
-            q=5, 
-            labels=['E (Menor Renda)', 'D', 'C', 'B', 'A (Maior Renda)'],
-            duplicates='drop'
-        )
-        
-        # Agrupamento
-        risco_renda = df_filtered.groupby('faixa_renda', observed=True)['target'].mean().reset_index()
-        risco_renda['target'] = risco_renda['target'] * 100 # Para %
-        
+    # Quintis calculados sobre a população inteira (E=Pobres, A=Ricos)
+    risco_renda = risco_por('faixa_renda')
+    if risco_renda.empty:
+        st.info("Dados insuficientes no filtro para calcular quintis de renda.")
+    else:
         fig_renda = px.bar(
             risco_renda, x='faixa_renda', y='target',
             labels={'target': 'Taxa de Inadimplência (%)', 'faixa_renda': 'Classe Social'},
@@ -143,15 +168,12 @@ with c1:
         )
         fig_renda.update_layout(yaxis_title="Inadimplência (%)")
         st.plotly_chart(fig_renda, use_container_width=True)
-    except:
-        st.info("Dados insuficientes no filtro para calcular quintis de renda.")
 
 with c2:
     st.subheader("2. Risco por Tipo de Contrato")
     st.caption("Insight: 'Cash Loans' (Dinheiro Vivo) são mais arriscados?")
     
-    risco_contrato = df_filtered.groupby('name_contract_type', observed=True)['target'].mean().reset_index()
-    risco_contrato['target'] = risco_contrato['target'] * 100
+    risco_contrato = risco_por('name_contract_type')
     
     # Tradução Visual
     risco_contrato['name_contract_type'] = risco_contrato['name_contract_type'].replace({
@@ -175,13 +197,8 @@ with c3:
     st.subheader("3. Risco por Faixa Etária")
     st.caption("Insight: Clientes mais velhos pagam melhor? (Bins: 20-30, 30-40...)")
     
-    # Criação de Bins de Idade conforme o relatório
-    bins = [20, 30, 40, 50, 60, 100]
-    labels = ['20-30 anos', '31-40 anos', '41-50 anos', '51-60 anos', '60+ anos']
-    df_filtered['faixa_etaria'] = pd.cut(df_filtered['years_birth'], bins=bins, labels=labels)
-    
-    risco_idade = df_filtered.groupby('faixa_etaria', observed=True)['target'].mean().reset_index()
-    risco_idade['target'] = risco_idade['target'] * 100
+    # Bins de Idade conforme o relatório (pré-calculados no cubo)
+    risco_idade = risco_por('faixa_etaria')
     
     fig_idade = px.line(
         risco_idade, x='faixa_etaria', y='target', markers=True,
@@ -195,18 +212,11 @@ with c4:
     st.subheader("4. Validação: Score Externo")
     st.caption("Insight: A feature 'ext_source_mean' realmente prevê o risco?")
     
-    try:
-        # Quartis do Score Externo
-        df_filtered['score_quartil'] = pd.qcut(
-            df_filtered['ext_source_mean'], 
-            q=4, 
-            labels=['Q1 (Score Baixo/Ruim)', 'Q2', 'Q3', 'Q4 (Score Alto/Bom)'],
-            duplicates='drop'
-        )
-        
-        risco_score = df_filtered.groupby('score_quartil', observed=True)['target'].mean().reset_index()
-        risco_score['target'] = risco_score['target'] * 100
-        
+    # Quartis do Score Externo (limites da população inteira)
+    risco_score = risco_por('score_quartil')
+    if risco_score.empty:
+        st.info("Score externo indisponível para este filtro.")
+    else:
         fig_score = px.bar(
             risco_score, x='score_quartil', y='target',
             labels={'target': 'Inadimplência Real (%)', 'score_quartil': 'Quartil do Score'},
@@ -215,13 +225,14 @@ with c4:
         )
         fig_score.update_layout(yaxis_title="Inadimplência (%)")
         st.plotly_chart(fig_score, use_container_width=True)
-    except:
-        st.info("Score externo indisponível para este filtro.")
 
 # --- RODAPÉ: DADOS BRUTOS ---
 with st.expander("📋 Ver Amostra dos Dados (Tabela Detalhada)"):
-    st.dataframe(
-        df_filtered[['sk_id_curr', 'target', 'amt_income_total', 'name_contract_type', 'name_education_type', 'ext_source_mean']]
-        .sort_values(by='amt_income_total', ascending=False)
-        .head(100)
-    )
\ No newline at end of file
+    # Tabela Arrow compartilhada entre sessões (memory map), sem amostragem nem cópias;
+    # só as linhas do bitmap selecionado são consideradas
+    table = load_table()
+    if table is None:
+        st.info("OBT de treino não encontrada.")
+    else:
+        rows = index.row_ids(index.select(selections))
+        st.dataframe(top_rows(table, rows, sort_by='amt_income_total', k=100, columns=DETAIL_COLUMNS))
@@ -0,0 +1,150 @@
+"""
+Acesso a dados do dashboard.
+A OBT de treino é projetada só nas colunas que o app usa, com tipos compactos
+(dictionary para textos, float32 para medidas), e gravada uma vez como Arrow IPC
+sem compressão ao lado do Parquet. O arquivo é aberto por memory map e a tabela
+fica num cache do processo compartilhado (somente leitura) por todas as sessões:
+nada é copiado ou serializado por sessão, e as páginas vêm do cache do SO.
+Sobre a tabela é mantido um índice de bitmaps dos filtros (ver src/filter_index.py).
+"""
+import os
+import threading
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.config import GOLD_PATH
+from src.filter_index import build_index
+from src.manifest import load_manifest
+from src.risk_cube import compute_bins
+
+DASHBOARD_SOURCE = "analytics_credit_risk_train.parquet"
+CUBE_BINS = "analytics_risk_cube_bins.json"
+
+# Colunas de filtro com bitmap no índice (novas dimensões: basta incluí-las aqui
+# e em DASHBOARD_COLUMNS)
+FILTER_COLUMNS = [
+    'name_contract_type', 'code_gender', 'name_education_type',
+    'name_income_type', 'region_rating_client',
+]
+
+# Colunas usadas pelo app -> tipo compacto
+DASHBOARD_COLUMNS = {
+    'sk_id_curr': pa.int32(),
+    'target': pa.int8(),
+    'amt_income_total': pa.float32(),
+    'years_birth': pa.float32(),
+    'ext_source_mean': pa.float32(),
+    'name_contract_type': pa.dictionary(pa.int32(), pa.string()),
+    'code_gender': pa.dictionary(pa.int32(), pa.string()),
+    'name_education_type': pa.dictionary(pa.int32(), pa.string()),
+    'name_income_type': pa.dictionary(pa.int32(), pa.string()),
+    'region_rating_client': pa.int8(),
+}
+
+_tables = {}
+_indexes = {}
+_lock = threading.Lock()
+
+
+def cache_path(source_path):
+    """Arquivo Arrow IPC derivado do Parquet (ex.: analytics_..._train.dashboard.arrow)."""
+    return os.path.splitext(source_path)[0] + ".dashboard.arrow"
+
+
+def build_cache(source_path, target_path=None):
+    """
+    Lê só as colunas do dashboard (as que existirem), converte para os tipos
+    compactos e grava o IPC de forma atômica (.tmp + os.replace).
+    """
+    target_path = target_path or cache_path(source_path)
+    available = set(pq.read_schema(source_path).names)
+    columns = [c for c in DASHBOARD_COLUMNS if c in available]
+    table = pq.read_table(source_path, columns=columns)
+    table = pa.table(
+        [table.column(c).cast(DASHBOARD_COLUMNS[c]) for c in columns], names=columns
+    )
+
+    temp_path = target_path + ".tmp"
+    try:
+        with pa.OSFile(temp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(temp_path, target_path)
+    except Exception as e:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise e
+    return target_path
+
+
+def is_stale(source_path, target_path):
+    return (not os.path.exists(target_path)
+            or os.path.getmtime(target_path) < os.path.getmtime(source_path))
+
+
+def load_table(source_path=None):
+    """
+    Tabela Arrow do dashboard (memory-mapped), única por processo. O cache IPC é
+    (re)gerado quando não existe ou é mais antigo que a Gold; None se a Gold não existir.
+    """
+    source_path = source_path or os.path.join(GOLD_PATH, DASHBOARD_SOURCE)
+    if not os.path.exists(source_path):
+        return None
+
+    key = (os.path.abspath(source_path), os.path.getmtime(source_path))
+    with _lock:
+        if key not in _tables:
+            target_path = cache_path(source_path)
+            if is_stale(source_path, target_path):
+                build_cache(source_path, target_path)
+            with pa.memory_map(target_path, "r") as source:
+                table = pa.ipc.open_file(source).read_all()
+            # Versões anteriores do mesmo arquivo deixam de ser referenciadas
+            for old in [k for k in _tables if k[0] == key[0]]:
+                del _tables[old]
+            _tables[key] = table
+        return _tables[key]
+
+
+def load_index(source_path=None):
+    """
+    Índice de bitmaps da tabela do dashboard, único por processo (ver load_table).
+    As faixas usam os limites do cubo da Gold quando disponíveis, para que os
+    gráficos coincidam com os do cubo; senão são calculadas sobre a própria tabela.
+    """
+    source_path = source_path or os.path.join(GOLD_PATH, DASHBOARD_SOURCE)
+    table = load_table(source_path)
+    if table is None:
+        return None
+
+    key = (os.path.abspath(source_path), os.path.getmtime(source_path))
+    with _lock:
+        if key not in _indexes:
+            bins_path = os.path.join(os.path.dirname(source_path), CUBE_BINS)
+            bins = load_manifest(bins_path)
+            if not bins:
+                bins = compute_bins(table.select(['amt_income_total', 'ext_source_mean']).to_pandas())
+            dimensions = [c for c in FILTER_COLUMNS if c in table.column_names]
+            for old in [k for k in _indexes if k[0] == key[0]]:
+                del _indexes[old]
+            _indexes[key] = build_index(table, bins, dimensions)
+        return _indexes[key]
+
+
+def top_rows(table, rows, sort_by, k=100, columns=None):
+    """
+    As `k` linhas com maior `sort_by` entre as posições `rows` (None = todas),
+    como DataFrame: só essas k linhas são convertidas para pandas.
+    """
+    if rows is not None:
+        values = table.column(sort_by).take(pa.array(rows)).to_numpy(zero_copy_only=False)
+    else:
+        rows = np.arange(table.num_rows)
+        values = table.column(sort_by).to_numpy(zero_copy_only=False)
+    k = min(k, len(rows))
+    values = np.where(np.isnan(values), -np.inf, values)
+    top = np.argpartition(-values, k - 1)[:k] if k else np.array([], dtype=np.intp)
+    top = top[np.argsort(-values[top], kind='stable')]
+    selected = table if columns is None else table.select(columns)
+    return selected.take(pa.array(rows[top])).to_pandas()
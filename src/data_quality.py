@@ -0,0 +1,294 @@
+"""
+Qualidade de dados das camadas Bronze e Silver (etapa "qualidade" do pipeline).
+As regras são declaradas por tabela em RULES (schema, fração de nulos, faixas de
+valores, unicidade de chave e integridade referencial de sk_id_curr) e, sempre que
+possível, respondidas só pelos footers do Parquet: tipos pelo schema e nulos e
+min/max pelas estatísticas de cada row group, sem ler dados. Só quando o footer não
+decide (ex.: máximo de days_* = 365243, que pode ser o sentinela ou um valor
+inválido; unicidade; chaves órfãs) a coluna envolvida é lida em lotes, uma vez e
+sem as demais colunas. Cada resultado registra se veio do footer ou da leitura.
+
+Regras com severidade "error" que falham fazem a etapa falhar (e bloqueiam a Gold);
+"warn" só aparece no relatório (QUALITY_REPORT_PATH). Uso avulso:
+
+    python -m src.data_quality
+"""
+import fnmatch
+import functools
+import os
+import sys
+import time
+
+import numpy as np
+import pyarrow.parquet as pq
+
+from src.config import BRONZE_PATH, QUALITY_REPORT_PATH, SILVER_PATH
+from src.instrumentation import span
+from src.manifest import save_manifest
+from src.schemas import get_schema
+from src.storage import iter_batches
+
+DAYS_SENTINEL = 365243
+FACTS = [("silver", "fact_application_train"), ("silver", "fact_application_test")]
+DIMENSION_TABLES = ["dim_bureau", "dim_previous_app", "dim_installments", "dim_credit_card", "dim_pos_cash"]
+
+# (camada, tabela) -> regras. Campos: check (schema, null_ratio, range, unique,
+# references), columns (nome ou padrão fnmatch), limites da regra e severity.
+RULES = {
+    ("bronze", "application_train"): [
+        {"check": "schema", "registry": "application_train.csv"},
+        {"check": "unique", "columns": "sk_id_curr"},
+        {"check": "range", "columns": "target", "min": 0, "max": 1},
+        {"check": "range", "columns": "days_employed", "max": 0, "allow": [DAYS_SENTINEL], "severity": "warn"},
+    ],
+    ("bronze", "application_test"): [
+        {"check": "schema", "registry": "application_test.csv"},
+        {"check": "unique", "columns": "sk_id_curr"},
+        {"check": "range", "columns": "days_employed", "max": 0, "allow": [DAYS_SENTINEL], "severity": "warn"},
+    ],
+    ("bronze", "bureau"): [
+        {"check": "schema", "registry": "bureau.csv"},
+        {"check": "unique", "columns": "sk_id_bureau"},
+    ],
+    ("bronze", "bureau_balance"): [
+        {"check": "schema", "registry": "bureau_balance.csv"},
+        {"check": "range", "columns": "months_balance", "max": 0, "severity": "warn"},
+    ],
+    ("bronze", "previous_application"): [
+        {"check": "schema", "registry": "previous_application.csv"},
+        # 365243 = "data não aplicável" (tratado como nulo nas dimensões)
+        {"check": "range", "columns": "days_*", "max": 0, "allow": [DAYS_SENTINEL], "severity": "warn"},
+    ],
+    ("bronze", "installments_payments"): [
+        {"check": "schema", "registry": "installments_payments.csv"},
+        {"check": "range", "columns": "days_*", "max": 0, "severity": "warn"},
+    ],
+    ("bronze", "credit_card_balance"): [
+        {"check": "schema", "registry": "credit_card_balance.csv"},
+        # ~20% de nulos nos saques (EDA): acima disso a dimensão perde sentido
+        {"check": "null_ratio", "columns": "amt_drawings_*", "max": 0.3, "severity": "warn"},
+        {"check": "range", "columns": "months_balance", "max": 0, "severity": "warn"},
+    ],
+    ("bronze", "pos_cash_balance"): [
+        {"check": "schema", "registry": "POS_CASH_balance.csv"},
+        {"check": "range", "columns": "months_balance", "max": 0, "severity": "warn"},
+    ],
+    ("silver", "fact_application_train"): [
+        {"check": "unique", "columns": "sk_id_curr"},
+        {"check": "range", "columns": "days_employed", "max": 0},  # sentinela já tratado
+        {"check": "null_ratio", "columns": "target", "max": 0},
+    ],
+    ("silver", "fact_application_test"): [
+        {"check": "unique", "columns": "sk_id_curr"},
+        {"check": "range", "columns": "days_employed", "max": 0},
+    ],
+    **{("silver", dim): [
+        {"check": "unique", "columns": "sk_id_curr"},  # exigido pelo alinhamento da OBT
+        {"check": "references", "columns": "sk_id_curr", "parents": FACTS, "severity": "warn"},
+    ] for dim in DIMENSION_TABLES},
+}
+
+LAYER_PATHS = {"bronze": lambda: BRONZE_PATH, "silver": lambda: SILVER_PATH}
+
+
+def table_path(layer, table):
+    return os.path.join(LAYER_PATHS[layer](), f"{table}.parquet")
+
+
+def rule_inputs(rules=None):
+    """Arquivos lidos pelas regras (entradas da etapa no DAG)."""
+    return [table_path(layer, table) for layer, table in (rules or RULES)]
+
+
+def _columns(metadata, pattern):
+    names = metadata.schema.to_arrow_schema().names
+    return [c for c in names if fnmatch.fnmatch(c, pattern)]
+
+
+def _column_stats(metadata, column):
+    """
+    (nulos, min, max) da coluna combinando as estatísticas dos row groups; None no
+    que o footer não responde (row group sem estatística de nulos ou de min/max).
+    """
+    index = metadata.schema.to_arrow_schema().get_field_index(column)
+    nulls, low, high, known = 0, None, None, True
+    for i in range(metadata.num_row_groups):
+        row_group = metadata.row_group(i)
+        stats = row_group.column(index).statistics
+        if stats is None:
+            return None, None, None
+        nulls = nulls + stats.null_count if nulls is not None and stats.has_null_count else None
+        if stats.has_min_max:
+            low = stats.min if low is None else min(low, stats.min)
+            high = stats.max if high is None else max(high, stats.max)
+        elif nulls is None or stats.null_count < row_group.num_rows:
+            known = False  # há valores no row group, mas sem min/max
+    return nulls, (low if known else None), (high if known else None)
+
+
+def _scan(path, column):
+    """Valores não nulos da coluna (NumPy), lidos em lotes só com essa coluna."""
+    parts = []
+    for batch in iter_batches(path, columns=[column]):
+        values = batch.column(0)
+        parts.append(values.drop_null().to_numpy(zero_copy_only=False))
+    return np.concatenate(parts) if parts else np.array([])
+
+
+@functools.lru_cache(maxsize=8)
+def _distinct_keys(path, column, version):
+    """Chaves distintas de uma tabela pai, lidas uma vez por versão (mtime) do arquivo."""
+    return np.unique(_scan(path, column))
+
+
+def check_schema(path, metadata, rule):
+    expected = get_schema(rule["registry"])
+    schema = metadata.schema.to_arrow_schema()
+    problems = [f"{c}: ausente" for c in expected if c not in schema.names]
+    problems += [f"{c}: {schema.field(c).type} (esperado {t})" for c, t in expected.items()
+                 if c in schema.names and schema.field(c).type != t]
+    return not problems, "footer", "; ".join(problems) or f"{len(expected)} colunas conferidas"
+
+
+def check_null_ratio(path, metadata, rule, column):
+    nulls, _, _ = _column_stats(metadata, column)
+    source = "footer"
+    if nulls is None:
+        nulls = sum(b.column(0).null_count for b in iter_batches(path, columns=[column]))
+        source = "leitura"
+    ratio = nulls / metadata.num_rows if metadata.num_rows else 0.0
+    return ratio <= rule["max"], source, f"nulos {ratio:.1%} (máx. {rule['max']:.0%})"
+
+
+def check_range(path, metadata, rule, column):
+    _, low, high = _column_stats(metadata, column)
+    minimum, maximum, allow = rule.get("min"), rule.get("max"), rule.get("allow", [])
+    if low is not None or high is not None:
+        too_low = minimum is not None and low is not None and low < minimum
+        too_high = maximum is not None and high is not None and high > maximum
+        if not too_low and not too_high:
+            return True, "footer", f"[{low}, {high}]"
+        # Extremos fora da faixa que não são valores permitidos: violação comprovada
+        if (too_low and low not in allow) or (too_high and high not in allow):
+            return False, "footer", f"[{low}, {high}] fora de [{minimum}, {maximum}]"
+
+    values = _scan(path, column)
+    bad = np.zeros(len(values), dtype=bool)
+    if minimum is not None:
+        bad |= values < minimum
+    if maximum is not None:
+        bad |= values > maximum
+    if allow:
+        bad &= ~np.isin(values, allow)
+    n_allowed = int(np.isin(values, allow).sum()) if allow else 0
+    detail = f"{int(bad.sum())} fora de [{minimum}, {maximum}]"
+    if allow:
+        detail += f"; {n_allowed} com valor permitido {allow}"
+    return not bad.any(), "leitura", detail
+
+
+def check_unique(path, metadata, rule, column):
+    nulls, low, high = _column_stats(metadata, column)
+    # Mais linhas que inteiros possíveis entre min e max: há repetição (pigeonhole)
+    if low is not None and isinstance(low, (int, np.integer)) and metadata.num_rows - (nulls or 0) > high - low + 1:
+        return False, "footer", f"{metadata.num_rows} linhas para {high - low + 1} valores possíveis"
+    values = _scan(path, column)
+    if len(values) > 1 and np.all(values[1:] >= values[:-1]):
+        duplicates = int((values[1:] == values[:-1]).sum())
+    else:
+        duplicates = len(values) - len(np.unique(values))
+    return duplicates == 0, "leitura", f"{duplicates} repetidos"
+
+
+def check_references(path, metadata, rule, column):
+    parents = [table_path(layer, table) for layer, table in rule["parents"]]
+    _, low, high = _column_stats(metadata, column)
+    bounds = [_column_stats(pq.read_metadata(p), column)[1:] for p in parents]
+    max_ratio = rule.get("max_ratio", 0.0)
+    if low is not None and all(b[0] is not None for b in bounds):
+        parent_low, parent_high = min(b[0] for b in bounds), max(b[1] for b in bounds)
+        if (low < parent_low or high > parent_high) and max_ratio == 0:
+            return False, "footer", f"[{low}, {high}] fora de [{parent_low}, {parent_high}]"
+
+    keys = np.unique(np.concatenate([_distinct_keys(p, column, os.stat(p).st_mtime_ns) for p in parents]))
+    values = _scan(path, column)
+    orphans = int((~np.isin(values, keys)).sum())
+    ratio = orphans / len(values) if len(values) else 0.0
+    names = ", ".join(table for _, table in rule["parents"])
+    return ratio <= max_ratio, "leitura", f"{orphans} sem correspondência em {names} ({ratio:.2%})"
+
+
+CHECKS = {
+    "null_ratio": check_null_ratio,
+    "range": check_range,
+    "unique": check_unique,
+    "references": check_references,
+}
+
+
+def run_checks(rules=None):
+    """Avalia as regras e retorna a lista de resultados (um por regra e coluna)."""
+    results = []
+    for (layer, table), table_rules in (rules or RULES).items():
+        path = table_path(layer, table)
+        if not os.path.exists(path):
+            results.append({"layer": layer, "table": table, "check": "exists", "column": None,
+                            "passed": False, "severity": "error", "source": "footer",
+                            "detail": "arquivo inexistente", "elapsed": 0.0})
+            continue
+        metadata = pq.read_metadata(path)
+        for rule in table_rules:
+            if rule["check"] == "schema":
+                targets = [(None, lambda: check_schema(path, metadata, rule))]
+            else:
+                check = CHECKS[rule["check"]]
+                targets = [(c, lambda c=c: check(path, metadata, rule, c))
+                           for c in _columns(metadata, rule["columns"])]
+            for column, evaluate in targets:
+                start = time.perf_counter()
+                with span(f"quality:{rule['check']}", path=f"{table}.parquet") as event:
+                    passed, source, detail = evaluate()
+                    event["source"] = source
+                results.append({
+                    "layer": layer, "table": table, "check": rule["check"], "column": column,
+                    "passed": bool(passed), "severity": rule.get("severity", "error"),
+                    "source": source, "detail": detail, "elapsed": time.perf_counter() - start,
+                })
+    return results
+
+
+def format_results(results):
+    lines = [f"{'Tabela':<24} {'Regra':<11} {'Coluna':<28} {'Fonte':<8} {'Resultado':<9} Detalhe"]
+    for r in results:
+        status = "ok" if r["passed"] else ("FALHA" if r["severity"] == "error" else "aviso")
+        lines.append(f"{r['table']:<24} {r['check']:<11} {r['column'] or '-':<28} {r['source']:<8} "
+                     f"{status:<9} {r['detail']}")
+    elapsed = sum(r["elapsed"] for r in results)
+    from_footer = sum(r["source"] == "footer" for r in results)
+    lines.append(f"{len(results)} verificações em {elapsed:.2f}s ({from_footer} só pelo footer)")
+    return "\n".join(lines)
+
+
+def run_quality_stage(report_path=None):
+    """
+    Etapa do pipeline: avalia RULES, grava o relatório JSON e falha se alguma
+    regra de severidade "error" não passar.
+    """
+    report_path = report_path or QUALITY_REPORT_PATH
+    print("[Qualidade] Verificando Bronze e Silver (footers primeiro)...")
+    results = run_checks()
+    print(format_results(results))
+    os.makedirs(os.path.dirname(report_path) or ".", exist_ok=True)
+    save_manifest({"timestamp": time.time(), "results": results}, report_path)
+    errors = [r for r in results if not r["passed"] and r["severity"] == "error"]
+    if errors:
+        raise RuntimeError("Qualidade de dados: " + "; ".join(
+            f"{r['table']}.{r['column'] or r['check']}: {r['detail']}" for r in errors))
+
+
+if __name__ == "__main__":
+    try:
+        run_quality_stage()
+    except RuntimeError as e:
+        print(f"ERRO: {e}")
+        sys.exit(1)
@@ -0,0 +1,228 @@
+"""
+Consulta pontual das features da Gold por sk_id_curr (serviço de score).
+Ao montar a OBT (FEATURE_STORE=1), cada tabela é gravada também como Arrow IPC
+sem compressão, ordenada por sk_id_curr e em um único lote
+(`analytics_credit_risk_*.features.arrow`). Medidas ficam no tipo da OBT com NaN
+(sem bitmap de nulos) e categorias viram códigos int32 (-1 = nulo), com os
+vocabulários nos metadados do schema. Assim, ao abrir o arquivo por memory map,
+cada coluna é uma view NumPy sobre as páginas do arquivo, sem cópia: uma consulta
+é uma busca binária na chave e a leitura de uma posição por coluna, sem carregar
+a tabela.
+
+    python -m src.feature_store --benchmark --lookups 10000 --batch-size 1
+"""
+import argparse
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from src.config import GOLD_PATH
+
+KEY = 'sk_id_curr'
+METADATA_KEY = b"feature_store"
+SPLITS = {"train": "analytics_credit_risk_train", "test": "analytics_credit_risk_test"}
+
+_stores = {}
+_lock = threading.Lock()
+
+
+def store_path(name, directory=None):
+    """Arquivo IPC das features de uma OBT (ex.: analytics_credit_risk_train.features.arrow)."""
+    return os.path.join(directory or GOLD_PATH, f"{name}.features.arrow")
+
+
+def _check_fresh(path):
+    """Recusa um store mais antigo que a OBT ao lado dele (a OBT foi regravada sem o store)."""
+    obt = path[:-len(".features.arrow")] + ".parquet"
+    if os.path.exists(obt) and os.path.getmtime(obt) > os.path.getmtime(path):
+        raise RuntimeError(f"Store de features desatualizado: {path} é mais antigo que {os.path.basename(obt)} "
+                           "(gere a Gold com FEATURE_STORE=1).")
+
+
+def _column(series):
+    """Coluna Arrow sem bitmap de nulos (NaN / código -1) para virar view NumPy na leitura."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return pa.array(series.cat.codes.to_numpy().astype(np.int32)), series.cat.categories.tolist()
+    values = series.to_numpy()
+    if values.dtype.kind in 'iuf':
+        return pa.array(values, from_pandas=False), None
+    return pa.array(series, from_pandas=True), None
+
+
+def build_store(df, path):
+    """Grava `df` (uma linha por sk_id_curr) como store de features, de forma atômica."""
+    if not df[KEY].is_monotonic_increasing:
+        df = df.sort_values(KEY, kind='stable', ignore_index=True)
+    if not df[KEY].is_unique:
+        raise ValueError(f"Store de features exige {KEY} único.")
+
+    arrays, categories = [], {}
+    for col in df.columns:
+        array, vocabulary = _column(df[col])
+        arrays.append(array)
+        if vocabulary is not None:
+            categories[col] = vocabulary
+    meta = {"key": KEY, "categories": categories}
+    table = pa.table(arrays, names=list(df.columns)).replace_schema_metadata(
+        {METADATA_KEY: json.dumps(meta).encode()}
+    )
+
+    temp_path = path + ".tmp"
+    try:
+        with pa.OSFile(temp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=max(len(df), 1))
+        os.replace(temp_path, path)
+    except Exception as e:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise e
+    return path
+
+
+class FeatureStore:
+    """Store aberto por memory map: views NumPy por coluna e busca binária na chave."""
+
+    def __init__(self, path):
+        _check_fresh(path)
+        self.path = path
+        with pa.memory_map(path, "r") as source:
+            self.table = pa.ipc.open_file(source).read_all()
+        meta = json.loads(self.table.schema.metadata[METADATA_KEY])
+        self.categories = {c: np.array(v + [None], dtype=object) for c, v in meta["categories"].items()}
+        self.columns = self.table.column_names
+        self._values = {}
+        for col in self.columns:
+            chunks = self.table.column(col).chunks
+            array = chunks[0] if len(chunks) == 1 else pa.concat_arrays(chunks)
+            try:
+                self._values[col] = array.to_numpy(zero_copy_only=True)
+            except pa.ArrowInvalid:
+                self._values[col] = array  # texto/booleano: lido via Arrow
+        self.keys = self._values[meta["key"]]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def positions(self, ids):
+        """Posições das `ids` na tabela (KeyError com as que não existem)."""
+        ids = np.asarray(ids)
+        positions = np.searchsorted(self.keys, ids)
+        found = positions < len(self.keys)
+        found[found] = self.keys[positions[found]] == ids[found]
+        if not found.all():
+            raise KeyError(f"{KEY} fora do store: {ids[~found][:10].tolist()}")
+        return positions
+
+    def _take(self, col, positions):
+        values = self._values[col]
+        if isinstance(values, pa.Array):
+            return values.take(pa.array(positions)).to_numpy(zero_copy_only=False)
+        if col in self.categories:
+            return self.categories[col][values[positions]]  # código -1 -> None
+        return values[positions]
+
+    def lookup(self, ids):
+        """{coluna: array alinhado com `ids`} (categorias como rótulos, None = nulo)."""
+        positions = self.positions(ids)
+        return {col: self._take(col, positions) for col in self.columns}
+
+    def get(self, sk_id_curr):
+        """Features de um cliente como {coluna: valor}."""
+        position = self.positions([sk_id_curr])[0]
+        row = {}
+        for col in self.columns:
+            values = self._values[col]
+            if isinstance(values, pa.Array):
+                row[col] = values[int(position)].as_py()
+            elif col in self.categories:
+                row[col] = self.categories[col][values[position]]
+            else:
+                row[col] = values[position].item()
+        return row
+
+    def frame(self, ids):
+        """Features das `ids` como DataFrame (categorias restauradas)."""
+        positions = self.positions(ids)
+        columns = {}
+        for col in self.columns:
+            if col in self.categories:
+                columns[col] = pd.Categorical.from_codes(self._values[col][positions],
+                                                         self.categories[col][:-1].tolist())
+            else:
+                columns[col] = self._take(col, positions)
+        return pd.DataFrame(columns)
+
+
+def open_store(split="train"):
+    """
+    Store do split ("train"/"test"), único por processo e reaberto quando o arquivo
+    muda. RuntimeError se a OBT foi regravada depois do store.
+    """
+    path = store_path(SPLITS[split])
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Store de features inexistente: {path} (gere a Gold com FEATURE_STORE=1).")
+    _check_fresh(path)
+    key = (os.path.abspath(path), os.path.getmtime(path))
+    with _lock:
+        if key not in _stores:
+            for old in [k for k in _stores if k[0] == key[0]]:
+                del _stores[old]
+            _stores[key] = FeatureStore(path)
+        return _stores[key]
+
+
+def get_features(ids, split="train"):
+    """
+    Features da Gold por sk_id_curr: um id -> {coluna: valor}; lista de ids ->
+    DataFrame na mesma ordem. KeyError para ids que não estão no split.
+    """
+    store = open_store(split)
+    if np.ndim(ids) == 0:
+        return store.get(ids)
+    return store.frame(ids)
+
+
+def benchmark(store, n_lookups=10000, batch_size=1, seed=0):
+    """Latência (p50/p99, µs por chamada) e consultas/s de ids aleatórios do store."""
+    rng = np.random.default_rng(seed)
+    n_calls = max(n_lookups // batch_size, 1)
+    ids = rng.choice(store.keys, size=(n_calls, batch_size))
+    latencies = np.empty(n_calls)
+    start = time.perf_counter()
+    for i in range(n_calls):
+        t0 = time.perf_counter()
+        if batch_size == 1:
+            store.get(ids[i, 0])
+        else:
+            store.lookup(ids[i])
+        latencies[i] = time.perf_counter() - t0
+    elapsed = time.perf_counter() - start
+    return {
+        "rows": len(store), "columns": len(store.columns), "batch_size": batch_size, "calls": n_calls,
+        "p50_us": float(np.percentile(latencies, 50) * 1e6),
+        "p99_us": float(np.percentile(latencies, 99) * 1e6),
+        "lookups_per_s": n_calls * batch_size / elapsed,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Consulta e benchmark do store de features da Gold")
+    parser.add_argument("--split", choices=sorted(SPLITS), default="train")
+    parser.add_argument("--benchmark", action="store_true", help="mede latência p50/p99 e consultas/s")
+    parser.add_argument("--lookups", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("ids", nargs="*", type=int, help="sk_id_curr a consultar")
+    args = parser.parse_args()
+
+    if args.ids:
+        print(get_features(args.ids, args.split).T.to_string())
+    if args.benchmark:
+        result = benchmark(open_store(args.split), args.lookups, args.batch_size)
+        print(f"{result['rows']} linhas x {result['columns']} colunas | lote {result['batch_size']}: "
+              f"p50 {result['p50_us']:.1f} µs | p99 {result['p99_us']:.1f} µs | "
+              f"{result['lookups_per_s']:,.0f} consultas/s")
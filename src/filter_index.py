@@ -0,0 +1,140 @@
+"""
+Índice de bitmaps para os filtros do dashboard.
+Cada valor distinto de cada coluna de filtro (e de cada faixa: renda, idade, score)
+tem um bitmap empacotado (1 bit por linha). Uma combinação de multiselects vira OR
+dos bitmaps dentro da coluna e AND entre colunas; contagens e somas de target por
+faixa saem de popcount(seleção & faixa & target), sem montar um DataFrame filtrado.
+O custo de um rerun depende só dos filtros efetivamente selecionados, então novas
+dimensões (ex. name_income_type, region_rating_client) entram sem custo extra.
+"""
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from src.risk_cube import assign_bins
+
+TARGET = 'target'
+INCOME = 'amt_income_total'
+AGE = 'years_birth'
+
+# Bits ligados por byte (np.bitwise_count só existe a partir do numpy 2.0)
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def popcount(bitmap):
+    return int(_POPCOUNT[bitmap].sum(dtype=np.int64))
+
+
+def _codes(column):
+    """(códigos por linha com -1 para nulo, valores distintos) de uma coluna Arrow."""
+    if pa.types.is_dictionary(column.type):
+        array = column.unify_dictionaries().combine_chunks() if isinstance(column, pa.ChunkedArray) else column
+        codes = pc.fill_null(array.indices, -1).to_numpy(zero_copy_only=False)
+        return codes, array.dictionary.to_pylist()
+    codes, values = pd.factorize(column.to_numpy(zero_copy_only=False), sort=True)
+    return codes, values.tolist()
+
+
+class FilterIndex:
+    """Bitmaps empacotados por (dimensão, valor) e medidas numéricas de uma tabela."""
+
+    def __init__(self, n_rows):
+        self.n_rows = n_rows
+        self.bitmaps = {}   # dimensão -> {valor: bitmap}
+        self.measures = {}  # medida -> (valores com nulos = 0, bitmap de não nulos)
+        self.all_rows = np.packbits(np.ones(n_rows, dtype=bool))
+
+    def add_codes(self, name, codes, values):
+        """Dimensão a partir de códigos inteiros (-1 = nulo, fora de qualquer bitmap)."""
+        bitmaps = {}
+        for code, value in enumerate(values):
+            rows = codes == code
+            if rows.any():
+                bitmaps[value] = np.packbits(rows)
+        self.bitmaps[name] = bitmaps
+
+    def add_column(self, name, column):
+        self.add_codes(name, *_codes(column))
+
+    def add_measure(self, name, values):
+        values = np.asarray(values, dtype=np.float64)
+        valid = ~np.isnan(values)
+        self.measures[name] = (np.where(valid, values, 0.0), np.packbits(valid))
+
+    def values(self, dimension):
+        return list(self.bitmaps[dimension])
+
+    def select(self, selections):
+        """Bitmap das linhas selecionadas: OR dentro da coluna, AND entre colunas (vazio = todos)."""
+        mask = self.all_rows
+        for column, chosen in selections.items():
+            if not chosen:
+                continue
+            bitmaps = self.bitmaps[column]
+            column_mask = np.zeros_like(self.all_rows)
+            for value in chosen:
+                if value in bitmaps:
+                    column_mask |= bitmaps[value]
+            mask = mask & column_mask
+        return mask
+
+    def unpack(self, mask):
+        return np.unpackbits(mask, count=self.n_rows).view(bool)
+
+    def row_ids(self, mask):
+        return np.flatnonzero(self.unpack(mask))
+
+    def measure_sum(self, name, mask):
+        """(soma, contagem de não nulos) da medida nas linhas selecionadas."""
+        values, valid = self.measures[name]
+        selected = mask & valid
+        return values[self.unpack(selected)].sum(), popcount(selected)
+
+
+def build_index(table, bins, dimensions):
+    """
+    Índice da tabela do dashboard: bitmaps das `dimensions` (colunas de filtro),
+    do target e das faixas de `bins` (mesmo formato de risk_cube.compute_bins),
+    mais as medidas de renda e idade.
+    """
+    index = FilterIndex(table.num_rows)
+    for column in list(dimensions) + [TARGET]:
+        index.add_column(column, table.column(column))
+
+    sources = sorted({spec['column'] for spec in bins.values()})
+    for name, binned in assign_bins(table.select(sources).to_pandas(), bins).items():
+        index.add_codes(name, binned.cat.codes.to_numpy(), list(binned.cat.categories))
+
+    for measure in (INCOME, AGE):
+        index.add_measure(measure, table.column(measure).to_numpy(zero_copy_only=False))
+    return index
+
+
+def summarize(index, mask):
+    """Mesmos KPIs de risk_cube.summarize, calculados sobre os bitmaps."""
+    n = popcount(mask)
+    defaults = popcount(mask & index.bitmaps[TARGET].get(1, np.zeros_like(mask)))
+    income_sum, income_count = index.measure_sum(INCOME, mask)
+    age_sum, age_count = index.measure_sum(AGE, mask)
+    return {
+        'n_clientes': n,
+        'taxa_inadimplencia': defaults / n * 100 if n else np.nan,
+        'renda_media': income_sum / income_count if income_count else np.nan,
+        'idade_media': age_sum / age_count if age_count else np.nan,
+    }
+
+
+def rate_by(index, dimension, mask):
+    """Taxa de inadimplência (%) por valor de `dimension`, no formato de risk_cube.rate_by."""
+    defaults = mask & index.bitmaps[TARGET].get(1, np.zeros_like(mask))
+    values, rates = [], []
+    for value, bitmap in index.bitmaps[dimension].items():
+        n = popcount(mask & bitmap)
+        if n:
+            values.append(value)
+            rates.append(popcount(defaults & bitmap) / n * 100)
+    return pd.DataFrame({
+        dimension: pd.Categorical(values, categories=index.values(dimension), ordered=True),
+        'target': np.array(rates, dtype=np.float64),
+    })
@@ -0,0 +1,203 @@
+"""
+Amostras estratificadas da OBT (GOLD_SAMPLE_SIZES), gravadas ao lado dela como
+`analytics_credit_risk_*.sample_<n>.parquet`, para notebooks e análises que não
+precisam da tabela inteira.
+
+- Estratos: `target` e as chaves de filtro do dashboard (FILTER_COLUMNS), as que
+  existirem na OBT. Cada estrato recebe uma fração proporcional ao seu tamanho, com
+  no mínimo MIN_PER_STRATUM linha, para que nenhum estrato falte na reexpansão.
+- `sample_weight` = linhas do estrato na OBT / linhas do estrato na amostra: somas e
+  taxas ponderadas reexpandem para a população.
+- Sorteio reprodutível: cada cliente recebe uma prioridade por hash de `sk_id_curr`
+  com semente (GOLD_SAMPLE_SEED) e cada estrato fica com as menores prioridades.
+  A amostra não depende da ordem das linhas, e a amostra menor está contida na maior.
+- Streaming: a primeira passada lê só as colunas de estrato e o id, lote a lote
+  (row groups), mantendo por estrato um reservatório das menores prioridades; a
+  segunda lê os lotes de novo e guarda só as linhas sorteadas.
+"""
+import argparse
+import glob
+import os
+import re
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.config import GOLD_PATH, GOLD_SAMPLE_SEED, GOLD_SAMPLE_SIZES
+from src.dashboard_data import FILTER_COLUMNS
+from src.storage import available_columns, iter_batches, write_parquet
+
+ID_COLUMN = 'sk_id_curr'
+WEIGHT_COLUMN = 'sample_weight'
+STRATA_COLUMNS = ['target'] + FILTER_COLUMNS
+MIN_PER_STRATUM = 1
+BATCH_SIZE = 65536
+
+_MASK64 = (1 << 64) - 1
+
+
+def sample_path(name, size, directory=None):
+    """Arquivo da amostra de `size` linhas de uma OBT (ex.: analytics_credit_risk_train.sample_50000.parquet)."""
+    return os.path.join(directory or GOLD_PATH, f"{name}.sample_{size}.parquet")
+
+
+def remove_stale_samples(name, sizes, directory=None):
+    """Apaga as amostras de `name` cujo tamanho não está mais em `sizes`."""
+    pattern = re.compile(re.escape(name) + r"\.sample_(\d+)\.parquet$")
+    for path in glob.glob(sample_path(name, "*", directory)):
+        match = pattern.search(os.path.basename(path))
+        if match and int(match.group(1)) not in sizes:
+            os.remove(path)
+            print(f"Removida: {os.path.basename(path)} (fora de GOLD_SAMPLE_SIZES)")
+
+
+def hash_priority(ids, seed):
+    """Prioridade uniforme em [0, 1) por id (splitmix64 com semente), igual em toda execução."""
+    x = ids.astype(np.uint64) + np.uint64((seed * 0x9E3779B97F4A7C15) & _MASK64)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    x = x ^ (x >> np.uint64(31))
+    return (x >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+
+def allocation(population, size):
+    """Linhas sorteadas por estrato: proporcional a `population`, com mínimo MIN_PER_STRATUM."""
+    total = population.sum()
+    if total == 0:
+        return population
+    share = np.rint(size * population / total).astype(np.int64)
+    return np.minimum(population, np.maximum(share, MIN_PER_STRATUM))
+
+
+class _Strata:
+    """Código global de estrato (combinação dos valores das colunas), estável entre lotes."""
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.vocab = [{} for _ in columns]
+        self.codes = {}
+
+    def encode(self, batch):
+        if not self.columns:
+            return np.zeros(batch.num_rows, dtype=np.int64)
+        parts = []
+        for vocab, column in zip(self.vocab, self.columns):
+            local, uniques = pd.factorize(batch.column(column).to_pandas(), use_na_sentinel=False)
+            to_global = np.array([vocab.setdefault(None if pd.isna(v) else v, len(vocab)) for v in uniques],
+                                 dtype=np.int64)
+            parts.append(to_global[local])
+        combos, inverse = np.unique(np.stack(parts, axis=1), axis=0, return_inverse=True)
+        to_global = np.array([self.codes.setdefault(c, len(self.codes)) for c in map(tuple, combos.tolist())],
+                             dtype=np.int64)
+        return to_global[inverse.ravel()]
+
+
+def _bottom(strata, priority, rows, caps):
+    """Mantém, em cada estrato, as `caps[estrato]` linhas de menor prioridade."""
+    order = np.lexsort((priority, strata))
+    strata, priority, rows = strata[order], priority[order], rows[order]
+    starts = np.flatnonzero(np.r_[True, strata[1:] != strata[:-1]])
+    rank = np.arange(len(strata)) - np.repeat(starts, np.diff(np.r_[starts, len(strata)]))
+    keep = rank < caps[strata]
+    return strata[keep], priority[keep], rows[keep]
+
+
+def select_rows(path, sizes, seed=None):
+    """
+    Primeira passada: {tamanho: (linhas sorteadas em ordem, pesos)} da OBT em `path`,
+    lendo só o id e as colunas de estrato.
+    """
+    if seed is None:
+        seed = GOLD_SAMPLE_SEED
+    available = available_columns(path)
+    strata_columns = [c for c in STRATA_COLUMNS if c in available]
+    encoder = _Strata(strata_columns)
+    n_rows = pq.ParquetFile(path).metadata.num_rows
+    largest = max(sizes)
+
+    strata = np.array([], dtype=np.int64)
+    priority = np.array([], dtype=np.float64)
+    rows = np.array([], dtype=np.int64)
+    seen = np.array([], dtype=np.int64)
+    offset = 0
+    for batch in iter_batches(path, columns=[ID_COLUMN] + strata_columns, batch_size=BATCH_SIZE):
+        codes = encoder.encode(batch)
+        ids = batch.column(ID_COLUMN).to_numpy(zero_copy_only=False)
+        strata = np.r_[strata, codes]
+        priority = np.r_[priority, hash_priority(ids, seed)]
+        rows = np.r_[rows, np.arange(offset, offset + batch.num_rows)]
+        offset += batch.num_rows
+        seen = np.bincount(codes, minlength=len(encoder.codes)) + np.pad(seen, (0, len(encoder.codes) - len(seen)))
+
+        # Limite superior da alocação final: o estrato pode crescer até o fim do arquivo
+        remaining = n_rows - offset
+        caps = np.maximum(np.ceil(largest * (seen + remaining) / n_rows), MIN_PER_STRATUM).astype(np.int64)
+        strata, priority, rows = _bottom(strata, priority, rows, np.minimum(caps, seen))
+
+    selected = {}
+    for size in sizes:
+        take = allocation(seen, size)
+        strata_k, _, rows_k = _bottom(strata, priority, rows, take)
+        order = np.argsort(rows_k)
+        selected[size] = (rows_k[order], (seen / np.maximum(take, 1))[strata_k[order]])
+    return selected
+
+
+def build_samples(path, name, sizes=None, seed=None, directory=None):
+    """
+    Grava as amostras estratificadas da OBT em `path` (uma por tamanho em `sizes`,
+    padrão GOLD_SAMPLE_SIZES) e retorna os caminhos gravados. Amostras de tamanhos
+    que saíram da configuração são apagadas.
+    """
+    sizes = [n for n in (GOLD_SAMPLE_SIZES if sizes is None else sizes) if n > 0]
+    remove_stale_samples(name, sizes, directory)
+    if not sizes:
+        return []
+    selected = select_rows(path, sizes, seed)
+
+    # Segunda passada: só as linhas sorteadas de cada lote
+    parts = {size: [] for size in sizes}
+    schema, offset = pq.read_schema(path), 0
+    for batch in iter_batches(path, batch_size=BATCH_SIZE):
+        schema, end = batch.schema, offset + batch.num_rows
+        for size, (rows, _) in selected.items():
+            lo, hi = np.searchsorted(rows, [offset, end])
+            if hi > lo:
+                parts[size].append(batch.take(pa.array(rows[lo:hi] - offset)))
+        offset = end
+
+    paths = []
+    for size, (rows, weights) in selected.items():
+        table = pa.Table.from_batches(parts[size], schema=schema)
+        table = table.append_column(WEIGHT_COLUMN, pa.array(weights, pa.float64()))
+        target = sample_path(name, size, directory)
+        write_parquet(table, target, "gold")
+        print(f"Salvo: {os.path.basename(target)} | Amostra estratificada: {table.num_rows} de {offset} linhas")
+        paths.append(target)
+    return paths
+
+
+def load_sample(name="analytics_credit_risk_train", size=None, directory=None, columns=None):
+    """Amostra da OBT `name` (padrão: a maior de GOLD_SAMPLE_SIZES) como DataFrame."""
+    if size is None:
+        size = max(GOLD_SAMPLE_SIZES)
+    path = sample_path(name, size, directory)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Amostra inexistente: {path} (gere a Gold com GOLD_SAMPLE_SIZES={size}).")
+    return pd.read_parquet(path, columns=columns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Amostras estratificadas das OBTs da Gold")
+    parser.add_argument("--sizes", default=None, help="Tamanhos separados por vírgula (padrão: GOLD_SAMPLE_SIZES)")
+    parser.add_argument("--seed", type=int, default=None, help="Semente do sorteio (padrão: GOLD_SAMPLE_SEED)")
+    args = parser.parse_args()
+    sizes = [int(n) for n in args.sizes.split(",") if n.strip()] if args.sizes else None
+    for name in ("analytics_credit_risk_train", "analytics_credit_risk_test"):
+        build_samples(os.path.join(GOLD_PATH, f"{name}.parquet"), name, sizes, args.seed)
+
+
+if __name__ == "__main__":
+    main()
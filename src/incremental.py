@@ -0,0 +1,67 @@
+"""
+Atualização incremental das dimensões e da Gold a partir de arquivos delta.
+Um delta é um Parquet com linhas novas de uma tabela Bronze (mesmo schema, ex.:
+os registros de bureau, parcelas ou cartão que chegaram para alguns milhares de
+clientes). Cada dimensão afetada agrega só o delta e o combina com o estado
+mergeável gravado pela última construção completa (DIMENSIONS_STATE=1, em
+SILVER/_state); em seguida, só as linhas desses clientes são remontadas na OBT.
+O resultado é o de uma reconstrução completa com os deltas anexados à Bronze
+(somas e médias em ponto flutuante podem diferir no último dígito). A Bronze não
+é alterada: os deltas devem chegar também na próxima extração completa. Uso:
+
+    python -m src.incremental installments_payments=data/delta/inst.parquet bureau_balance=...
+"""
+import argparse
+import importlib
+import sys
+
+import numpy as np
+
+from src.storage import read_parquet
+
+BUREAU_TABLES = ("bureau", "bureau_balance")
+
+
+def apply_deltas(deltas):
+    """
+    Aplica os deltas {tabela Bronze: caminho Parquet} às dimensões e à Gold.
+    Retorna os sk_id_curr afetados.
+    """
+    dims = importlib.import_module("src.02b_transform_dimensions")
+    analytical = importlib.import_module("src.03_analytical_layer")
+
+    unknown = set(deltas) - set(dims.DIMENSION_AGGREGATIONS) - set(BUREAU_TABLES)
+    if unknown:
+        raise ValueError(f"Tabelas sem dimensão incremental: {', '.join(sorted(unknown))}")
+    frames = {name: read_parquet(path, **dims.BRONZE_READS.get(name, {})) for name, path in deltas.items()}
+
+    affected = []
+    if any(name in frames for name in BUREAU_TABLES):
+        affected.append(dims.upsert_bureau(frames.get("bureau"), frames.get("bureau_balance")))
+    for name, frame in frames.items():
+        if name not in BUREAU_TABLES:
+            affected.append(dims.upsert_dimension(name, frame))
+
+    ids = np.unique(np.concatenate(affected)) if affected else np.array([], dtype=np.int64)
+    print(f"Remontando a OBT para {len(ids)} clientes...")
+    analytical.upsert_obt(ids)
+    return ids
+
+
+def parse_delta(value):
+    name, sep, path = value.partition("=")
+    if not sep or not name or not path:
+        raise argparse.ArgumentTypeError(f"use tabela=caminho.parquet (recebido: {value})")
+    return name, path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aplica deltas da Bronze às dimensões e à Gold")
+    parser.add_argument("deltas", nargs="+", type=parse_delta,
+                        help="tabela=caminho.parquet (ex.: installments_payments=delta.parquet)")
+    args = parser.parse_args()
+    try:
+        apply_deltas(dict(args.deltas))
+    except FileNotFoundError as e:
+        print(f"ERRO: {e}")
+        sys.exit(1)
@@ -0,0 +1,251 @@
+"""
+Instrumentação do pipeline.
+Etapas e operações "quentes" (leituras e escritas Parquet, cada groupby-agg das
+dimensões, cada JOIN da OBT) são envolvidas em `span(...)`, que grava um evento JSON
+por linha em METRICS_PATH: duração, linhas de entrada/saída, bytes, pico de RSS do
+processo desde o início (`process_peak_rss_mb`, ru_maxrss) e, com METRICS_TRACEMALLOC=1,
+o delta e o pico de memória do tracemalloc. Cada etapa também amostra o RSS corrente
+enquanto roda (`stage_peak_rss_mb`): é o pico da própria etapa, mesmo num worker do
+pool que já rodou outras etapas antes.
+Com PROFILE_DIR definido, cada etapa também gera um dump do cProfile (.prof).
+Ao final de uma execução, `run_report` resume os eventos e o caminho crítico do DAG.
+Eventos só são gravados dentro de uma execução (`start_run`, chamado pelo pipeline e
+pelo benchmark); chamadas avulsas das funções (ex. testes) não geram métricas. Cada
+execução começa um arquivo novo (o da anterior fica em `<METRICS_PATH>.1`), então o
+arquivo não cresce entre execuções.
+"""
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+
+from src.config import METRICS_PATH, METRICS_TRACEMALLOC, PROFILE_DIR
+
+# Execução e etapa correntes ficam no ambiente: processos filhos (pools da
+# ingestão e das partições) herdam os dois e seus eventos são atribuídos à etapa.
+RUN_ID_ENV = "PIPELINE_RUN_ID"
+STAGE_ENV = "PIPELINE_STAGE"
+RSS_SAMPLE_INTERVAL = 0.05  # segundos entre amostras do RSS durante uma etapa
+_write_lock = threading.Lock()
+
+
+def peak_rss_mb():
+    """
+    Pico de RSS do processo desde que ele começou (e do maior filho); None onde
+    `resource` não existe (Windows). Não é o pico de um trecho: use RssSampler.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+
+
+def current_rss_mb():
+    """RSS corrente do processo (/proc/self/statm); None fora do Linux."""
+    try:
+        with open("/proc/self/statm") as f:
+            resident = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident * os.sysconf("SC_PAGE_SIZE") / 1024**2
+
+
+class RssSampler:
+    """Pico do RSS corrente enquanto ativo, amostrado por uma thread a cada `interval` segundos."""
+
+    def __init__(self, interval=RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.peak = current_rss_mb()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _sample(self):
+        rss = current_rss_mb()
+        if rss is not None:
+            self.peak = rss if self.peak is None else max(self.peak, rss)
+
+    def _run(self):
+        while not self._done.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        if self.peak is not None:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._done.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self._sample()
+        return False
+
+
+def start_run(path=None):
+    """
+    Novo id de execução, herdado pelos processos filhos via variável de ambiente.
+    O arquivo de métricas (`path`, padrão METRICS_PATH) passa a guardar só esta
+    execução: o anterior é movido para `<path>.1`, substituindo o que estava lá.
+    """
+    path = path or METRICS_PATH
+    if path and os.path.exists(path):
+        os.replace(path, path + ".1")
+    run_id = time.strftime("%Y%m%dT%H%M%S") + "-" + uuid.uuid4().hex[:6]
+    os.environ[RUN_ID_ENV] = run_id
+    return run_id
+
+
+def current_run():
+    return os.environ.get(RUN_ID_ENV)
+
+
+def emit(event, path=None):
+    """Anexa um evento (uma linha JSON) ao arquivo de métricas."""
+    path = path or METRICS_PATH
+    if not path:
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    line = json.dumps(event, default=str) + "\n"
+    with _write_lock, open(path, "a", encoding="utf-8") as f:
+        f.write(line)
+
+
+@contextmanager
+def span(name, kind="op", **fields):
+    """
+    Mede o bloco e emite um evento. O dict devolvido aceita campos preenchidos pelo
+    chamador (ex.: rows_out, bytes). O pico do tracemalloc é o da etapa até o fim
+    do bloco (o pico é zerado só no início de cada etapa).
+    """
+    event = {"run_id": current_run(), "stage": os.environ.get(STAGE_ENV), "name": name,
+             "kind": kind, "pid": os.getpid(), **fields}
+    if not METRICS_PATH or event["run_id"] is None:
+        yield event
+        return
+
+    tracing = tracemalloc.is_tracing()
+    traced_before = tracemalloc.get_traced_memory()[0] if tracing else 0
+    event["start"] = time.time()
+    start = time.perf_counter()
+    try:
+        yield event
+        event["status"] = "ok"
+    except BaseException as e:
+        event.update(status="error", error=str(e))
+        raise
+    finally:
+        event["duration"] = time.perf_counter() - start
+        event["process_peak_rss_mb"] = peak_rss_mb()
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            event["tracemalloc_delta_mb"] = (current - traced_before) / 1024**2
+            event["tracemalloc_peak_mb"] = peak / 1024**2
+        emit(event)
+
+
+@contextmanager
+def stage(name):
+    """Span de uma etapa do DAG: marca os eventos internos, tracemalloc e cProfile opcionais."""
+    previous_stage = os.environ.get(STAGE_ENV)
+    os.environ[STAGE_ENV] = name
+    started_tracing = METRICS_TRACEMALLOC and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    elif tracemalloc.is_tracing() and hasattr(tracemalloc, "reset_peak"):  # Python 3.9+
+        tracemalloc.reset_peak()
+    profiler = cProfile.Profile() if PROFILE_DIR else None
+    try:
+        with span(name, kind="stage") as event, RssSampler() as rss:
+            if profiler is not None:
+                profiler.enable()
+            try:
+                yield event
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+                event["stage_peak_rss_mb"] = rss.peak
+    finally:
+        if profiler is not None:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            profiler.dump_stats(os.path.join(PROFILE_DIR, f"{current_run() or 'avulso'}_{name}.prof"))
+        if started_tracing:
+            tracemalloc.stop()
+        if previous_stage is None:
+            os.environ.pop(STAGE_ENV, None)
+        else:
+            os.environ[STAGE_ENV] = previous_stage
+
+
+def read_events(path=None, run_id=None):
+    path = path or METRICS_PATH
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    return [e for e in events if run_id is None or e.get("run_id") == run_id]
+
+
+def critical_path(stage_events, deps):
+    """
+    Caminho crítico observado: parte da etapa que terminou por último e volta, a cada
+    passo, pela dependência que terminou mais tarde (a que de fato segurou a etapa).
+    """
+    end = {name: e["start"] + e["duration"] for name, e in stage_events.items()}
+    if not end:
+        return []
+    path = [max(end, key=end.get)]
+    while True:
+        ran = [d for d in deps.get(path[0], []) if d in end]
+        if not ran:
+            return path
+        path.insert(0, max(ran, key=end.get))
+
+
+def run_report(stages, run_id, path=None, top=3):
+    """Resumo da execução: etapas (tempo, RSS, operações mais lentas) e caminho crítico."""
+    from src.scheduler import dependencies
+
+    events = read_events(path, run_id)
+    stage_events = {e["name"]: e for e in events if e["kind"] == "stage"}
+    ops = [e for e in events if e["kind"] != "stage"]
+    path_names = critical_path(stage_events, dependencies(stages))
+
+    summary = {}
+    for name, e in stage_events.items():
+        slowest = sorted((o for o in ops if o.get("stage") == name), key=lambda o: -o["duration"])[:top]
+        summary[name] = {
+            "duration": e["duration"], "stage_peak_rss_mb": e.get("stage_peak_rss_mb"),
+            "process_peak_rss_mb": e.get("process_peak_rss_mb"), "status": e.get("status"),
+            "tracemalloc_peak_mb": e.get("tracemalloc_peak_mb"),
+            "slowest_ops": [{k: o.get(k) for k in ("name", "duration", "rows_in", "rows_out", "bytes")}
+                            for o in slowest],
+        }
+    starts = [e["start"] for e in stage_events.values()]
+    ends = [e["start"] + e["duration"] for e in stage_events.values()]
+    return {
+        "run_id": run_id,
+        "wall_time": max(ends) - min(starts) if starts else 0.0,
+        "critical_path": path_names,
+        "critical_path_seconds": sum(stage_events[n]["duration"] for n in path_names),
+        "stages": summary,
+    }
+
+
+def format_report(report):
+    lines = [f"Execução {report['run_id']}: {report['wall_time']:.2f}s de parede",
+             f"Caminho crítico ({report['critical_path_seconds']:.2f}s): {' -> '.join(report['critical_path'])}"]
+    for name, s in sorted(report["stages"].items(), key=lambda item: -item[1]["duration"]):
+        rss = f"{s['stage_peak_rss_mb']:.0f} MB" if s["stage_peak_rss_mb"] is not None else "-"
+        process = f"{s['process_peak_rss_mb']:.0f} MB" if s["process_peak_rss_mb"] is not None else "-"
+        lines.append(f"  {name:<20} {s['duration']:>8.2f}s  RSS da etapa {rss} (pico do processo {process})")
+        for op in s["slowest_ops"]:
+            lines.append(f"      {op['name']:<36} {op['duration']:>8.2f}s")
+    return "\n".join(lines)
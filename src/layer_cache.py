@@ -0,0 +1,142 @@
+"""
+Cache em memória das camadas (tabelas Arrow) dentro de uma execução do pipeline.
+Cada tabela Bronze/Silver gravada continua indo para o Parquet (escrita atômica, que
+mantém o manifesto e o "pular etapas atualizadas" do agendador), mas também fica
+aqui como tabela Arrow; as leituras seguintes do mesmo arquivo (storage.read_parquet
+e iter_batches) saem da memória, sem descomprimir e decodificar o Parquet de novo.
+Acima do orçamento (LAYER_CACHE_MB), as tabelas menos usadas recentemente saem do
+cache e voltam a ser lidas do Parquet em disco.
+
+O cache só existe dentro de `session(...)` (aberta por run_full_pipeline) e no
+processo que a abriu: execuções avulsas (`python -m src.0X_...`) e processos filhos
+(pools) continuam lendo do disco.
+"""
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import pyarrow as pa
+
+_lock = threading.Lock()
+_tables = OrderedDict()  # caminho -> (tabela, (mtime, tamanho) do Parquet gravado)
+_budget = 0
+_used = 0
+_owner_pid = None
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def _key(path):
+    return os.path.abspath(path)
+
+
+def _file_version(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def enabled():
+    return _budget > 0 and _owner_pid == os.getpid()
+
+
+def enable(budget_mb):
+    """Liga o cache neste processo com orçamento de `budget_mb` MB (<= 0 desliga)."""
+    global _budget, _owner_pid
+    clear()
+    _stats.update(hits=0, misses=0, evictions=0)
+    _budget = int(budget_mb * 1024**2) if budget_mb and budget_mb > 0 else 0
+    _owner_pid = os.getpid() if _budget else None
+
+
+def disable():
+    """Desliga o cache e libera as tabelas (as estatísticas da sessão ficam)."""
+    global _budget, _owner_pid
+    clear()
+    _budget, _owner_pid = 0, None
+
+
+def clear():
+    global _used
+    with _lock:
+        _tables.clear()
+        _used = 0
+
+
+@contextmanager
+def session(budget_mb):
+    """Cache ativo durante o bloco; devolve as estatísticas (acertos, faltas, despejos)."""
+    enable(budget_mb)
+    try:
+        yield _stats
+    finally:
+        disable()
+
+
+def discard(path):
+    global _used
+    with _lock:
+        entry = _tables.pop(_key(path), None)
+        if entry is not None:
+            _used -= entry[0].nbytes
+
+
+def put(path, table):
+    """
+    Guarda `table` como conteúdo atual de `path` (chamar após o Parquet ser gravado).
+    Tabelas maiores que o orçamento não entram; o excesso despeja as menos recentes.
+    """
+    global _used
+    if not enabled():
+        return
+    discard(path)
+    if table.nbytes > _budget:
+        return
+    with _lock:
+        _tables[_key(path)] = (table, _file_version(path))
+        _used += table.nbytes
+        while _used > _budget:
+            evicted_path, (evicted, _) = _tables.popitem(last=False)
+            _used -= evicted.nbytes
+            _stats["evictions"] += 1
+            print(f"Cache de camadas: {os.path.basename(evicted_path)} volta a ser lido do disco")
+
+
+def get(path):
+    """Tabela em cache para `path`, ou None (fora do cache ou arquivo alterado desde o put)."""
+    if not enabled():
+        return None
+    key = _key(path)
+    with _lock:
+        entry = _tables.get(key)
+        if entry is not None and os.path.exists(path) and _file_version(path) == entry[1]:
+            _tables.move_to_end(key)
+            _stats["hits"] += 1
+            return entry[0]
+        _stats["misses"] += 1
+    if entry is not None:
+        discard(path)
+    return None
+
+
+class TableCollector:
+    """
+    Acumula os lotes de uma escrita em streaming para o cache, desistindo (e
+    liberando os lotes) assim que passam do orçamento.
+    """
+
+    def __init__(self):
+        self.tables = [] if enabled() else None
+        self.nbytes = 0
+
+    def add(self, table):
+        if self.tables is None:
+            return
+        self.nbytes += table.nbytes
+        if self.nbytes > _budget:
+            self.tables = None
+        else:
+            self.tables.append(table)
+
+    def commit(self, path):
+        if self.tables:
+            put(path, pa.concat_tables(self.tables))
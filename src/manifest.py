@@ -0,0 +1,76 @@
+"""
+Manifesto de ingestão incremental.
+Registra a impressão digital (tamanho, mtime e hash do conteúdo) de cada arquivo de
+origem e a versão do código que o processou, permitindo pular arquivos inalterados.
+"""
+import hashlib
+import json
+import os
+
+HASH_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+def file_sha256(path):
+    """Hash SHA-256 do conteúdo do arquivo, lido em blocos (memória constante)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def code_version(*paths):
+    """Versão do código = hash curto do conteúdo dos arquivos-fonte informados."""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def source_fingerprint(path, previous=None):
+    """
+    Impressão digital de um arquivo de origem: tamanho, mtime e SHA-256.
+    Se tamanho e mtime coincidem com `previous`, reaproveita o hash já calculado
+    (evita reler arquivos de vários GB só para confirmar que não mudaram).
+    """
+    stat = os.stat(path)
+    fingerprint = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    if (previous and previous.get("size") == stat.st_size
+            and previous.get("mtime_ns") == stat.st_mtime_ns and previous.get("sha256")):
+        fingerprint["sha256"] = previous["sha256"]
+    else:
+        fingerprint["sha256"] = file_sha256(path)
+    return fingerprint
+
+
+def same_content(fingerprint, previous):
+    """Dois fingerprints descrevem o mesmo conteúdo (o mtime pode ter mudado)."""
+    return bool(previous) and all(
+        fingerprint.get(key) == previous.get(key) for key in ("size", "sha256")
+    )
+
+
+def load_manifest(path):
+    """Carrega o manifesto (dict por arquivo); retorna {} se não existir ou estiver ilegível."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(manifest, path):
+    """Grava o manifesto com a mesma escrita atômica das camadas (.tmp + os.replace)."""
+    temp_path = path + ".tmp"
+    try:
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(temp_path, path)
+    except Exception as e:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise e
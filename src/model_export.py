@@ -0,0 +1,132 @@
+"""
+Exportação da OBT em formato pronto para treino (MODEL_EXPORT=1).
+Ao lado de cada OBT, o diretório `analytics_credit_risk_*.matrix/` guarda:
+
+- `X.npy`: matriz float32 (linhas x features numéricas) em ordem de coluna
+  (Fortran), ou seja, cada feature é um bloco contíguo;
+- `codes.npy`: códigos int32 das colunas categóricas (-1 = nulo), também por coluna;
+- `sk_id_curr.npy` e `target.npy` (só no treino), alinhados com as linhas;
+- `manifest.json`: nomes das features, das categóricas e os vocabulários.
+
+`load_matrix` abre os `.npy` por memory map (np.load(mmap_mode='r')): o experimento
+começa sem decodificar Parquet nem converter pandas -> NumPy, e as colunas só
+saem do disco quando usadas.
+"""
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from src.config import GOLD_PATH
+from src.manifest import load_manifest, save_manifest
+from src.storage import replace_directory
+
+ID_COLUMN = 'sk_id_curr'
+TARGET_COLUMN = 'target'
+
+
+def matrix_path(name, directory=None):
+    """Diretório da exportação de uma OBT (ex.: analytics_credit_risk_train.matrix)."""
+    return os.path.join(directory or GOLD_PATH, f"{name}.matrix")
+
+
+def split_columns(df):
+    """(features numéricas, features categóricas) da OBT, sem id e target."""
+    numeric, categorical = [], []
+    for col in df.columns:
+        if col in (ID_COLUMN, TARGET_COLUMN):
+            continue
+        if isinstance(df[col].dtype, pd.CategoricalDtype) or df[col].dtype == object:
+            categorical.append(col)
+        else:
+            numeric.append(col)
+    return numeric, categorical
+
+
+def _column_major(path, n_rows, columns, dtype, fill):
+    """`.npy` (linhas x colunas) em ordem Fortran preenchido coluna a coluna por `fill`."""
+    matrix = np.lib.format.open_memmap(path, mode='w+', dtype=dtype,
+                                       shape=(n_rows, len(columns)), fortran_order=True)
+    for j, col in enumerate(columns):
+        matrix[:, j] = fill(col)
+    matrix.flush()
+    del matrix
+
+
+def export_matrix(df, path):
+    """Grava a exportação de `df` em `path` (diretório trocado de forma atômica)."""
+    numeric, categorical = split_columns(df)
+    temp_path = path + ".tmp"
+    if os.path.exists(temp_path):
+        shutil.rmtree(temp_path)
+    os.makedirs(temp_path)
+
+    try:
+        vocabularies = {}
+
+        def codes(col):
+            values = df[col] if isinstance(df[col].dtype, pd.CategoricalDtype) else df[col].astype('category')
+            vocabularies[col] = values.cat.categories.tolist()
+            return values.cat.codes.to_numpy()
+
+        _column_major(os.path.join(temp_path, "X.npy"), len(df), numeric, np.float32,
+                      lambda col: df[col].to_numpy(dtype=np.float32, na_value=np.nan))
+        _column_major(os.path.join(temp_path, "codes.npy"), len(df), categorical, np.int32, codes)
+        np.save(os.path.join(temp_path, f"{ID_COLUMN}.npy"), df[ID_COLUMN].to_numpy())
+        has_target = TARGET_COLUMN in df.columns
+        if has_target:
+            np.save(os.path.join(temp_path, f"{TARGET_COLUMN}.npy"), df[TARGET_COLUMN].to_numpy())
+        save_manifest({
+            "rows": len(df), "features": numeric, "categorical": categorical,
+            "vocabularies": vocabularies, "target": TARGET_COLUMN if has_target else None,
+        }, os.path.join(temp_path, "manifest.json"))
+        replace_directory(temp_path, path)
+    except Exception as e:
+        if os.path.exists(temp_path):
+            shutil.rmtree(temp_path)
+        raise e
+    return path
+
+
+class ModelMatrix:
+    """Exportação aberta por memory map (somente leitura)."""
+
+    def __init__(self, path):
+        manifest_path = os.path.join(path, "manifest.json")
+        meta = load_manifest(manifest_path)
+        if not meta:
+            raise FileNotFoundError(f"Exportação inexistente: {path} (gere a Gold com MODEL_EXPORT=1).")
+        # Exportação mais antiga que a OBT ao lado dela: a OBT foi regravada sem a matriz
+        obt = path.rstrip(os.sep)[:-len(".matrix")] + ".parquet"
+        if os.path.exists(obt) and os.path.getmtime(obt) > os.path.getmtime(manifest_path):
+            raise RuntimeError(f"Exportação desatualizada: {path} é mais antiga que {os.path.basename(obt)} "
+                               "(gere a Gold com MODEL_EXPORT=1).")
+        load = lambda name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r')
+        self.path = path
+        self.features = meta["features"]
+        self.categorical = meta["categorical"]
+        self.vocabularies = meta["vocabularies"]
+        self.X = load("X")
+        self.codes = load("codes")
+        self.ids = load(ID_COLUMN)
+        self.target = load(TARGET_COLUMN) if meta["target"] else None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def feature(self, name):
+        """Coluna numérica (view contígua) ou códigos de uma categórica."""
+        if name in self.categorical:
+            return self.codes[:, self.categorical.index(name)]
+        return self.X[:, self.features.index(name)]
+
+    def labels(self, name):
+        """Rótulos de uma categórica (None = nulo)."""
+        vocabulary = np.array(self.vocabularies[name] + [None], dtype=object)
+        return vocabulary[self.feature(name)]
+
+
+def load_matrix(name="analytics_credit_risk_train", directory=None):
+    """Abre a exportação da OBT `name` (ver ModelMatrix)."""
+    return ModelMatrix(matrix_path(name, directory))
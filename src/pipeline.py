@@ -1,3 +1,4 @@
+import argparse
 import time
 import importlib
 from datetime import datetime
@@ -12,59 +13,198 @@ project_root = os.path.dirname(current_dir)
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
-def run_full_pipeline():
+from src.config import (
+    AGGREGATION_ENGINE,
+    APPLICATION_TRANSFORM_MODE,
+    BRONZE_PATH,
+    DATA_QUALITY,
+    DIMENSIONS_STATE,
+    FEATURE_STORE,
+    GOLD_PARTITION_COLS,
+    GOLD_PATH,
+    GOLD_ROW_GROUP_SIZE,
+    GOLD_SAMPLE_SEED,
+    GOLD_SAMPLE_SIZES,
+    GOLD_SORT_COLS,
+    LAYER_CACHE_MB,
+    METRICS_PATH,
+    METRICS_REPORT_PATH,
+    MODEL_EXPORT,
+    OBT_JOIN_STRATEGY,
+    PARQUET_WRITE_OPTIONS,
+    PIPELINE_STATE_PATH,
+    PIPELINE_WORKERS,
+    QUALITY_REPORT_PATH,
+    RAW_PATH,
+    SILVER_PATH,
+)
+from src import data_quality, layer_cache
+from src.feature_store import store_path
+from src.gold_sample import sample_path
+from src.instrumentation import format_report, run_report, start_run
+from src.manifest import save_manifest
+from src.model_export import matrix_path
+from src.scheduler import BLOCKED, FAILED, Stage, has_failures, run_stages
+
+DIMENSIONS = {
+    # etapa: (função em 02b_transform_dimensions, entradas Bronze, saída Silver)
+    "dim_bureau": ("process_bureau", ["bureau", "bureau_balance"], "dim_bureau"),
+    "dim_previous_app": ("process_previous_application", ["previous_application"], "dim_previous_app"),
+    "dim_installments": ("process_installments", ["installments_payments"], "dim_installments"),
+    "dim_credit_card": ("process_credit_card", ["credit_card_balance"], "dim_credit_card"),
+    "dim_pos_cash": ("process_pos_cash", ["pos_cash_balance"], "dim_pos_cash"),
+}
+
+OBT_NAMES = ("analytics_credit_risk_train", "analytics_credit_risk_test")
+
+def run_ingestion_stage(force=False):
+    """Etapa de ingestão: falha se qualquer arquivo falhar (o manifesto evita retrabalho)."""
+    mod_ingestion = importlib.import_module("src.01_ingestion")
+    results = mod_ingestion.run_ingestion(force=force)
+    if mod_ingestion.has_failures(results):
+        raise RuntimeError("Ingestão falhou para um ou mais arquivos (veja o resumo acima).")
+
+def build_stages(force=False):
+    """
+    DAG do pipeline. As dependências saem dos arquivos declarados:
+    ingestão -> fato application e cada dimensão (independentes entre si) ->
+    qualidade de dados (DATA_QUALITY) -> OBT.
+    O `config` de cada etapa entra na versão dela: mudar uma dessas opções faz a
+    etapa rodar de novo mesmo com as saídas mais novas que as entradas.
+    """
+    mod_ingestion = importlib.import_module("src.01_ingestion")
+    bronze = lambda name: os.path.join(BRONZE_PATH, f"{name}.parquet")
+    silver = lambda name: os.path.join(SILVER_PATH, f"{name}.parquet")
+    gold = lambda name: os.path.join(GOLD_PATH, f"{name}.parquet")
+
+    # [1/4] INGESTÃO (Raw -> Bronze) - src/01_ingestion.py
+    stages = [Stage(
+        name="ingestao",
+        module="src.pipeline",
+        function="run_ingestion_stage",
+        kwargs={"force": force},
+        inputs=[os.path.join(RAW_PATH, f) for f in mod_ingestion.files_to_ingest],
+        outputs=[os.path.join(BRONZE_PATH, mod_ingestion.bronze_name(f))
+                 for f in mod_ingestion.files_to_ingest],
+        always_run=True,
+    )]
+
+    # [2/4] TRANSFORMAÇÃO FATO (Bronze -> Silver) - src/02_transform_application.py
+    stages.append(Stage(
+        name="fato_application",
+        module="src.02_transform_application",
+        function="process_application_data",
+        inputs=[bronze("application_train"), bronze("application_test")],
+        outputs=[silver("fact_application_train"), silver("fact_application_test")],
+        config={"mode": APPLICATION_TRANSFORM_MODE, "parquet": PARQUET_WRITE_OPTIONS["silver"]},
+    ))
+
+    # [3/4] TRANSFORMAÇÃO DIMENSÕES (Bronze -> Silver) - src/02b_transform_dimensions.py
+    for name, (function, inputs, output) in DIMENSIONS.items():
+        stages.append(Stage(
+            name=name,
+            module="src.02b_transform_dimensions",
+            function=function,
+            inputs=[bronze(i) for i in inputs],
+            outputs=[silver(output)],
+            config={"state": DIMENSIONS_STATE, "engine": AGGREGATION_ENGINE,
+                    "parquet": PARQUET_WRITE_OPTIONS["silver"]},
+        ))
+
+    # QUALIDADE DE DADOS (Bronze e Silver) - src/data_quality.py
+    # O relatório é entrada da OBT: uma regra "error" que falha bloqueia a Gold.
+    quality = []
+    if DATA_QUALITY:
+        stages.append(Stage(
+            name="qualidade",
+            module="src.data_quality",
+            function="run_quality_stage",
+            inputs=data_quality.rule_inputs(),
+            outputs=[QUALITY_REPORT_PATH],
+        ))
+        quality = [QUALITY_REPORT_PATH]
+
+    # [4/4] CAMADA ANALÍTICA (Silver -> Gold) - src/03_analytical_layer.py
+    stages.append(Stage(
+        name="obt",
+        module="src.03_analytical_layer",
+        function="build_obt",
+        inputs=[silver("fact_application_train"), silver("fact_application_test")]
+               + [silver(output) for _, _, output in DIMENSIONS.values()] + quality,
+        outputs=[gold(name) for name in OBT_NAMES] + [gold("analytics_risk_cube")]
+                + [sample_path(name, size, GOLD_PATH) for name in OBT_NAMES
+                   for size in GOLD_SAMPLE_SIZES if size > 0]
+                + [store_path(name, GOLD_PATH) for name in OBT_NAMES if FEATURE_STORE]
+                + [os.path.join(matrix_path(name, GOLD_PATH), "manifest.json")
+                   for name in OBT_NAMES if MODEL_EXPORT]
+                + [os.path.join(GOLD_PATH, name, "_metadata")
+                   for name in OBT_NAMES if GOLD_PARTITION_COLS],
+        config={"join": OBT_JOIN_STRATEGY, "parquet": PARQUET_WRITE_OPTIONS["gold"],
+                "partition_cols": GOLD_PARTITION_COLS, "sort_cols": GOLD_SORT_COLS,
+                "row_group_size": GOLD_ROW_GROUP_SIZE, "feature_store": FEATURE_STORE,
+                "model_export": MODEL_EXPORT, "sample_sizes": GOLD_SAMPLE_SIZES,
+                "sample_seed": GOLD_SAMPLE_SEED},
+    ))
+    return stages
+
+def run_full_pipeline(force=False, workers=None):
+    """
+    Executa o DAG de etapas. Etapas independentes rodam em paralelo (`workers`,
+    padrão PIPELINE_WORKERS) e etapas com saídas atualizadas são puladas,
+    a menos que `force=True`. Retorna 0 em caso de sucesso e 1 se alguma etapa falhar.
+    """
+    if workers is None:
+        workers = PIPELINE_WORKERS
     start_time = time.time()
+    run_id = start_run()
     print(f"{'='*60}")
-    print(f"INICIANDO PIPELINE DE DADOS - {datetime.now()}")
+    print(f"INICIANDO PIPELINE DE DADOS - {datetime.now()} (execução {run_id})")
     print(f"{'='*60}")
     
+    # Cache de camadas: só com etapas no processo principal (workers == 1)
     try:
-        # ----------------------------------------------------------------------
-        # PASSO 1: INGESTÃO (Raw -> Bronze)
-        # ----------------------------------------------------------------------
-        # Arquivo: src/01_ingestion.py
-        print("\n[1/4] Executando Ingestão...")
-        mod_ingestion = importlib.import_module("src.01_ingestion")
-        
-        if hasattr(mod_ingestion, 'run_ingestion'):
-            mod_ingestion.run_ingestion()
-        else:
-            raise AttributeError("A função 'run_ingestion' não foi encontrada em src/01_ingestion.py")
-        
-        # ----------------------------------------------------------------------
-        # PASSO 2: TRANSFORMAÇÃO FATO (Bronze -> Silver)
-        # ----------------------------------------------------------------------
-        # Arquivo: src/02_transform_application.py
-        print("\n[2/4] Executando Transformação Application...")
-        mod_app = importlib.import_module("src.02_transform_application")
-        mod_app.process_application_data()
-        
-        # ----------------------------------------------------------------------
-        # PASSO 3: TRANSFORMAÇÃO DIMENSÕES (Bronze -> Silver)
-        # ----------------------------------------------------------------------
-        # Arquivo: src/02b_transform_dimensions.py
-        print("\n[3/4] Executando Transformação Dimensões...")
-        mod_dims = importlib.import_module("src.02b_transform_dimensions")
-        mod_dims.run_pipeline()
-        
-        # ----------------------------------------------------------------------
-        # PASSO 4: CAMADA ANALÍTICA (Silver -> Gold)
-        # ----------------------------------------------------------------------
-        # Arquivo: src/03_analytical_layer.py
-        print("\n[4/4] Construindo Camada Analítica (OBT)...")
-        mod_gold = importlib.import_module("src.03_analytical_layer")
-        mod_gold.build_obt()
-        
-        # ----------------------------------------------------------------------
-        # FINALIZAÇÃO
-        # ----------------------------------------------------------------------
-        elapsed = time.time() - start_time
-        print(f"\n{'='*60}")
-        print(f" PIPELINE CONCLUÍDO COM SUCESSO em {elapsed:.2f} segundos.")
-        print(f"{'='*60}")
-        
+        with layer_cache.session(LAYER_CACHE_MB if workers <= 1 else 0) as cache_stats:
+            stages = build_stages(force)
+            results = run_stages(stages, workers=workers,
+                                 state_path=PIPELINE_STATE_PATH, force=force)
     except Exception as e:
         print(f"\n FALHA CRÍTICA NO PIPELINE: {e}")
+        return 1
+    if LAYER_CACHE_MB > 0 and workers <= 1:
+        print(f"\nCache de camadas: {cache_stats['hits']} leituras da memória, "
+              f"{cache_stats['misses']} do disco, {cache_stats['evictions']} despejos")
+
+    # Relatório da execução (métricas por etapa e caminho crítico): uma falha aqui
+    # não invalida as etapas já concluídas
+    if METRICS_PATH:
+        try:
+            report = run_report(stages, run_id)
+            os.makedirs(os.path.dirname(METRICS_REPORT_PATH) or ".", exist_ok=True)
+            save_manifest(report, METRICS_REPORT_PATH)
+            print(f"\n{format_report(report)}")
+        except Exception as e:
+            print(f"\n[AVISO] Relatório de métricas não gerado: {e}")
+
+    # ----------------------------------------------------------------------
+    # FINALIZAÇÃO
+    # ----------------------------------------------------------------------
+    elapsed = time.time() - start_time
+    print(f"\n{'='*60}")
+    if has_failures(results):
+        failed = [name for name, r in results.items() if r["status"] in (FAILED, BLOCKED)]
+        print(f" FALHA CRÍTICA NO PIPELINE: {', '.join(failed)} ({elapsed:.2f} segundos)")
+        print(f"{'='*60}")
+        return 1
+
+    print(f" PIPELINE CONCLUÍDO COM SUCESSO em {elapsed:.2f} segundos.")
+    print(f"{'='*60}")
+    return 0
 
 if __name__ == "__main__":
-    run_full_pipeline()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Pipeline Raw -> Bronze -> Silver -> Gold")
+    parser.add_argument("--force", action="store_true",
+                        help="Reexecuta todas as etapas e reingere todos os CSV")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Etapas independentes em paralelo (padrão: PIPELINE_WORKERS)")
+    args = parser.parse_args()
+    sys.exit(run_full_pipeline(force=args.force, workers=args.workers))
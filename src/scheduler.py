@@ -0,0 +1,217 @@
+"""
+Agendador de etapas do pipeline (DAG).
+Cada etapa declara os arquivos que lê e os que grava; as dependências entre etapas
+são deduzidas desses arquivos. Etapas independentes rodam em paralelo em processos
+separados, e uma etapa é pulada (como no make) quando suas saídas são mais novas que
+suas entradas e a versão dela (código do módulo e dos módulos de src que ele importa,
+mais a configuração que muda o que ela grava) não mudou desde a última execução
+bem-sucedida.
+Uma falha bloqueia apenas as etapas que dependem dela.
+"""
+import ast
+import hashlib
+import importlib
+import importlib.util
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+
+from src.instrumentation import stage as instrumented_stage
+from src.manifest import code_version, load_manifest, save_manifest
+
+SUCCESS = "SUCESSO"
+SKIPPED = "PULADO"
+FAILED = "ERRO"
+BLOCKED = "BLOQUEADO"
+
+
+@dataclass
+class Stage:
+    """
+    Etapa do pipeline: `module.function(**kwargs)`.
+    `code` lista os arquivos-fonte que definem a versão da etapa (padrão: o módulo e
+    os módulos de src que ele importa, ver `source_files`). `config` guarda os valores
+    de configuração que mudam o que a etapa grava (flags, opções de escrita): mudá-los
+    também invalida as saídas. `always_run` força a execução (etapas com controle
+    incremental próprio, como a ingestão com manifesto).
+    """
+    name: str
+    module: str
+    function: str
+    inputs: list = field(default_factory=list)
+    outputs: list = field(default_factory=list)
+    kwargs: dict = field(default_factory=dict)
+    code: list = field(default_factory=list)
+    config: dict = field(default_factory=dict)
+    always_run: bool = False
+
+    def code_files(self):
+        if self.code:
+            return self.code
+        return source_files(self.module)
+
+    def version(self):
+        """Versão da etapa: hash do código e, se houver, da configuração."""
+        version = code_version(*self.code_files())
+        if self.config:
+            config = json.dumps(self.config, sort_keys=True, default=str).encode()
+            version += "-" + hashlib.sha256(config).hexdigest()[:8]
+        return version
+
+
+def _imported_modules(path):
+    """Módulos de src importados pelo arquivo: `import src.x`, `from src(.x) import ...` e import_module("src.x")."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(a.name for a in node.names if a.name.startswith("src."))
+        elif isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+            if node.module == "src":
+                names.update(f"src.{a.name}" for a in node.names)
+            elif node.module.startswith("src."):
+                names.add(node.module)
+        elif (isinstance(node, ast.Call) and node.args and isinstance(node.args[0], ast.Constant)
+              and isinstance(node.args[0].value, str) and node.args[0].value.startswith("src.")
+              and getattr(node.func, "attr", getattr(node.func, "id", None)) == "import_module"):
+            names.add(node.args[0].value)
+    return names
+
+
+def source_files(module):
+    """
+    Arquivos-fonte de `module` e dos módulos de src que ele importa, direta ou
+    indiretamente (lidos por AST, sem executar os módulos), em ordem estável.
+    """
+    files, pending, seen = [], [module], set()
+    while pending:
+        name = pending.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        spec = importlib.util.find_spec(name)
+        if spec is None or not spec.origin or not spec.origin.endswith(".py"):
+            continue  # `from src import <nome>` que não é módulo
+        files.append(spec.origin)
+        pending.extend(_imported_modules(spec.origin))
+    return sorted(files)
+
+
+def dependencies(stages):
+    """{etapa: nomes das etapas que produzem alguma de suas entradas}."""
+    producers = {}
+    for stage in stages:
+        for path in stage.outputs:
+            producers[os.path.normpath(path)] = stage.name
+    return {
+        stage.name: sorted({producers[p] for p in map(os.path.normpath, stage.inputs)
+                            if p in producers and producers[p] != stage.name})
+        for stage in stages
+    }
+
+
+def is_up_to_date(stage, state):
+    """Saídas existem, são mais novas que todas as entradas e o código não mudou."""
+    if stage.always_run or not stage.outputs:
+        return False
+    if state.get(stage.name, {}).get("code_version") != stage.version():
+        return False
+    if not all(os.path.exists(p) for p in stage.outputs + stage.inputs):
+        return False
+    oldest_output = min(os.path.getmtime(p) for p in stage.outputs)
+    newest_input = max((os.path.getmtime(p) for p in stage.inputs), default=0)
+    return oldest_output >= newest_input
+
+
+def run_stage(stage):
+    """Executa uma etapa (também usado dentro dos processos do pool)."""
+    for path in stage.outputs:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    start_time = time.time()
+    func = getattr(importlib.import_module(stage.module), stage.function)
+    with instrumented_stage(stage.name):
+        func(**stage.kwargs)
+
+    missing = [p for p in stage.outputs if not os.path.exists(p)]
+    if missing:
+        raise RuntimeError(f"saídas não geradas: {', '.join(missing)}")
+    return time.time() - start_time
+
+
+def run_stages(stages, workers=1, state_path=None, force=False):
+    """
+    Executa as etapas respeitando as dependências.
+    `workers` > 1 roda etapas prontas em paralelo num pool de processos.
+    Retorna {nome: {"status", "elapsed", "message"}} na ordem de `stages`.
+    """
+    deps = dependencies(stages)
+    by_name = {stage.name: stage for stage in stages}
+    state = load_manifest(state_path) if state_path else {}
+    results = {}
+    pending = [stage.name for stage in stages]
+    running = {}
+
+    def finish(name, status, elapsed=0.0, message=""):
+        results[name] = {"status": status, "elapsed": elapsed, "message": message}
+        if status == SUCCESS:
+            state[name] = {"code_version": by_name[name].version(),
+                           "finished_at": time.time()}
+        elif status == FAILED:
+            # Saídas possivelmente parciais: força nova execução na próxima rodada
+            state.pop(name, None)
+        print(f"[{status}] {name}" + (f" ({elapsed:.2f}s)" if elapsed else "")
+              + (f" - {message}" if message else ""))
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        while pending or running:
+            progressed = False
+            # Etapas cujas dependências já terminaram (ou falharam)
+            for name in list(pending):
+                dep_status = [results.get(d, {}).get("status") for d in deps[name]]
+                if None in dep_status:
+                    continue
+                pending.remove(name)
+                progressed = True
+                stage = by_name[name]
+
+                if any(status in (FAILED, BLOCKED) for status in dep_status):
+                    failed = [d for d in deps[name] if results[d]["status"] in (FAILED, BLOCKED)]
+                    finish(name, BLOCKED, message=f"depende de {', '.join(failed)}")
+                elif not force and is_up_to_date(stage, state):
+                    finish(name, SKIPPED, message="saídas atualizadas")
+                elif pool is None:
+                    try:
+                        finish(name, SUCCESS, run_stage(stage))
+                    except Exception as e:
+                        finish(name, FAILED, message=str(e))
+                else:
+                    running[pool.submit(run_stage, stage)] = name
+
+            if not running:
+                if pending and not progressed:
+                    raise ValueError(f"Dependência circular entre etapas: {', '.join(pending)}")
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    finish(name, SUCCESS, future.result())
+                except Exception as e:
+                    finish(name, FAILED, message=str(e))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        if state_path:
+            os.makedirs(os.path.dirname(state_path) or ".", exist_ok=True)
+            save_manifest(state, state_path)
+
+    return {stage.name: results[stage.name] for stage in stages}
+
+
+def has_failures(results):
+    return any(r["status"] in (FAILED, BLOCKED) for r in results.values())
@@ -0,0 +1,247 @@
+"""
+Registro de schemas da camada Bronze.
+Fixa, por tabela, tipos compactos e explícitos para cada coluna em vez de aceitar a
+inferência do pd.read_csv (float64/int64/object em tudo):
+- ids (sk_id_*) em int32, flags em int8 e contadores/dias inteiros em int8/16/32;
+- float32 para scores, taxas e medidas normalizadas; valores monetários (amt_*)
+  permanecem float64, pois float32 não preserva centavos acima de ~1 milhão;
+- textos de baixa cardinalidade como colunas dictionary do Arrow, que chegam ao
+  pandas como `category` (comparações por código em vez de strings Python).
+Colunas ausentes do registro seguem com o tipo inferido.
+"""
+import pyarrow as pa
+
+ID = pa.int32()
+FLAG = pa.int8()
+INT8 = pa.int8()
+INT16 = pa.int16()
+INT32 = pa.int32()
+FLOAT32 = pa.float32()
+MONEY = pa.float64()
+CATEGORY = pa.dictionary(pa.int32(), pa.string())
+
+# Colunas de moradia (application): média, moda e mediana de cada medida do imóvel
+HOUSING_MEASURES = [
+    'apartments', 'basementarea', 'years_beginexpluatation', 'years_build',
+    'commonarea', 'elevators', 'entrances', 'floorsmax', 'floorsmin', 'landarea',
+    'livingapartments', 'livingarea', 'nonlivingapartments', 'nonlivingarea',
+]
+
+APPLICATION_SCHEMA = {
+    'sk_id_curr': ID,
+    'target': FLAG,
+    'name_contract_type': CATEGORY,
+    'code_gender': CATEGORY,
+    'flag_own_car': CATEGORY,
+    'flag_own_realty': CATEGORY,
+    'cnt_children': INT8,
+    'amt_income_total': MONEY,
+    'amt_credit': MONEY,
+    'amt_annuity': MONEY,
+    'amt_goods_price': MONEY,
+    'name_type_suite': CATEGORY,
+    'name_income_type': CATEGORY,
+    'name_education_type': CATEGORY,
+    'name_family_status': CATEGORY,
+    'name_housing_type': CATEGORY,
+    'region_population_relative': FLOAT32,
+    'days_birth': INT32,
+    'days_employed': INT32,
+    'days_registration': FLOAT32,
+    'days_id_publish': INT32,
+    'own_car_age': FLOAT32,
+    'flag_mobil': FLAG,
+    'flag_emp_phone': FLAG,
+    'flag_work_phone': FLAG,
+    'flag_cont_mobile': FLAG,
+    'flag_phone': FLAG,
+    'flag_email': FLAG,
+    'occupation_type': CATEGORY,
+    'cnt_fam_members': FLOAT32,
+    'region_rating_client': INT8,
+    'region_rating_client_w_city': INT8,
+    'weekday_appr_process_start': CATEGORY,
+    'hour_appr_process_start': INT8,
+    'reg_region_not_live_region': FLAG,
+    'reg_region_not_work_region': FLAG,
+    'live_region_not_work_region': FLAG,
+    'reg_city_not_live_city': FLAG,
+    'reg_city_not_work_city': FLAG,
+    'live_city_not_work_city': FLAG,
+    'organization_type': CATEGORY,
+    'ext_source_1': FLOAT32,
+    'ext_source_2': FLOAT32,
+    'ext_source_3': FLOAT32,
+    **{f'{measure}_{stat}': FLOAT32
+       for stat in ('avg', 'mode', 'medi') for measure in HOUSING_MEASURES},
+    'fondkapremont_mode': CATEGORY,
+    'housetype_mode': CATEGORY,
+    'totalarea_mode': FLOAT32,
+    'wallsmaterial_mode': CATEGORY,
+    'emergencystate_mode': CATEGORY,
+    'obs_30_cnt_social_circle': FLOAT32,
+    'def_30_cnt_social_circle': FLOAT32,
+    'obs_60_cnt_social_circle': FLOAT32,
+    'def_60_cnt_social_circle': FLOAT32,
+    'days_last_phone_change': FLOAT32,
+    **{f'flag_document_{n}': FLAG for n in range(2, 22)},
+    **{f'amt_req_credit_bureau_{period}': FLOAT32
+       for period in ('hour', 'day', 'week', 'mon', 'qrt', 'year')},
+}
+
+BUREAU_SCHEMA = {
+    'sk_id_curr': ID,
+    'sk_id_bureau': ID,
+    'credit_active': CATEGORY,
+    'credit_currency': CATEGORY,
+    'days_credit': INT16,
+    'credit_day_overdue': INT16,
+    'days_credit_enddate': FLOAT32,
+    'days_enddate_fact': FLOAT32,
+    'amt_credit_max_overdue': MONEY,
+    'cnt_credit_prolong': INT8,
+    'amt_credit_sum': MONEY,
+    'amt_credit_sum_debt': MONEY,
+    'amt_credit_sum_limit': MONEY,
+    'amt_credit_sum_overdue': MONEY,
+    'credit_type': CATEGORY,
+    'days_credit_update': INT32,
+    'amt_annuity': MONEY,
+}
+
+BUREAU_BALANCE_SCHEMA = {
+    'sk_id_bureau': ID,
+    'months_balance': INT8,
+    'status': CATEGORY,
+}
+
+PREVIOUS_APPLICATION_SCHEMA = {
+    'sk_id_prev': ID,
+    'sk_id_curr': ID,
+    'name_contract_type': CATEGORY,
+    'amt_annuity': MONEY,
+    'amt_application': MONEY,
+    'amt_credit': MONEY,
+    'amt_down_payment': MONEY,
+    'amt_goods_price': MONEY,
+    'weekday_appr_process_start': CATEGORY,
+    'hour_appr_process_start': INT8,
+    'flag_last_appl_per_contract': CATEGORY,
+    'nflag_last_appl_in_day': FLAG,
+    'rate_down_payment': FLOAT32,
+    'rate_interest_primary': FLOAT32,
+    'rate_interest_privileged': FLOAT32,
+    'name_cash_loan_purpose': CATEGORY,
+    'name_contract_status': CATEGORY,
+    'days_decision': INT16,
+    'name_payment_type': CATEGORY,
+    'code_reject_reason': CATEGORY,
+    'name_type_suite': CATEGORY,
+    'name_client_type': CATEGORY,
+    'name_goods_category': CATEGORY,
+    'name_portfolio': CATEGORY,
+    'name_product_type': CATEGORY,
+    'channel_type': CATEGORY,
+    'sellerplace_area': INT32,
+    'name_seller_industry': CATEGORY,
+    'cnt_payment': FLOAT32,
+    'name_yield_group': CATEGORY,
+    'product_combination': CATEGORY,
+    'days_first_drawing': FLOAT32,
+    'days_first_due': FLOAT32,
+    'days_last_due_1st_version': FLOAT32,
+    'days_last_due': FLOAT32,
+    'days_termination': FLOAT32,
+    'nflag_insured_on_approval': FLOAT32,
+}
+
+POS_CASH_SCHEMA = {
+    'sk_id_prev': ID,
+    'sk_id_curr': ID,
+    'months_balance': INT8,
+    'cnt_instalment': FLOAT32,
+    'cnt_instalment_future': FLOAT32,
+    'name_contract_status': CATEGORY,
+    'sk_dpd': INT16,
+    'sk_dpd_def': INT16,
+}
+
+CREDIT_CARD_SCHEMA = {
+    'sk_id_prev': ID,
+    'sk_id_curr': ID,
+    'months_balance': INT8,
+    'amt_balance': MONEY,
+    'amt_credit_limit_actual': INT32,
+    'amt_drawings_atm_current': MONEY,
+    'amt_drawings_current': MONEY,
+    'amt_drawings_other_current': MONEY,
+    'amt_drawings_pos_current': MONEY,
+    'amt_inst_min_regularity': MONEY,
+    'amt_payment_current': MONEY,
+    'amt_payment_total_current': MONEY,
+    'amt_receivable_principal': MONEY,
+    'amt_recivable': MONEY,
+    'amt_total_receivable': MONEY,
+    'cnt_drawings_atm_current': FLOAT32,
+    'cnt_drawings_current': INT16,
+    'cnt_drawings_other_current': FLOAT32,
+    'cnt_drawings_pos_current': FLOAT32,
+    'cnt_instalment_mature_cum': FLOAT32,
+    'name_contract_status': CATEGORY,
+    'sk_dpd': INT16,
+    'sk_dpd_def': INT16,
+}
+
+INSTALLMENTS_SCHEMA = {
+    'sk_id_prev': ID,
+    'sk_id_curr': ID,
+    'num_instalment_version': FLOAT32,
+    'num_instalment_number': INT16,
+    'days_instalment': FLOAT32,
+    'days_entry_payment': FLOAT32,
+    'amt_instalment': MONEY,
+    'amt_payment': MONEY,
+}
+
+# Registro por arquivo de origem (mesmos nomes de files_to_ingest)
+BRONZE_SCHEMAS = {
+    'application_train.csv': APPLICATION_SCHEMA,
+    'application_test.csv': {k: v for k, v in APPLICATION_SCHEMA.items() if k != 'target'},
+    'bureau.csv': BUREAU_SCHEMA,
+    'bureau_balance.csv': BUREAU_BALANCE_SCHEMA,
+    'previous_application.csv': PREVIOUS_APPLICATION_SCHEMA,
+    'POS_CASH_balance.csv': POS_CASH_SCHEMA,
+    'credit_card_balance.csv': CREDIT_CARD_SCHEMA,
+    'installments_payments.csv': INSTALLMENTS_SCHEMA,
+}
+
+
+def get_schema(file_name):
+    """Tipos registrados para o arquivo ({coluna: tipo Arrow}); {} se não houver registro."""
+    return BRONZE_SCHEMAS.get(file_name, {})
+
+
+def string_columns(file_name):
+    """Colunas registradas como categóricas (lidas como texto no CSV)."""
+    return [col for col, dtype in get_schema(file_name).items() if dtype == CATEGORY]
+
+
+def apply_schema(table, file_name):
+    """
+    Converte uma tabela Arrow (tipos inferidos) para os tipos do registro.
+    Casts inteiros são "safe": valores fracionários ou fora da faixa geram erro
+    em vez de serem truncados silenciosamente. Nulos são preservados.
+    """
+    schema = get_schema(file_name)
+    if not schema:
+        return table
+
+    columns = []
+    for name, column in zip(table.column_names, table.columns):
+        target = schema.get(name)
+        if target is not None and column.type != target:
+            if target == CATEGORY and not pa.types.is_string(column.type):
+                column = column.cast(pa.string())
+            column = column.cast(target)
+        columns.append(column)
+    return pa.table(columns, names=table.column_names)
@@ -0,0 +1,240 @@
+"""
+Motor de agregação por segmentos (NumPy) para as dimensões da Silver.
+Aceita o mesmo dicionário de agregações do `DataFrame.groupby(key).agg(spec)` e
+devolve o mesmo formato (índice `key` ordenado, colunas (coluna, função)) e os
+mesmos dtypes, mas ordena as linhas uma única vez pela chave e calcula todas as
+estatísticas com reduções por segmento (`ufunc.reduceat`) sobre as fronteiras dos
+grupos. `nunique` usa uma segunda ordenação por (chave, valor) em vez do nunique
+genérico do pandas. Somas e médias acumulam em float64 (o pandas acumula colunas
+float32 em float32 com soma de Kahan), então podem diferir no último dígito.
+
+Para atualizações incrementais, `aggregate_state` produz o estado mergeável das
+mesmas agregações (somas e contagens em vez de médias, min/max e os pares distintos
+(chave, valor) do nunique), `merge_state` combina estados e `finalize_state` chega ao
+mesmo resultado do `group_agg`.
+"""
+import numpy as np
+import pandas as pd
+
+from src.config import AGGREGATION_ENGINE
+
+FUNCTIONS = ('count', 'sum', 'mean', 'min', 'max', 'nunique')
+
+# Partes do estado mergeável de cada agregação (nunique guarda os pares distintos à parte)
+# e como cada parte é combinada entre estados.
+STATE_PARTS = {'count': ('count',), 'sum': ('sum',), 'mean': ('sum', 'count'),
+               'min': ('min',), 'max': ('max',), 'nunique': ()}
+MERGE_PARTS = {'count': 'sum', 'sum': 'sum', 'min': 'min', 'max': 'max'}
+
+
+def group_segments(keys):
+    """
+    (ordem estável por chave, chaves distintas ordenadas, início de cada grupo na ordem).
+    Chaves já ordenadas (ex.: Bronze gravada em ordem de cliente) dispensam a ordenação:
+    a ordem devolvida é None.
+    """
+    if len(keys) < 2 or np.all(keys[1:] >= keys[:-1]):
+        order, sorted_keys = None, keys
+    else:
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+    return order, sorted_keys[starts], starts
+
+
+def _valid(values):
+    return ~np.isnan(values) if values.dtype.kind == 'f' else np.ones(len(values), dtype=bool)
+
+
+def _extreme(ufunc, values, valid, starts, counts, fill):
+    """min/max por segmento ignorando NaN; grupos sem valores viram NaN (como no pandas)."""
+    if values.dtype.kind != 'f':
+        return ufunc.reduceat(values, starts)
+    result = ufunc.reduceat(np.where(valid, values, values.dtype.type(fill)), starts)
+    result[counts == 0] = np.nan
+    return result
+
+
+def _sums(values, valid, starts):
+    accumulator = np.float64 if values.dtype.kind == 'f' else np.int64
+    if values.dtype.kind == 'f':
+        values = np.where(valid, values, 0)
+    return np.add.reduceat(values.astype(accumulator, copy=False), starts)
+
+
+def _reduce(func, values, valid, starts, counts, keys_sorted=None, sums=None):
+    """
+    Uma estatística por segmento, com os dtypes de saída do groupby do pandas.
+    `sums` reaproveita a soma acumulada da coluna entre 'sum' e 'mean'.
+    """
+    if func == 'count':
+        return counts
+    if func == 'min':
+        return _extreme(np.minimum, values, valid, starts, counts, np.inf)
+    if func == 'max':
+        return _extreme(np.maximum, values, valid, starts, counts, -np.inf)
+    if func == 'nunique':
+        # Distintos não nulos: ordena por (chave, valor) e conta as trocas de valor
+        order = np.lexsort((values, keys_sorted))
+        k, v, ok = keys_sorted[order], values[order], valid[order]
+        new = np.r_[True, (k[1:] != k[:-1]) | (v[1:] != v[:-1])] & ok
+        return np.add.reduceat(new.astype(np.int64), starts)
+
+    if func not in ('sum', 'mean'):
+        raise ValueError(f"Agregação não suportada: {func} (use {', '.join(FUNCTIONS)})")
+    if sums is None:
+        sums = _sums(values, valid, starts)
+    return _sum_result(sums, values.dtype) if func == 'sum' else _mean_result(sums, counts, values.dtype)
+
+
+def _sum_result(sums, dtype):
+    """Somas acumuladas (float64/int64) no dtype de saída do pandas para a coluna `dtype`."""
+    if dtype.kind == 'f':
+        return sums.astype(dtype)
+    # Inteiros: o pandas volta ao dtype de entrada só quando todas as somas cabem nele
+    if dtype.kind in 'iu' and len(sums):
+        info = np.iinfo(dtype)
+        if sums.min() >= info.min and sums.max() <= info.max:
+            return sums.astype(dtype)
+    return sums.astype(np.int64)
+
+
+def _mean_result(sums, counts, dtype):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / counts
+    return means.astype(dtype) if dtype.kind == 'f' else means
+
+
+def _funcs(funcs):
+    return [funcs] if isinstance(funcs, str) else list(funcs)
+
+
+def segment_agg(df, key, spec):
+    """Equivalente a `df.groupby(key).agg(spec)` em uma passada de reduções por segmento."""
+    if len(df) == 0:
+        return df.groupby(key).agg(spec)
+
+    keys = df[key].to_numpy()
+    order, unique_keys, starts = group_segments(keys)
+    keys_sorted = keys if order is None else keys[order]
+    multi = any(not isinstance(funcs, str) for funcs in spec.values())
+
+    columns, labels = [], []
+    for column, funcs in spec.items():
+        funcs = _funcs(funcs)
+        values = df[column].to_numpy()
+        if order is not None:
+            values = values[order]
+        valid = _valid(values)
+        counts = np.add.reduceat(valid.astype(np.int64), starts)
+        sums = _sums(values, valid, starts) if {'sum', 'mean'} & set(funcs) else None
+        for func in funcs:
+            columns.append(_reduce(func, values, valid, starts, counts, keys_sorted, sums))
+            labels.append((column, func) if multi else column)
+
+    index = pd.Index(unique_keys, name=key)
+    result = pd.DataFrame(dict(enumerate(columns)), index=index)
+    result.columns = pd.MultiIndex.from_tuples(labels) if multi else pd.Index(labels)
+    return result
+
+
+def group_agg(df, key, spec, engine=None):
+    """
+    Agrega `df` por `key` com o dicionário `spec` (formato do pandas).
+    `engine` (padrão: AGGREGATION_ENGINE): "numpy" (reduções por segmento) ou "pandas".
+    """
+    if engine is None:
+        engine = AGGREGATION_ENGINE
+    if engine == "pandas":
+        return df.groupby(key).agg(spec)
+    return segment_agg(df, key, spec)
+
+
+def _state_parts(funcs):
+    return [p for p in ('count', 'sum', 'min', 'max') if any(p in STATE_PARTS[f] for f in funcs)]
+
+
+def aggregate_state(df, key, spec):
+    """
+    Estado mergeável de `group_agg(df, key, spec)`. Retorna (estado, pares, dtypes):
+    estado com uma linha por `key` e colunas '<coluna>__<parte>' (contagem de não
+    nulos, soma acumulada, min, max); {coluna: DataFrame [key, value]} com os pares
+    distintos não nulos das colunas com nunique; e o dtype de cada coluna de entrada.
+    """
+    keys = df[key].to_numpy()
+    dtypes = {column: str(df[column].dtype) for column in spec}
+    if len(df) == 0:
+        columns = [f'{c}__{p}' for c, funcs in spec.items() for p in _state_parts(_funcs(funcs))]
+        pairs = {c: pd.DataFrame({key: keys, 'value': df[c].to_numpy()})
+                 for c, funcs in spec.items() if 'nunique' in _funcs(funcs)}
+        return pd.DataFrame({key: keys, **{c: [] for c in columns}}), pairs, dtypes
+
+    order, unique_keys, starts = group_segments(keys)
+    keys_sorted = keys if order is None else keys[order]
+    state, pairs = {key: unique_keys}, {}
+    for column, funcs in spec.items():
+        funcs = _funcs(funcs)
+        values = df[column].to_numpy()
+        if order is not None:
+            values = values[order]
+        valid = _valid(values)
+        counts = np.add.reduceat(valid.astype(np.int64), starts)
+        for part in _state_parts(funcs):
+            if part == 'count':
+                state[f'{column}__count'] = counts
+            elif part == 'sum':
+                state[f'{column}__sum'] = _sums(values, valid, starts)
+            else:
+                ufunc, fill = (np.minimum, np.inf) if part == 'min' else (np.maximum, -np.inf)
+                state[f'{column}__{part}'] = _extreme(ufunc, values, valid, starts, counts, fill)
+        if 'nunique' in funcs:
+            distinct = pd.DataFrame({key: keys_sorted[valid], 'value': values[valid]}).drop_duplicates()
+            pairs[column] = distinct.sort_values([key, 'value'], kind='stable', ignore_index=True)
+    return pd.DataFrame(state), pairs, dtypes
+
+
+def merge_state(states, key):
+    """Combina estados (mesmas colunas, chaves possivelmente repetidas) em uma linha por chave."""
+    df = pd.concat(states, ignore_index=True)
+    spec = {c: MERGE_PARTS[c.rsplit('__', 1)[1]] for c in df.columns if c != key}
+    return segment_agg(df, key, spec).reset_index()
+
+
+def merge_pairs(pairs, key):
+    """Une pares distintos (key, value) de vários estados."""
+    df = pd.concat(pairs, ignore_index=True).drop_duplicates()
+    return df.sort_values([key, 'value'], kind='stable', ignore_index=True)
+
+
+def finalize_state(state, pairs, key, spec, dtypes):
+    """
+    Resultado de `group_agg` a partir do estado (uma linha por chave do estado),
+    com os dtypes de saída do pandas para os `dtypes` de entrada registrados.
+    """
+    keys = state[key].to_numpy()
+    multi = any(not isinstance(funcs, str) for funcs in spec.values())
+    columns, labels = [], []
+    for column, funcs in spec.items():
+        dtype = np.dtype(dtypes[column])
+        for func in _funcs(funcs):
+            if func == 'nunique':
+                distinct_keys, n = np.unique(pairs[column][key].to_numpy(), return_counts=True)
+                result = np.zeros(len(keys), dtype=np.int64)
+                result[np.searchsorted(keys, distinct_keys)] = n
+            elif func == 'count':
+                result = state[f'{column}__count'].to_numpy().astype(np.int64)
+            elif func in ('min', 'max'):
+                result = state[f'{column}__{func}'].to_numpy().astype(dtype)
+            elif func == 'sum':
+                result = _sum_result(state[f'{column}__sum'].to_numpy(), dtype)
+            elif func == 'mean':
+                result = _mean_result(state[f'{column}__sum'].to_numpy(),
+                                      state[f'{column}__count'].to_numpy().astype(np.int64), dtype)
+            else:
+                raise ValueError(f"Agregação não suportada: {func} (use {', '.join(FUNCTIONS)})")
+            columns.append(result)
+            labels.append((column, func) if multi else column)
+
+    result = pd.DataFrame(dict(enumerate(columns)), index=pd.Index(keys, name=key))
+    result.columns = pd.MultiIndex.from_tuples(labels) if multi else pd.Index(labels)
+    return result
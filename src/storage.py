@@ -0,0 +1,395 @@
+"""
+Leitura (e escrita de datasets particionados) compartilhada das camadas em Parquet.
+Cada etapa declara as colunas (e filtros opcionais de linhas) de que precisa; a
+projeção e os filtros são repassados ao pyarrow, de modo que column chunks não usados
+nunca são lidos nem decodificados e row groups descartados pelas estatísticas
+(min/max) são pulados. Cada leitura registra os bytes lidos vs. o tamanho do arquivo.
+Dentro de uma execução do pipeline com LAYER_CACHE_MB, arquivos recém-gravados são
+servidos pelo cache de camadas em memória (src/layer_cache.py), sem reler o Parquet.
+
+A escrita das camadas também passa por aqui (`write_parquet`/`write_parquet_batches`):
+sempre atômica (.tmp + os.replace, erros propagados) e com codec, nível, dicionário,
+row groups, ordenação e estatísticas configuráveis por camada
+(PARQUET_<CAMADA>_OPTIONS, ver `write_options`).
+"""
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from src import layer_cache
+from src.config import PARQUET_WRITE_OPTIONS
+from src.instrumentation import span
+
+# Opções de escrita (padrão do pyarrow; cada camada sobrescreve via PARQUET_<CAMADA>_OPTIONS)
+CODECS = ("snappy", "zstd", "lz4", "gzip", "brotli", "none")
+DEFAULT_WRITE_OPTIONS = {
+    "codec": "snappy", "level": None, "dictionary": True,
+    "row_group_size": None, "statistics": True, "sort_by": [],
+}
+
+# Operadores de filtro (formato DNF do pyarrow) avaliáveis pelas estatísticas
+_PRUNABLE_OPS = {"==", "=", "<", "<=", ">", ">=", "in"}
+
+
+def _row_group_may_match(row_group, filters):
+    """False só quando as estatísticas provam que nenhuma linha satisfaz os filtros (AND)."""
+    names = [row_group.column(i).path_in_schema for i in range(row_group.num_columns)]
+    for column, op, value in filters:
+        if op not in _PRUNABLE_OPS or column not in names:
+            continue
+        stats = row_group.column(names.index(column)).statistics
+        if stats is None or not stats.has_min_max:
+            continue
+        low, high = stats.min, stats.max
+        try:
+            if op in ("==", "="):
+                matches = low <= value <= high
+            elif op == "in":
+                matches = any(low <= v <= high for v in value)
+            elif op == "<":
+                matches = low < value
+            elif op == "<=":
+                matches = low <= value
+            elif op == ">":
+                matches = high > value
+            else:
+                matches = high >= value
+        except TypeError:
+            continue
+        if not matches:
+            return False
+    return True
+
+
+def projected_bytes(path, columns=None, filters=None):
+    """
+    Bytes (comprimidos) dos column chunks que uma leitura projetada precisa buscar:
+    só as colunas pedidas, nos row groups não descartados pelas estatísticas.
+    Filtros em DNF (lista de listas) são tratados de forma conservadora.
+    """
+    metadata = pq.read_metadata(path)
+    wanted = None if columns is None else set(columns)
+    conjunctive = filters if filters and not isinstance(filters[0], list) else None
+
+    total = 0
+    for i in range(metadata.num_row_groups):
+        row_group = metadata.row_group(i)
+        if conjunctive and not _row_group_may_match(row_group, conjunctive):
+            continue
+        for j in range(row_group.num_columns):
+            chunk = row_group.column(j)
+            if wanted is None or chunk.path_in_schema in wanted:
+                total += chunk.total_compressed_size
+    return total
+
+
+def _report_read(path, columns=None, filters=None):
+    file_size = os.path.getsize(path)
+    read_size = projected_bytes(path, columns, filters)
+    share = read_size / file_size * 100 if file_size else 0.0
+    n_cols = "todas" if columns is None else len(columns)
+    print(f"Lido: {os.path.basename(path)} | colunas: {n_cols} | "
+          f"{read_size / 1024**2:.1f} MB de {file_size / 1024**2:.1f} MB ({share:.0f}%)")
+    return read_size
+
+
+def _cached_table(path, columns=None, filters=None):
+    """Tabela do cache de camadas com a mesma projeção/filtros da leitura, ou None."""
+    table = layer_cache.get(path)
+    if table is None:
+        return None
+    if filters:
+        table = table.filter(pq.filters_to_expression(filters))
+    if columns is not None:
+        table = table.select(columns)
+    print(f"Lido (cache): {os.path.basename(path)} | colunas: "
+          f"{'todas' if columns is None else len(columns)} | {table.num_rows} linhas")
+    return table
+
+
+def read_parquet(path, columns=None, filters=None):
+    """
+    Lê um Parquet com projeção de colunas e filtros empurrados para o pyarrow.
+    `filters` usa o formato do pyarrow, ex.: [('months_balance', '>=', -12)].
+    """
+    with span("read_parquet", path=os.path.basename(path)) as event:
+        table = _cached_table(path, columns, filters)
+        if table is not None:
+            df = table.to_pandas()
+            event.update(rows_out=len(df), bytes=0, cached=True)
+            return df
+        df = pd.read_parquet(path, engine="pyarrow", columns=columns, filters=filters)
+        event.update(rows_out=len(df), bytes=_report_read(path, columns, filters))
+    return df
+
+
+def iter_batches(path, columns=None, batch_size=1_000_000):
+    """
+    Lê um Parquet em lotes (pyarrow.RecordBatch) com projeção de colunas:
+    a memória fica limitada ao lote, não ao tamanho da tabela.
+    """
+    table = _cached_table(path, columns)
+    if table is not None:
+        yield from table.to_batches(max_chunksize=batch_size)
+        return
+    _report_read(path, columns)
+    parquet_file = pq.ParquetFile(path)
+    yield from parquet_file.iter_batches(batch_size=batch_size, columns=columns)
+
+
+def partition_by_key(path, key, n_partitions, out_dir, columns=None, batch_size=1_000_000):
+    """
+    Particiona um Parquet por hash (módulo) da chave inteira `key` em até
+    `n_partitions` arquivos em `out_dir`, lendo em lotes. A ordem relativa das
+    linhas é preservada dentro de cada partição. Retorna os caminhos gerados
+    (partições vazias não são criadas).
+    """
+    writers = {}
+    try:
+        for batch in iter_batches(path, columns, batch_size):
+            parts = batch.column(key).to_numpy(zero_copy_only=False) % n_partitions
+            order = np.argsort(parts, kind='stable')
+            bounds = np.searchsorted(parts[order], np.arange(n_partitions + 1))
+            ordered = batch.take(pa.array(order))
+            for p in range(n_partitions):
+                if bounds[p] == bounds[p + 1]:
+                    continue
+                if p not in writers:
+                    part_path = os.path.join(out_dir, f"part-{p:04d}.parquet")
+                    writers[p] = pq.ParquetWriter(part_path, batch.schema)
+                writers[p].write_batch(ordered.slice(bounds[p], bounds[p + 1] - bounds[p]))
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return [os.path.join(out_dir, f"part-{p:04d}.parquet") for p in sorted(writers)]
+
+
+def parse_write_options(text):
+    """
+    Opções de escrita a partir do texto de PARQUET_<CAMADA>_OPTIONS, ex.:
+    "codec=zstd level=3 dictionary=1 row_group_size=131072 statistics=1 sort_by=sk_id_curr".
+    """
+    options = {}
+    for item in text.split():
+        name, sep, value = item.partition("=")
+        if not sep or name not in DEFAULT_WRITE_OPTIONS:
+            raise ValueError(f"Opção de escrita inválida: {item} (use {', '.join(DEFAULT_WRITE_OPTIONS)})")
+        if name == "codec":
+            if value not in CODECS:
+                raise ValueError(f"Codec não suportado: {value} (use {', '.join(CODECS)})")
+            options[name] = value
+        elif name in ("level", "row_group_size"):
+            options[name] = int(value)
+        elif name in ("dictionary", "statistics"):
+            options[name] = value.lower() in ("1", "true", "yes")
+        else:
+            options[name] = [c for c in value.split(",") if c]
+    return options
+
+
+def write_options(layer=None, **overrides):
+    """Opções de escrita: padrão < configuração da camada (`layer`) < `overrides` não nulos."""
+    options = dict(DEFAULT_WRITE_OPTIONS)
+    if layer is not None:
+        options.update(parse_write_options(PARQUET_WRITE_OPTIONS.get(layer, "")))
+    options.update({name: value for name, value in overrides.items() if value is not None})
+    return options
+
+
+def _parquet_kwargs(options):
+    """Argumentos do pyarrow (ParquetWriter / write_table) para as opções de escrita."""
+    codec = options["codec"]
+    return {
+        "compression": None if codec == "none" else codec,
+        "compression_level": options["level"] if codec in ("zstd", "gzip", "brotli") else None,
+        "use_dictionary": options["dictionary"],
+        "write_statistics": options["statistics"],
+    }
+
+
+def _as_table(data):
+    return data if isinstance(data, pa.Table) else pa.Table.from_pandas(data, preserve_index=False)
+
+
+def _sorted(table, sort_by):
+    keys = [c for c in sort_by if c in table.column_names]
+    return table.sort_by([(c, "ascending") for c in keys]) if keys else table
+
+
+def write_parquet(data, path, layer=None, **overrides):
+    """
+    Grava `data` (DataFrame ou tabela Arrow) em `path` com as opções de escrita de
+    `layer` ("bronze", "silver", "gold"; `overrides` vencem): grava em `path.tmp` e só
+    então substitui o destino (os.replace). Em erro, o .tmp é removido e a exceção
+    propagada; o arquivo anterior fica intacto. Retorna os bytes gravados.
+    """
+    options = write_options(layer, **overrides)
+    table = _sorted(_as_table(data), options["sort_by"])
+    temp_path = path + ".tmp"
+    try:
+        with span("write_parquet", path=os.path.basename(path), rows_in=table.num_rows) as event:
+            pq.write_table(table, temp_path, row_group_size=options["row_group_size"],
+                           **_parquet_kwargs(options))
+            os.replace(temp_path, path)
+            event["bytes"] = os.path.getsize(path)
+    except Exception as e:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise e
+    layer_cache.put(path, table)
+    return event["bytes"]
+
+
+def write_parquet_batches(batches, path, layer=None, mismatch_hint="", **overrides):
+    """
+    Versão em streaming de `write_parquet`: cada lote (DataFrame ou tabela Arrow) é
+    anexado ao .tmp (um ou mais row groups) e o destino só é substituído após o
+    último lote. O schema é fixado pelo primeiro lote e os demais são convertidos
+    para ele (ValueError, com `mismatch_hint`, se não der). `sort_by` não se aplica.
+    Retorna (linhas, colunas) gravadas.
+    """
+    options = write_options(layer, **overrides)
+    temp_path = path + ".tmp"
+    writer = None
+    rows = 0
+    cached = layer_cache.TableCollector()
+    try:
+        with span("write_parquet", path=os.path.basename(path)) as event:
+            for batch in batches:
+                table = _as_table(batch)
+                if writer is None:
+                    writer = pq.ParquetWriter(temp_path, table.schema, **_parquet_kwargs(options))
+                try:
+                    table = table.cast(writer.schema)
+                except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as e:
+                    raise ValueError(f"Tipo de coluna divergente entre lotes ({e}). {mismatch_hint}".strip()) from e
+                writer.write_table(table, row_group_size=options["row_group_size"])
+                cached.add(table)
+                rows += table.num_rows
+
+            if writer is None:
+                raise ValueError("Nenhum lote recebido para escrita.")
+            n_cols = len(writer.schema)
+            writer.close()
+            writer = None
+            os.replace(temp_path, path)
+            event.update(rows_in=rows, bytes=os.path.getsize(path))
+    except Exception as e:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise e
+    cached.commit(path)
+    return rows, n_cols
+
+
+def available_columns(path):
+    """Colunas de um Parquet, lidas apenas do footer."""
+    return pq.read_schema(path).names
+
+
+def replace_directory(temp_path, path):
+    """
+    Troca o diretório `path` pelo recém-gravado `temp_path`: o anterior é renomeado
+    para `.old` e removido ao final; em caso de falha na troca, é restaurado.
+    """
+    old_path = path + ".old"
+    if os.path.exists(old_path):
+        shutil.rmtree(old_path)
+    if os.path.exists(path):
+        print(f"Substituindo dataset existente: {os.path.basename(path)}")
+        os.replace(path, old_path)
+    try:
+        os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(old_path):
+            os.replace(old_path, path)
+        raise
+    if os.path.exists(old_path):
+        shutil.rmtree(old_path)
+
+
+def write_partitioned_atomic(df, path, partition_cols, sort_by=None, row_group_size=65_536, layer=None):
+    """
+    Grava `df` como dataset Parquet particionado (hive: col=valor/part-N.parquet),
+    ordenado por `sort_by` dentro de cada partição, em row groups de até
+    `row_group_size` linhas com estatísticas min/max, mais um `_metadata` com os
+    footers de todos os arquivos (leitores planejam a leitura sem abrir cada arquivo).
+    Codec, dicionário e estatísticas seguem as opções de escrita de `layer`.
+
+    Escrita atômica no nível do dataset: tudo é gravado em `path + ".tmp"` e só
+    então trocado pelo diretório anterior (renomeado para `.old` e removido ao final;
+    em caso de falha na troca, o dataset antigo é restaurado).
+    """
+    temp_path, old_path = path + ".tmp", path + ".old"
+    for leftover in (temp_path, old_path):
+        if os.path.exists(leftover):
+            shutil.rmtree(leftover)
+
+    sort_keys = list(partition_cols) + [c for c in (sort_by or []) if c not in partition_cols]
+    table = pa.Table.from_pandas(
+        df.sort_values(sort_keys, kind='stable') if sort_keys else df, preserve_index=False
+    )
+    # Valores de partição como texto (categorias viram nomes de diretório)
+    for col in partition_cols:
+        idx = table.schema.get_field_index(col)
+        table = table.set_column(idx, col, table.column(col).cast(pa.string()))
+
+    collected = []
+
+    def collect(written_file):
+        written_file.metadata.set_file_path(os.path.relpath(written_file.path, temp_path).replace(os.sep, "/"))
+        collected.append(written_file.metadata)
+
+    try:
+        with span("write_dataset", path=os.path.basename(path), rows_in=table.num_rows):
+            ds.write_dataset(
+                table, temp_path, format="parquet",
+                partitioning=ds.partitioning(table.select(partition_cols).schema, flavor="hive"),
+                file_options=ds.ParquetFileFormat().make_write_options(**_parquet_kwargs(write_options(layer))),
+                max_rows_per_group=row_group_size, min_rows_per_group=min(row_group_size, 1024),
+                file_visitor=collect, existing_data_behavior="error",
+            )
+        file_schema = collected[0].schema.to_arrow_schema() if collected else table.drop(partition_cols).schema
+        pq.write_metadata(file_schema, os.path.join(temp_path, "_common_metadata"))
+        pq.write_metadata(file_schema, os.path.join(temp_path, "_metadata"), metadata_collector=collected)
+
+        replace_directory(temp_path, path)
+    except Exception as e:
+        if os.path.exists(temp_path):
+            shutil.rmtree(temp_path)
+        raise e
+    return len(collected)
+
+
+def open_dataset(path):
+    """Dataset particionado (hive), usando o `_metadata` quando existir."""
+    metadata_path = os.path.join(path, "_metadata")
+    if os.path.exists(metadata_path):
+        return ds.parquet_dataset(metadata_path, partitioning=ds.partitioning(flavor="hive"))
+    return ds.dataset(path, format="parquet", partitioning="hive")
+
+
+def read_dataset(path, columns=None, filters=None):
+    """
+    Lê um dataset particionado com poda de partições (pelos diretórios hive) e de
+    row groups (pelas estatísticas min/max) para os `filters` (formato pyarrow).
+    Registra quantos row groups foram de fato lidos.
+    """
+    dataset = open_dataset(path)
+    expression = pq.filters_to_expression(filters) if filters else None
+
+    total_groups = sum(f.num_row_groups for f in dataset.get_fragments())
+    kept = [rg for fragment in dataset.get_fragments(filter=expression)
+            for rg in fragment.split_by_row_group(filter=expression, schema=dataset.schema)]
+    print(f"Lido: {os.path.basename(path)}/ | colunas: {'todas' if columns is None else len(columns)} | "
+          f"row groups: {len(kept)} de {total_groups}")
+
+    table = dataset.to_table(columns=columns, filter=expression)
+    return table.to_pandas()
@@ -0,0 +1,298 @@
+"""
+Gerador de dados sintéticos da camada Raw (os oito CSV de files_to_ingest).
+As colunas e tipos vêm do registro de schemas (src/schemas.py); as cardinalidades
+entre sk_id_curr, sk_id_bureau e sk_id_prev, as taxas de nulos e o sentinela 365243
+dos campos de dias seguem as proporções do dataset original. Em escala 1x são
+~356 mil clientes (307.511 treino / 48.744 teste), ~1,7 mi de registros no bureau,
+~27 mi de meses em bureau_balance e ~1,7 mi de pedidos anteriores.
+
+Os clientes são gerados em blocos e cada bloco é anexado aos oito arquivos, de modo
+que a memória fica limitada ao bloco mesmo em escala 10x. Cada CSV é gravado em
+`.tmp` e trocado no final (os.replace). Uso:
+
+    python -m src.synthetic_data --out data/raw --scale 0.01
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+from src import schemas
+
+DAYS_SENTINEL = 365243
+
+# Tamanhos na escala 1x (dataset original)
+N_CLIENTS = 356_255
+TRAIN_SHARE = 307_511 / N_CLIENTS
+FIRST_CLIENT_ID = 100_002
+FIRST_BUREAU_ID = 5_000_000
+FIRST_PREV_ID = 1_000_000
+DEFAULT_RATE = 0.0807
+
+# Relações entre chaves: (fração de pais com filhos, média de filhos por pai com filhos)
+BUREAU_PER_CLIENT = (0.857, 5.62)
+BALANCE_PER_BUREAU = (0.476, 33.4)
+PREV_PER_CLIENT = (0.949, 4.94)
+POS_PER_PREV = (0.560, 10.7)
+INSTALLMENTS_PER_PREV = (0.597, 13.6)
+CARD_PER_PREV = (0.062, 36.9)
+
+# Vocabulários das colunas categóricas mais usadas (demais: rótulos genéricos)
+VOCABULARIES = {
+    'name_contract_type': ['Cash loans', 'Revolving loans'],
+    'code_gender': ['F', 'M', 'XNA'],
+    'flag_own_car': ['N', 'Y'],
+    'flag_own_realty': ['Y', 'N'],
+    'name_type_suite': ['Unaccompanied', 'Family', 'Spouse, partner', 'Children', 'Other_A'],
+    'name_income_type': ['Working', 'Commercial associate', 'Pensioner', 'State servant', 'Unemployed'],
+    'name_education_type': ['Secondary / secondary special', 'Higher education', 'Incomplete higher',
+                            'Lower secondary', 'Academic degree'],
+    'name_family_status': ['Married', 'Single / not married', 'Civil marriage', 'Separated', 'Widow'],
+    'name_housing_type': ['House / apartment', 'With parents', 'Municipal apartment', 'Rented apartment'],
+    'occupation_type': ['Laborers', 'Sales staff', 'Core staff', 'Managers', 'Drivers', 'Accountants'],
+    'weekday_appr_process_start': ['MONDAY', 'TUESDAY', 'WEDNESDAY', 'THURSDAY', 'FRIDAY',
+                                   'SATURDAY', 'SUNDAY'],
+    'organization_type': ['Business Entity Type 3', 'XNA', 'Self-employed', 'Other', 'Medicine', 'Government'],
+    'credit_active': ['Closed', 'Active', 'Sold', 'Bad debt'],
+    'credit_currency': ['currency 1', 'currency 2', 'currency 3', 'currency 4'],
+    'credit_type': ['Consumer credit', 'Credit card', 'Car loan', 'Mortgage', 'Microloan'],
+    'status': ['C', '0', 'X', '1', '5', '2', '3', '4'],
+    'name_contract_status': ['Active', 'Completed', 'Signed', 'Approved', 'Refused', 'Canceled'],
+    'name_cash_loan_purpose': ['XAP', 'XNA', 'Repairs', 'Other', 'Urgent needs'],
+    'name_payment_type': ['Cash through the bank', 'XNA', 'Non-cash from your account'],
+    'code_reject_reason': ['XAP', 'HC', 'LIMIT', 'SCO', 'CLIENT'],
+    'name_client_type': ['Repeater', 'New', 'Refreshed', 'XNA'],
+    'name_portfolio': ['POS', 'Cash', 'XNA', 'Cards'],
+    'name_product_type': ['XNA', 'x-sell', 'walk-in'],
+    'name_yield_group': ['XNA', 'middle', 'high', 'low_normal', 'low_action'],
+}
+
+# Frações de nulos por coluna (demais: 0; medidas de moradia: HOUSING_NULL_RATE)
+NULL_RATES = {
+    'amt_annuity': 0.0001, 'amt_goods_price': 0.001, 'name_type_suite': 0.004,
+    'own_car_age': 0.66, 'occupation_type': 0.31, 'cnt_fam_members': 0.00001,
+    'ext_source_1': 0.56, 'ext_source_2': 0.002, 'ext_source_3': 0.20,
+    'fondkapremont_mode': 0.68, 'housetype_mode': 0.50, 'totalarea_mode': 0.48,
+    'wallsmaterial_mode': 0.51, 'emergencystate_mode': 0.47,
+    'obs_30_cnt_social_circle': 0.003, 'def_30_cnt_social_circle': 0.003,
+    'obs_60_cnt_social_circle': 0.003, 'def_60_cnt_social_circle': 0.003,
+    'days_registration': 0.0, 'days_last_phone_change': 0.00001,
+    **{f'amt_req_credit_bureau_{p}': 0.135 for p in ('hour', 'day', 'week', 'mon', 'qrt', 'year')},
+    # bureau
+    'days_credit_enddate': 0.06, 'days_enddate_fact': 0.37, 'amt_credit_max_overdue': 0.65,
+    'amt_credit_sum': 0.00001, 'amt_credit_sum_debt': 0.15, 'amt_credit_sum_limit': 0.34,
+    # previous_application
+    'amt_application': 0.0, 'amt_down_payment': 0.54, 'rate_down_payment': 0.54,
+    'rate_interest_primary': 0.997, 'rate_interest_privileged': 0.997,
+    'cnt_payment': 0.22, 'days_first_drawing': 0.40, 'days_first_due': 0.40,
+    'days_last_due_1st_version': 0.40, 'days_last_due': 0.40, 'days_termination': 0.40,
+    'nflag_insured_on_approval': 0.40,
+    # balances / installments
+    'cnt_instalment': 0.003, 'cnt_instalment_future': 0.003, 'amt_drawings_atm_current': 0.20,
+    'amt_drawings_other_current': 0.20, 'amt_drawings_pos_current': 0.20,
+    'amt_inst_min_regularity': 0.08, 'amt_payment_current': 0.20,
+    'cnt_drawings_atm_current': 0.20, 'cnt_drawings_other_current': 0.20,
+    'cnt_drawings_pos_current': 0.20, 'cnt_instalment_mature_cum': 0.08,
+    'days_entry_payment': 0.0002, 'amt_payment': 0.0002,
+}
+HOUSING_NULL_RATE = 0.55
+
+# Frações do sentinela 365243 ("data não aplicável") entre os valores não nulos
+SENTINEL_RATES = {
+    'days_employed': 0.18,
+    'days_first_drawing': 0.96, 'days_first_due': 0.025, 'days_last_due_1st_version': 0.06,
+    'days_last_due': 0.21, 'days_termination': 0.22,
+}
+
+# Faixas inteiras (mín., máx.) — dentro dos tipos do registro
+INT_RANGES = {
+    'cnt_children': (0, 5), 'days_birth': (-25_229, -7_489), 'days_employed': (-17_912, 0),
+    'days_id_publish': (-7_197, 0), 'region_rating_client': (1, 3),
+    'region_rating_client_w_city': (1, 3), 'hour_appr_process_start': (0, 23),
+    'days_credit': (-2_922, 0), 'credit_day_overdue': (0, 30), 'cnt_credit_prolong': (0, 2),
+    'days_credit_update': (-2_900, 0), 'days_decision': (-2_922, -1),
+    'sellerplace_area': (-1, 4_000), 'amt_credit_limit_actual': (0, 1_350_000),
+    'cnt_drawings_current': (0, 20), 'sk_dpd': (0, 15), 'sk_dpd_def': (0, 5),
+}
+FLAG_RATES = {'flag_mobil': 1.0, 'flag_emp_phone': 0.82, 'flag_cont_mobile': 0.998,
+              'flag_document_3': 0.71, 'nflag_last_appl_in_day': 0.996}
+
+
+def child_counts(rng, n_parents, share, mean):
+    """Filhos por pai: `share` dos pais têm ao menos 1 (1 + Poisson(mean - 1))."""
+    counts = 1 + rng.poisson(mean - 1, n_parents)
+    counts[rng.random(n_parents) >= share] = 0
+    return counts
+
+
+def with_nulls(rng, values, rate, dtype=None):
+    """Array Arrow com ~`rate` de nulos (tipo explícito: lotes sem valores mantêm o schema)."""
+    mask = rng.random(len(values)) < rate if rate > 0 else None
+    return pa.array(values, type=dtype, mask=mask)
+
+
+def column_values(rng, name, dtype, n):
+    """Valores sintéticos de uma coluna a partir do nome e do tipo registrado."""
+    if dtype == schemas.CATEGORY:
+        vocabulary = VOCABULARIES.get(name, [f'{name.upper()}_{i}' for i in range(4)])
+        weights = 0.6 ** np.arange(len(vocabulary))  # primeiros valores mais frequentes
+        values = np.array(vocabulary, dtype=object)[rng.choice(len(vocabulary), n, p=weights / weights.sum())]
+        rate = NULL_RATES.get(name, HOUSING_NULL_RATE if name.endswith('_mode') else 0)
+        return with_nulls(rng, values, rate, pa.string())
+
+    if pa.types.is_integer(dtype):
+        if dtype == schemas.FLAG and name not in INT_RANGES:
+            return (rng.random(n) < FLAG_RATES.get(name, 0.1)).astype(np.int8)
+        low, high = INT_RANGES.get(name, (0, 10))
+        values = rng.integers(low, high + 1, n)
+        if name in SENTINEL_RATES:
+            values[rng.random(n) < SENTINEL_RATES[name]] = DAYS_SENTINEL
+        return values
+
+    # Floats: valores monetários, dias, scores/taxas normalizados e contadores
+    if dtype == schemas.MONEY:
+        values = np.round(rng.lognormal(11.5, 0.8, n), 2)
+    elif name.startswith('days_'):
+        values = rng.integers(-2_922, 0, n).astype(np.float64)
+        if name in SENTINEL_RATES:
+            values[rng.random(n) < SENTINEL_RATES[name]] = DAYS_SENTINEL
+    elif name.startswith(('cnt_', 'obs_', 'def_', 'amt_req_')) or name.endswith('_version'):
+        values = rng.poisson(1.5, n).astype(np.float64)
+    elif name.startswith('nflag_'):
+        values = (rng.random(n) < 0.33).astype(np.float64)
+    else:
+        values = rng.random(n)
+    housing = any(name.startswith(m) for m in schemas.HOUSING_MEASURES) or name == 'totalarea_mode'
+    return with_nulls(rng, values, NULL_RATES.get(name, HOUSING_NULL_RATE if housing else 0), pa.float64())
+
+
+def make_table(rng, file_name, n, keys):
+    """Tabela com todas as colunas registradas do arquivo (nomes em maiúsculas, como no Kaggle)."""
+    columns = {}
+    for name, dtype in schemas.get_schema(file_name).items():
+        columns[name.upper()] = keys[name] if name in keys else column_values(rng, name, dtype, n)
+    return pa.table(columns)
+
+
+def months_sequence(counts):
+    """0, -1, -2, ... reiniciando a cada pai (histórico mensal contíguo)."""
+    starts = np.repeat(np.cumsum(counts) - counts, counts)
+    return -(np.arange(counts.sum()) - starts)
+
+
+def application_keys(rng, ids, with_target, ext_source_2):
+    keys = {'sk_id_curr': ids}
+    if with_target:
+        # Inadimplência ~8%, maior para scores externos baixos (insights do dashboard)
+        logit = np.log(DEFAULT_RATE / (1 - DEFAULT_RATE)) + 2.0 * (0.5 - ext_source_2)
+        keys['target'] = (rng.random(len(ids)) < 1 / (1 + np.exp(-logit))).astype(np.int8)
+        keys['ext_source_2'] = ext_source_2
+    return keys
+
+
+class _Writers:
+    """Um CSVWriter por arquivo, gravando em `.tmp` até o commit final."""
+
+    def __init__(self, out_dir):
+        self.out_dir = out_dir
+        self.writers = {}
+        self.rows = {}
+
+    def write(self, file_name, table):
+        if file_name not in self.writers:
+            self.writers[file_name] = pacsv.CSVWriter(self.path(file_name) + ".tmp", table.schema)
+            self.rows[file_name] = 0
+        self.writers[file_name].write_table(table)
+        self.rows[file_name] += table.num_rows
+
+    def path(self, file_name):
+        return os.path.join(self.out_dir, file_name)
+
+    def close(self, commit):
+        for file_name, writer in self.writers.items():
+            writer.close()
+            temp_path = self.path(file_name) + ".tmp"
+            if commit:
+                os.replace(temp_path, self.path(file_name))
+            elif os.path.exists(temp_path):
+                os.remove(temp_path)
+
+
+def generate(out_dir, scale=1.0, seed=42, chunk_clients=20_000):
+    """
+    Gera os oito CSV em `out_dir` na escala pedida (1.0 = tamanho original).
+    Retorna {arquivo: linhas}.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    n_clients = max(int(round(N_CLIENTS * scale)), 2)
+    next_bureau, next_prev = FIRST_BUREAU_ID, FIRST_PREV_ID
+    writers = _Writers(out_dir)
+
+    try:
+        for start in range(0, n_clients, chunk_clients):
+            ids = np.arange(start, min(start + chunk_clients, n_clients), dtype=np.int64) + FIRST_CLIENT_ID
+            is_train = rng.random(len(ids)) < TRAIN_SHARE
+            if start == 0:  # garante as duas partições mesmo em escalas minúsculas
+                is_train[0], is_train[-1] = True, False
+
+            # application_train / application_test
+            train_ids, test_ids = ids[is_train], ids[~is_train]
+            score = rng.random(len(train_ids))
+            writers.write('application_train.csv', make_table(
+                rng, 'application_train.csv', len(train_ids), application_keys(rng, train_ids, True, score)))
+            writers.write('application_test.csv', make_table(
+                rng, 'application_test.csv', len(test_ids), application_keys(rng, test_ids, False, None)))
+
+            # bureau -> bureau_balance
+            per_client = child_counts(rng, len(ids), *BUREAU_PER_CLIENT)
+            bureau_ids = np.arange(next_bureau, next_bureau + per_client.sum())
+            next_bureau += len(bureau_ids)
+            writers.write('bureau.csv', make_table(rng, 'bureau.csv', len(bureau_ids), {
+                'sk_id_curr': np.repeat(ids, per_client), 'sk_id_bureau': bureau_ids}))
+
+            months = child_counts(rng, len(bureau_ids), *BALANCE_PER_BUREAU)
+            writers.write('bureau_balance.csv', make_table(rng, 'bureau_balance.csv', months.sum(), {
+                'sk_id_bureau': np.repeat(bureau_ids, months), 'months_balance': months_sequence(months)}))
+
+            # previous_application -> POS_CASH / installments / credit card
+            per_client = child_counts(rng, len(ids), *PREV_PER_CLIENT)
+            prev_ids = np.arange(next_prev, next_prev + per_client.sum())
+            prev_clients = np.repeat(ids, per_client)
+            next_prev += len(prev_ids)
+            writers.write('previous_application.csv', make_table(rng, 'previous_application.csv', len(prev_ids), {
+                'sk_id_prev': prev_ids, 'sk_id_curr': prev_clients}))
+
+            for file_name, relation in (('POS_CASH_balance.csv', POS_PER_PREV),
+                                        ('installments_payments.csv', INSTALLMENTS_PER_PREV),
+                                        ('credit_card_balance.csv', CARD_PER_PREV)):
+                counts = child_counts(rng, len(prev_ids), *relation)
+                keys = {'sk_id_prev': np.repeat(prev_ids, counts), 'sk_id_curr': np.repeat(prev_clients, counts)}
+                if file_name == 'installments_payments.csv':
+                    keys['num_instalment_number'] = 1 - months_sequence(counts)
+                else:
+                    keys['months_balance'] = months_sequence(counts) - 1
+                writers.write(file_name, make_table(rng, file_name, counts.sum(), keys))
+    except Exception:
+        writers.close(commit=False)
+        raise
+    writers.close(commit=True)
+    return dict(writers.rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera os CSV da camada Raw com dados sintéticos")
+    parser.add_argument("--out", default="data/raw", help="Pasta de saída (padrão: data/raw)")
+    parser.add_argument("--scale", type=float, default=0.01,
+                        help="Fator de escala sobre o dataset original (ex.: 0.01, 1, 10)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    start_time = time.time()
+    rows = generate(args.out, scale=args.scale, seed=args.seed)
+    for file_name, n in rows.items():
+        print(f"{file_name:<30} {n:>12,} linhas")
+    print(f"Gerado em {args.out} (escala {args.scale}) em {time.time() - start_time:.1f}s")
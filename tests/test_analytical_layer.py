@@ -0,0 +1,62 @@
+"""Testes da montagem da OBT (03_analytical_layer)."""
+import importlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def gold():
+    return importlib.import_module("src.03_analytical_layer")
+
+
+def test_align_to_obt_matches_chained_merges(gold):
+    """O take posicional dá exatamente a mesma OBT que a sequência de merges."""
+    rng = np.random.default_rng(3)
+    fact = pd.DataFrame({
+        "sk_id_curr": rng.permutation(np.arange(100, 400)).astype("int32"),
+        "code_gender": pd.Categorical(rng.choice(["F", "M"], 300)),
+        "amt_income_total": rng.normal(1e5, 1e4, 300),
+    })
+    dim_a = pd.DataFrame({  # cobre só parte dos clientes: colunas int viram float
+        "sk_id_curr": np.arange(50, 300, 2).astype("int32"),
+        "A_COUNT": rng.integers(0, 10, 125),
+        "A_MEAN": rng.random(125).astype("float32"),
+    })
+    dim_b = pd.DataFrame({  # cobre todos: int permanece int
+        "sk_id_curr": np.arange(100, 400).astype("int32"),
+        "B_SUM": rng.integers(0, 5, 300),
+    })
+    dim_empty = pd.DataFrame({"sk_id_curr": pd.Series([], dtype="int32"), "C_MAX": pd.Series([], dtype="float64")})
+    dimensions = [dim_a, dim_b, dim_empty]
+
+    expected = gold.merge_to_obt(fact, "teste", dimensions)
+    result = gold.align_to_obt(fact, "teste", dimensions)
+
+    pd.testing.assert_frame_equal(result, expected, check_exact=True)
+    assert result["A_COUNT"].dtype == "float64"
+    assert result["B_SUM"].dtype == "int64"
+
+
+def test_align_to_obt_rejects_duplicated_dimension_keys(gold):
+    fact = pd.DataFrame({"sk_id_curr": [1, 2]})
+    dim = pd.DataFrame({"sk_id_curr": [1, 1], "X": [1, 2]})
+    with pytest.raises(ValueError, match="duplicado"):
+        gold.align_to_obt(fact, "teste", [dim])
+
+
+def test_side_artifacts_are_removed_when_disabled(gold, tmp_path, monkeypatch):
+    monkeypatch.setattr(gold, "GOLD_PATH", str(tmp_path))
+    df = pd.DataFrame({"sk_id_curr": np.arange(10, dtype="int32"), "x": np.arange(10.0)})
+    monkeypatch.setattr(gold, "FEATURE_STORE", True)
+    monkeypatch.setattr(gold, "MODEL_EXPORT", True)
+    gold.save_feature_store(df, "obt")
+    gold.save_model_matrix(df, "obt")
+    assert (tmp_path / "obt.features.arrow").exists() and (tmp_path / "obt.matrix").is_dir()
+
+    monkeypatch.setattr(gold, "FEATURE_STORE", False)
+    monkeypatch.setattr(gold, "MODEL_EXPORT", False)
+    gold.save_feature_store(df, "obt")
+    gold.save_model_matrix(df, "obt")
+    assert not (tmp_path / "obt.features.arrow").exists() and not (tmp_path / "obt.matrix").exists()
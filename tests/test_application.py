@@ -0,0 +1,87 @@
+"""Testes do fato application (02_transform_application): modo em duas passadas x concat."""
+import importlib
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from src.schemas import CATEGORY
+
+
+@pytest.fixture
+def app():
+    return importlib.import_module("src.02_transform_application")
+
+
+def make_application(rng, ids, with_target, statuses):
+    n = len(ids)
+    columns = {
+        "sk_id_curr": pa.array(ids, pa.int32()),
+        "name_contract_type": pa.array(rng.choice(statuses, n)).dictionary_encode().cast(CATEGORY),
+        "code_gender": pa.array(rng.choice(["F", "M", None], n), pa.string()),
+        "cnt_children": pa.array(rng.integers(0, 4, n), pa.int8()),
+        "amt_income_total": pa.array(rng.lognormal(11, 0.5, n)),
+        "amt_credit": pa.array(rng.lognormal(12, 0.5, n)),
+        "amt_annuity": pa.array(np.where(rng.random(n) < 0.05, np.nan, rng.lognormal(9, 0.5, n))),
+        "days_birth": pa.array(rng.integers(-25000, -7000, n), pa.int32()),
+        "days_employed": pa.array(np.where(rng.random(n) < 0.2, 365243, rng.integers(-9000, 0, n)), pa.int32()),
+        "days_registration": pa.array(rng.integers(-9000, 0, n).astype("float32")),
+        "days_id_publish": pa.array(rng.integers(-6000, 0, n), pa.int32()),
+        "ext_source_1": pa.array(np.where(rng.random(n) < 0.5, np.nan, rng.random(n)).astype("float32")),
+        "ext_source_2": pa.array(rng.random(n).astype("float32")),
+        "ext_source_3": pa.array(np.where(rng.random(n) < 0.2, np.nan, rng.random(n)).astype("float32")),
+        "apartments_avg": pa.array(np.where(rng.random(n) < 0.5, np.nan, rng.random(n)).astype("float32")),
+        "housetype_mode": pa.array(rng.choice(["block of flats", None], n)).dictionary_encode().cast(CATEGORY),
+        # Inteiro com nulos só numa das tabelas: float64 na concatenação
+        "hour_appr_process_start": pa.array(rng.integers(0, 24, n), pa.int8(),
+                                            mask=(rng.random(n) < 0.1) if not with_target else None),
+    }
+    if with_target:
+        columns = {"sk_id_curr": columns.pop("sk_id_curr"),
+                   "target": pa.array(rng.random(n) < 0.1).cast(pa.int8()), **columns}
+    return pa.table(columns)
+
+
+@pytest.fixture(params=["sorted", "shuffled"])
+def bronze(request, tmp_path):
+    """Train/test com duplicatas (dentro do train e entre train e test) e vocabulários diferentes."""
+    rng = np.random.default_rng(4)
+    train_ids = np.arange(1000, 3000)
+    train_ids[100:110] = train_ids[90:100]  # duplicatas no train
+    test_ids = np.arange(2990, 3400)  # 10 ids também presentes no train
+    if request.param == "shuffled":
+        train_ids = rng.permutation(train_ids)
+    train = make_application(rng, train_ids, True, ["Cash loans", "Revolving loans"])
+    test = make_application(rng, test_ids, False, ["Cash loans", "Consumer loans"])
+
+    paths = {}
+    for name, table in (("train", train), ("test", test)):
+        paths[name] = str(tmp_path / f"application_{name}.parquet")
+        pq.write_table(table, paths[name], row_group_size=300)
+    return paths
+
+
+def run(app, bronze, tmp_path, mode, **kwargs):
+    outputs = (str(tmp_path / f"{mode}_train.parquet"), str(tmp_path / f"{mode}_test.parquet"))
+    transform = getattr(app, f"transform_{mode}")
+    shapes = transform(bronze["train"], bronze["test"], *outputs, **kwargs)
+    return shapes, outputs
+
+
+def test_two_pass_matches_concat(app, bronze, tmp_path):
+    """Mesmas linhas, ordem, dtypes, categorias (e códigos) e features derivadas."""
+    expected_shapes, expected = run(app, bronze, tmp_path, "concat")
+    shapes, result = run(app, bronze, tmp_path, "two_pass", batch_size=256)
+
+    assert shapes == expected_shapes
+    for path, expected_path in zip(result, expected):
+        pd.testing.assert_frame_equal(pd.read_parquet(path), pd.read_parquet(expected_path))
+        assert pq.read_schema(path).equals(pq.read_schema(expected_path))
+
+    train, test = (pd.read_parquet(p) for p in result)
+    assert train["sk_id_curr"].is_monotonic_increasing and train["sk_id_curr"].is_unique
+    assert not set(train["sk_id_curr"]) & set(test["sk_id_curr"])
+    assert list(train["name_contract_type"].cat.categories) == list(test["name_contract_type"].cat.categories)
+    assert "target" not in test.columns and train["target"].dtype == "float64"
@@ -0,0 +1,22 @@
+"""Testes da detecção de regressões do benchmark (src/benchmark.py)."""
+from src.benchmark import find_regressions
+
+
+def make_run(scale, elapsed, rss, regressions=None):
+    return {"scale": scale, "regressions": regressions or [],
+            "stages": {"obt": {"elapsed": elapsed, "peak_rss_mb": rss}}}
+
+
+def test_find_regressions_uses_median_of_same_scale():
+    history = [make_run(1.0, t, 500) for t in (10.0, 11.0, 30.0)] + [make_run(0.01, 1.0, 100)]
+    # Mediana 11s: 13s está dentro de 25%, 14s não
+    assert find_regressions(history, make_run(1.0, 13.0, 500), threshold=0.25) == []
+    messages = find_regressions(history, make_run(1.0, 14.0, 700), threshold=0.25)
+    assert len(messages) == 2 and messages[0].startswith("obt: elapsed")
+
+
+def test_find_regressions_ignores_noise_and_regressed_runs():
+    history = [make_run(0.01, 0.1, 100), make_run(0.01, 5.0, 100, regressions=["obt"])]
+    # +300% mas só 0,3s acima da linha de base: ruído
+    assert find_regressions(history, make_run(0.01, 0.4, 100), threshold=0.25) == []
+    assert find_regressions([], make_run(0.01, 99.0, 999), threshold=0.25) == []
@@ -0,0 +1,59 @@
+"""Testes da camada de dados do dashboard (src/dashboard_data.py)."""
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from src import dashboard_data
+
+
+def write_obt(path, n=2000, seed=5):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "sk_id_curr": np.arange(n, dtype="int32"),
+        "target": (rng.random(n) < 0.1).astype("float64"),
+        "amt_income_total": rng.lognormal(11, 0.5, n),
+        "years_birth": rng.uniform(21, 69, n),
+        "ext_source_mean": rng.random(n),
+        "name_contract_type": pd.Categorical(rng.choice(["Cash loans", "Revolving loans"], n)),
+        "code_gender": pd.Categorical(rng.choice(["F", "M"], n)),
+        "name_education_type": pd.Categorical(rng.choice(["Higher education", "Secondary"], n)),
+        "name_income_type": pd.Categorical(rng.choice(["Working", "Pensioner", "State servant"], n)),
+        "region_rating_client": rng.integers(1, 4, n).astype("int64"),
+        "amt_credit": rng.random(n),  # não usada pelo dashboard
+    })
+    df.to_parquet(path, index=False)
+    return df
+
+
+def test_load_table_is_projected_compact_and_shared(tmp_path):
+    source = str(tmp_path / "obt.parquet")
+    df = write_obt(source)
+
+    table = dashboard_data.load_table(source)
+    assert table.column_names == list(dashboard_data.DASHBOARD_COLUMNS)
+    assert table.schema.field("amt_income_total").type == pa.float32()
+    assert pa.types.is_dictionary(table.schema.field("code_gender").type)
+    assert os.path.exists(dashboard_data.cache_path(source))
+    # Mesma tabela para todas as chamadas (sessões) do processo
+    assert dashboard_data.load_table(source) is table
+
+    index = dashboard_data.load_index(source)
+    assert dashboard_data.load_index(source) is index
+    selections = {"code_gender": ["F"], "name_contract_type": [], "name_education_type": ["Secondary"]}
+    rows = index.row_ids(index.select(selections))
+    top = dashboard_data.top_rows(table, rows, "amt_income_total", k=10, columns=["sk_id_curr", "amt_income_total"])
+    expected = df[(df["code_gender"] == "F") & (df["name_education_type"] == "Secondary")]
+    expected = expected.nlargest(10, "amt_income_total")
+    assert list(top["sk_id_curr"]) == list(expected["sk_id_curr"])
+
+
+def test_load_table_rebuilds_stale_cache(tmp_path):
+    source = str(tmp_path / "obt.parquet")
+    write_obt(source, n=100)
+    assert dashboard_data.load_table(source).num_rows == 100
+
+    write_obt(source, n=50)
+    os.utime(source, (os.path.getmtime(source) + 10,) * 2)
+    assert dashboard_data.load_table(source).num_rows == 50
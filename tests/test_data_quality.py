@@ -0,0 +1,90 @@
+"""Testes das verificações de qualidade de dados (src/data_quality.py)."""
+import json
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from src import data_quality
+
+
+@pytest.fixture
+def layers(tmp_path, monkeypatch):
+    for layer in ("bronze", "silver"):
+        (tmp_path / layer).mkdir()
+    monkeypatch.setitem(data_quality.LAYER_PATHS, "bronze", lambda: str(tmp_path / "bronze"))
+    monkeypatch.setitem(data_quality.LAYER_PATHS, "silver", lambda: str(tmp_path / "silver"))
+    return tmp_path
+
+
+def write(layers, layer, table, df):
+    df.to_parquet(layers / layer / f"{table}.parquet", index=False, row_group_size=100)
+
+
+def no_scan(*args, **kwargs):
+    raise AssertionError("a regra deveria ser respondida pelo footer")
+
+
+def test_footer_answers_ranges_and_null_ratios(layers, monkeypatch):
+    rng = np.random.default_rng(0)
+    write(layers, "bronze", "t", pd.DataFrame({
+        "months_balance": rng.integers(-96, 0, 500),
+        "amt": np.where(rng.random(500) < 0.2, np.nan, 1.0),
+        "neg": rng.integers(-5, 5, 500),
+    }))
+    monkeypatch.setattr(data_quality, "iter_batches", no_scan)
+    rules = {("bronze", "t"): [
+        {"check": "range", "columns": "months_balance", "max": 0},
+        {"check": "null_ratio", "columns": "amt", "max": 0.3},
+        {"check": "range", "columns": "neg", "min": 0},  # mínimo < 0 sem valores permitidos: falha
+    ]}
+    results = data_quality.run_checks(rules)
+    assert [r["passed"] for r in results] == [True, True, False]
+    assert {r["source"] for r in results} == {"footer"}
+
+
+def test_sentinel_falls_back_to_a_column_scan(layers):
+    days = np.r_[np.arange(-300, 0), [365243] * 50]
+    write(layers, "bronze", "prev", pd.DataFrame({"days_first_due": days, "days_bad": np.r_[days[:-1], 7]}))
+    rules = {("bronze", "prev"): [{"check": "range", "columns": "days_*", "max": 0, "allow": [365243]}]}
+
+    good, bad = data_quality.run_checks(rules)
+    assert good["column"] == "days_first_due" and good["passed"] and good["source"] == "leitura"
+    assert not bad["passed"] and bad["detail"].startswith("1 fora")
+
+
+def test_unique_and_references(layers):
+    write(layers, "silver", "fact", pd.DataFrame({"sk_id_curr": np.arange(100, 400)}))
+    write(layers, "silver", "dim_ok", pd.DataFrame({"sk_id_curr": np.arange(100, 400, 3)}))
+    write(layers, "silver", "dim_dup", pd.DataFrame({"sk_id_curr": np.r_[np.arange(100, 200), 150]}))
+    write(layers, "silver", "dim_orphan", pd.DataFrame({"sk_id_curr": [150, 999]}))
+    references = {"check": "references", "columns": "sk_id_curr", "parents": [("silver", "fact")]}
+    rules = {
+        ("silver", "dim_ok"): [{"check": "unique", "columns": "sk_id_curr"}, references],
+        ("silver", "dim_dup"): [{"check": "unique", "columns": "sk_id_curr"}],
+        ("silver", "dim_orphan"): [references],
+    }
+    results = {(r["table"], r["check"]): r for r in data_quality.run_checks(rules)}
+
+    assert results["dim_ok", "unique"]["passed"] and results["dim_ok", "references"]["passed"]
+    # 101 linhas para 100 valores possíveis: repetição comprovada pelo footer
+    assert not results["dim_dup", "unique"]["passed"] and results["dim_dup", "unique"]["source"] == "footer"
+    # 999 fora da faixa de chaves do fato
+    assert not results["dim_orphan", "references"]["passed"]
+
+
+def test_stage_writes_report_and_fails_only_on_errors(layers, monkeypatch):
+    write(layers, "bronze", "t", pd.DataFrame({"x": [1, 2, 2]}))
+    report = layers / "report.json"
+    monkeypatch.setattr(data_quality, "RULES", {("bronze", "t"): [
+        {"check": "unique", "columns": "x", "severity": "warn"},
+        {"check": "range", "columns": "x", "max": 5},
+    ]})
+    data_quality.run_quality_stage(str(report))
+    assert [r["passed"] for r in json.loads(report.read_text())["results"]] == [False, True]
+
+    monkeypatch.setitem(data_quality.RULES, ("bronze", "t"), [{"check": "unique", "columns": "x"}])
+    with pytest.raises(RuntimeError, match="t.x: 3 linhas para 2"):
+        data_quality.run_quality_stage(str(report))
+    assert pq.read_metadata(layers / "bronze" / "t.parquet").num_rows == 3
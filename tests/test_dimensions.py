@@ -0,0 +1,131 @@
+"""Testes das agregações das dimensões (02b_transform_dimensions)."""
+import importlib
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+
+@pytest.fixture
+def dims():
+    return importlib.import_module("src.02b_transform_dimensions")
+
+
+def test_count_bureau_status_matches_get_dummies(dims):
+    """Contagem em streaming == get_dummies + groupby().sum() (incl. STATUS_1/STATUS_5)."""
+    rng = np.random.default_rng(7)
+    n = 5000
+    balance = pd.DataFrame({
+        "sk_id_bureau": rng.integers(0, 300, n),
+        "status": pd.Categorical(rng.choice(list("CX012345"), n)),
+    })
+    balance.loc[rng.random(n) < 0.05, "status"] = None
+
+    # Lotes pequenos, alternando texto e dicionário: vocabulários diferentes por lote
+    batches = [
+        pa.RecordBatch.from_pandas(
+            balance.iloc[i:i + 200].astype({"status": object}) if i % 400 else balance.iloc[i:i + 200],
+            preserve_index=False,
+        )
+        for i in range(0, n, 200)
+    ]
+    result = dims.count_bureau_status(batches)
+
+    expected = pd.get_dummies(balance, columns=["status"]).groupby("sk_id_bureau").sum().reset_index()
+    pd.testing.assert_frame_equal(result, expected.astype("int64"))
+    assert {"status_1", "status_5"} <= set(result.columns)
+
+
+@pytest.fixture
+def bronze(tmp_path, monkeypatch, dims):
+    """Tabelas Bronze pequenas (previous, installments, credit card, POS) em diretório temporário."""
+    rng = np.random.default_rng(11)
+    bronze_dir, silver_dir = tmp_path / "bronze", tmp_path / "silver"
+    bronze_dir.mkdir()
+    silver_dir.mkdir()
+
+    n = 4000
+    ids = {"sk_id_curr": rng.integers(100000, 100400, n), "sk_id_prev": rng.integers(0, 1500, n)}
+    noisy = lambda values: np.where(rng.random(n) < 0.1, np.nan, values)
+    status = lambda *values: pd.Categorical(rng.choice(values, n))
+    tables = {
+        "previous_application": {
+            "amt_application": noisy(rng.normal(1e5, 3e4, n)), "amt_credit": noisy(rng.normal(1e5, 3e4, n)),
+            "name_contract_status": status("Approved", "Refused", "Canceled"),
+            "days_decision": np.where(rng.random(n) < 0.05, 365243, rng.integers(-3000, 0, n)),
+        },
+        "installments_payments": {
+            "days_instalment": rng.integers(-3000, 0, n).astype("float32"),
+            "days_entry_payment": noisy(rng.integers(-3000, 0, n)).astype("float32"),
+            "amt_instalment": rng.normal(5e3, 1e3, n).round(2), "amt_payment": noisy(rng.normal(5e3, 1e3, n).round(2)),
+        },
+        "credit_card_balance": {
+            "months_balance": rng.integers(-96, 0, n).astype("int8"), "amt_balance": noisy(rng.normal(1e4, 5e3, n)),
+            "amt_credit_limit_actual": rng.integers(0, 100000, n).astype("int32"),
+            "amt_drawings_atm_current": noisy(rng.choice([0.0, 500.0, 2000.0], n)),
+            "sk_dpd": rng.integers(0, 15, n).astype("int16"),
+        },
+        "pos_cash_balance": {
+            "months_balance": rng.integers(-96, 0, n).astype("int8"),
+            "cnt_instalment_future": noisy(rng.integers(0, 60, n)).astype("float32"),
+            "name_contract_status": status("Active", "Completed", "Signed"),
+            "sk_dpd": rng.integers(0, 15, n).astype("int16"),
+        },
+    }
+    for name, columns in tables.items():
+        pd.DataFrame({**ids, **columns}).to_parquet(bronze_dir / f"{name}.parquet", index=False, row_group_size=700)
+
+    monkeypatch.setattr(dims, "BRONZE_PATH", str(bronze_dir))
+    monkeypatch.setattr(dims, "SILVER_PATH", str(silver_dir))
+    return silver_dir
+
+
+DIMENSION_BUILDERS = [
+    ("previous_application", "aggregate_previous_application"),
+    ("installments_payments", "aggregate_installments"),
+    ("credit_card_balance", "aggregate_credit_card"),
+    ("pos_cash_balance", "aggregate_pos_cash"),
+]
+
+
+@pytest.mark.parametrize("name,aggregate", DIMENSION_BUILDERS)
+@pytest.mark.parametrize("workers", [1, 2])
+def test_partitioned_aggregation_is_identical_to_in_memory(dims, bronze, name, aggregate, workers):
+    """Particionar por sk_id_curr e agregar por partição dá o mesmo resultado, bit a bit."""
+    aggregate = getattr(dims, aggregate)
+
+    expected = aggregate(dims.read_bronze(name))
+    result = dims.aggregate_partitioned(name, aggregate, n_partitions=5, workers=workers)
+
+    pd.testing.assert_frame_equal(result, expected, check_exact=True)
+    assert list((bronze).iterdir()) == []
+
+
+@pytest.mark.parametrize("name,aggregate", DIMENSION_BUILDERS)
+def test_numpy_engine_matches_pandas_groupby(dims, bronze, name, aggregate):
+    """Reduções por segmento == groupby().agg(): mesmas colunas, dtypes e valores."""
+    aggregate = getattr(dims, aggregate)
+
+    expected = aggregate(dims.read_bronze(name), engine="pandas")
+    result = aggregate(dims.read_bronze(name), engine="numpy")
+
+    pd.testing.assert_frame_equal(result, expected, check_exact=False, rtol=1e-6)
+
+
+def test_recency_windows_match_filtered_groupby(dims, bronze):
+    """CC_LAST{N}M_* == groupby só das linhas dos últimos N meses (clientes sem linhas na janela: NaN)."""
+    cc = dims.read_bronze("credit_card_balance")
+    result = dims.aggregate_credit_card(cc.copy()).set_index("sk_id_curr")
+
+    cc["has_atm_drawing"] = (cc["amt_drawings_atm_current"].fillna(0) > 0).astype(int)
+    cc["amt_balance"] = cc["amt_balance"].fillna(0)
+    for n in dims.RECENCY_WINDOWS:
+        recent = cc[cc["months_balance"] >= -n].groupby("sk_id_curr")
+        expected = pd.DataFrame({
+            f"CC_LAST{n}M_AMT_BALANCE_MEAN": recent["amt_balance"].mean(),
+            f"CC_LAST{n}M_HAS_ATM_DRAWING_MEAN": recent["has_atm_drawing"].mean(),
+            f"CC_LAST{n}M_SK_DPD_MAX": recent["sk_dpd"].max(),
+        }).reindex(result.index)
+        pd.testing.assert_frame_equal(result[expected.columns], expected, check_dtype=False, rtol=1e-6)
+    assert result["CC_LAST3M_SK_DPD_MAX"].isna().any()  # clientes sem meses recentes
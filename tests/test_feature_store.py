@@ -0,0 +1,76 @@
+"""Testes do store de features por sk_id_curr (src/feature_store.py)."""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import feature_store
+
+
+def make_obt(n=500, seed=2):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "sk_id_curr": rng.permutation(np.arange(100000, 100000 + 2 * n, 2)).astype("int32"),
+        "target": rng.integers(0, 2, n).astype("int8"),
+        "amt_income_total": rng.lognormal(11, 0.5, n),
+        "ext_source_mean": rng.random(n).astype("float32"),
+        "code_gender": pd.Categorical(rng.choice(["F", "M", None], n)),
+        "BUREAU_AMT_CREDIT_SUM_SUM": np.where(rng.random(n) < 0.2, np.nan, rng.normal(1e5, 1e4, n)),
+    })
+    return df
+
+
+@pytest.fixture
+def store(tmp_path):
+    df = make_obt()
+    path = feature_store.build_store(df, str(tmp_path / "obt.features.arrow"))
+    return df.sort_values("sk_id_curr", ignore_index=True), feature_store.FeatureStore(path)
+
+
+def test_batched_lookup_matches_obt_rows(store):
+    df, fs = store
+    ids = df["sk_id_curr"].to_numpy()[[7, 3, 400, 3]]  # fora de ordem e repetido
+    expected = df.set_index("sk_id_curr").loc[ids].reset_index()
+    pd.testing.assert_frame_equal(fs.frame(ids), expected)
+    # Colunas numéricas são views do arquivo mapeado, sem cópia
+    assert not fs._values["amt_income_total"].flags.owndata
+
+
+def test_single_lookup_returns_python_values(store):
+    df, fs = store
+    expected = df.iloc[42]
+    row = fs.get(int(expected["sk_id_curr"]))
+    assert list(row) == list(df.columns)
+    assert row["amt_income_total"] == expected["amt_income_total"]
+    assert row["code_gender"] == (None if pd.isna(expected["code_gender"]) else expected["code_gender"])
+    assert isinstance(row["target"], int)
+
+
+def test_missing_ids_raise_key_error(store):
+    df, fs = store
+    with pytest.raises(KeyError, match="100001"):
+        fs.lookup([df["sk_id_curr"].iloc[0], 100001])
+    with pytest.raises(KeyError):
+        fs.get(10**9)
+
+
+def test_benchmark_reports_latency(store):
+    _, fs = store
+    result = feature_store.benchmark(fs, n_lookups=200, batch_size=10)
+    assert result["calls"] == 20 and result["p50_us"] <= result["p99_us"]
+    assert result["lookups_per_s"] > 0
+
+
+def test_store_older_than_obt_is_refused(tmp_path, monkeypatch):
+    df = make_obt()
+    path = feature_store.build_store(df, str(tmp_path / "analytics_credit_risk_train.features.arrow"))
+    obt = tmp_path / "analytics_credit_risk_train.parquet"
+    df.to_parquet(obt, index=False)
+    os.utime(obt, (os.path.getmtime(path) + 10,) * 2)  # OBT regravada depois do store
+    monkeypatch.setattr(feature_store, "GOLD_PATH", str(tmp_path))
+
+    with pytest.raises(RuntimeError, match="desatualizado"):
+        feature_store.FeatureStore(path)
+    with pytest.raises(RuntimeError, match="desatualizado"):
+        feature_store.get_features(int(df["sk_id_curr"].iloc[0]))
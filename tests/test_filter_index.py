@@ -0,0 +1,68 @@
+"""Testes do índice de bitmaps dos filtros do dashboard (src/filter_index.py)."""
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from src import filter_index
+from src.risk_cube import compute_bins
+
+DIMENSIONS = ["name_contract_type", "code_gender", "name_income_type", "region_rating_client"]
+
+
+def make_table(n=3001, seed=21):
+    rng = np.random.default_rng(seed)
+    income = rng.lognormal(11, 0.5, n)
+    income[rng.random(n) < 0.02] = np.nan
+    df = pd.DataFrame({
+        "target": (rng.random(n) < 0.1).astype("int8"),
+        "amt_income_total": income,
+        "years_birth": rng.uniform(21, 69, n),
+        "ext_source_mean": np.where(rng.random(n) < 0.1, np.nan, rng.random(n)),
+        "name_contract_type": pd.Categorical(rng.choice(["Cash loans", "Revolving loans"], n)),
+        "code_gender": pd.Categorical(rng.choice(["F", "M", None], n, p=[0.5, 0.45, 0.05])),
+        "name_income_type": pd.Categorical(rng.choice(["Working", "Pensioner", "State servant"], n)),
+        "region_rating_client": rng.integers(1, 4, n).astype("int8"),
+    })
+    return df, pa.Table.from_pandas(df, preserve_index=False)
+
+
+def test_bitmap_selection_matches_pandas_filters():
+    """OR dentro da coluna e AND entre colunas == isin encadeado; KPIs e faixas iguais."""
+    df, table = make_table()
+    bins = compute_bins(df)
+    index = filter_index.build_index(table, bins, DIMENSIONS)
+
+    selections = {
+        "name_contract_type": [],
+        "code_gender": ["F"],
+        "name_income_type": ["Working", "Pensioner"],
+        "region_rating_client": [1, 3],
+    }
+    rows = df
+    for column, values in selections.items():
+        if values:
+            rows = rows[rows[column].isin(values)]
+
+    mask = index.select(selections)
+    assert list(index.row_ids(mask)) == list(rows.index)
+
+    kpis = filter_index.summarize(index, mask)
+    assert kpis["n_clientes"] == len(rows)
+    assert np.isclose(kpis["taxa_inadimplencia"], rows["target"].mean() * 100)
+    assert np.isclose(kpis["renda_media"], rows["amt_income_total"].mean())
+    assert np.isclose(kpis["idade_media"], rows["years_birth"].mean())
+
+    spec = bins["faixa_renda"]
+    faixa = pd.cut(rows["amt_income_total"], spec["edges"], labels=spec["labels"], include_lowest=True)
+    expected = rows.groupby(faixa, observed=True)["target"].mean() * 100
+    result = filter_index.rate_by(index, "faixa_renda", mask)
+    assert list(result["faixa_renda"]) == list(expected.index)
+    np.testing.assert_allclose(result["target"], expected.to_numpy())
+
+
+def test_empty_selection_keeps_all_rows():
+    df, table = make_table(n=17)
+    index = filter_index.build_index(table, compute_bins(df), DIMENSIONS)
+    mask = index.select({"code_gender": [], "name_income_type": []})
+    assert filter_index.popcount(mask) == 17
+    assert filter_index.popcount(index.select({"code_gender": ["inexistente"]})) == 0
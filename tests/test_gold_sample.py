@@ -0,0 +1,72 @@
+"""Testes das amostras estratificadas da OBT (src/gold_sample.py)."""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import gold_sample
+
+
+def make_obt(n=6000, seed=3):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "sk_id_curr": np.arange(100000, 100000 + n, dtype="int32"),
+        "target": (rng.random(n) < 0.08).astype("int8"),
+        "name_contract_type": pd.Categorical(rng.choice(["Cash loans", "Revolving loans"], n, p=[0.9, 0.1])),
+        "code_gender": pd.Categorical(rng.choice(["F", "M", None], n)),
+        "amt_income_total": rng.lognormal(11, 0.5, n),
+    })
+
+
+@pytest.fixture
+def obt_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(gold_sample, "BATCH_SIZE", 1000)  # vários lotes
+    path = tmp_path / "obt.parquet"
+    make_obt().to_parquet(path, index=False, row_group_size=700)
+    return str(path)
+
+
+def test_sample_is_stratified_and_weights_reexpand(obt_path, tmp_path):
+    full = pd.read_parquet(obt_path)
+    small, large = gold_sample.build_samples(obt_path, "obt", sizes=[500, 2000], seed=7, directory=str(tmp_path))
+    sample = pd.read_parquet(small)
+
+    assert 500 <= len(sample) <= 520 and list(sample.columns) == list(full.columns) + ["sample_weight"]
+    pd.testing.assert_frame_equal(sample.drop(columns="sample_weight"),
+                                  full.set_index("sk_id_curr").loc[sample["sk_id_curr"]].reset_index())
+    # Cada estrato (target x filtros) reexpande exatamente para a população
+    strata = ["target", "name_contract_type", "code_gender"]
+    weighted = sample.groupby(strata, observed=True, dropna=False)["sample_weight"].sum()
+    population = full.groupby(strata, observed=True, dropna=False).size()
+    pd.testing.assert_series_equal(weighted.round(6), population.astype(float), check_names=False)
+    assert np.average(sample["target"], weights=sample["sample_weight"]) == pytest.approx(full["target"].mean())
+    # Amostra menor contida na maior
+    assert sample["sk_id_curr"].isin(pd.read_parquet(large)["sk_id_curr"]).all()
+
+
+def test_sample_is_reproducible_and_order_independent(obt_path, tmp_path):
+    first = pd.read_parquet(gold_sample.build_samples(obt_path, "a", [300], seed=1, directory=str(tmp_path))[0])
+    shuffled = tmp_path / "shuffled.parquet"
+    pd.read_parquet(obt_path).sample(frac=1, random_state=0).to_parquet(shuffled, index=False, row_group_size=700)
+    again = pd.read_parquet(gold_sample.build_samples(str(shuffled), "b", [300], seed=1, directory=str(tmp_path))[0])
+    other = pd.read_parquet(gold_sample.build_samples(obt_path, "c", [300], seed=2, directory=str(tmp_path))[0])
+
+    assert set(first["sk_id_curr"]) == set(again["sk_id_curr"])
+    assert set(first["sk_id_curr"]) != set(other["sk_id_curr"])
+
+
+def test_sample_larger_than_table_keeps_everything(obt_path, tmp_path):
+    path, = gold_sample.build_samples(obt_path, "obt", [10**6], directory=str(tmp_path))
+    sample = pd.read_parquet(path)
+    assert len(sample) == 6000 and (sample["sample_weight"] == 1).all()
+    with pytest.raises(FileNotFoundError, match="GOLD_SAMPLE_SIZES=5"):
+        gold_sample.load_sample("obt", 5, directory=str(tmp_path))
+
+
+def test_sizes_out_of_config_are_removed(obt_path, tmp_path):
+    old, kept = gold_sample.build_samples(obt_path, "obt", [300, 500], directory=str(tmp_path))
+    gold_sample.build_samples(obt_path, "obt", [500], directory=str(tmp_path))
+    assert not os.path.exists(old) and os.path.exists(kept)
+    gold_sample.build_samples(obt_path, "obt", [], directory=str(tmp_path))
+    assert not os.path.exists(kept)
@@ -0,0 +1,108 @@
+"""Testes da atualização incremental das dimensões (src/incremental.py, 02b)."""
+import importlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def dims():
+    return importlib.import_module("src.02b_transform_dimensions")
+
+
+def make_bronze(rng):
+    """bureau, bureau_balance e installments pequenos, com nulos e ids repetidos."""
+    n_loans, n_months, n_inst = 600, 4000, 3000
+    bureau = pd.DataFrame({
+        "sk_id_curr": rng.integers(100000, 100200, n_loans).astype("int32"),
+        "sk_id_bureau": rng.permutation(np.arange(5000000, 5000000 + n_loans)).astype("int32"),
+        "credit_active": pd.Categorical(rng.choice(["Active", "Closed", "Sold"], n_loans)),
+        "days_credit": rng.integers(-3000, 0, n_loans).astype("int16"),
+        "amt_credit_sum": np.where(rng.random(n_loans) < 0.1, np.nan, rng.normal(1e5, 3e4, n_loans)).astype("float32"),
+        "amt_credit_sum_debt": np.where(rng.random(n_loans) < 0.2, np.nan, rng.normal(5e4, 1e4, n_loans)).astype("float32"),
+        "amt_credit_max_overdue": np.where(rng.random(n_loans) < 0.5, np.nan, rng.normal(1e3, 300, n_loans)).astype("float32"),
+    })
+    balance = pd.DataFrame({
+        # Inclui meses de empréstimos que não existem no bureau
+        "sk_id_bureau": rng.integers(5000000, 5000000 + n_loans + 50, n_months).astype("int32"),
+        "status": pd.Categorical(rng.choice(list("CX012345"), n_months)),
+    })
+    installments = pd.DataFrame({
+        "sk_id_curr": rng.integers(100000, 100200, n_inst).astype("int32"),
+        "sk_id_prev": rng.integers(0, 800, n_inst).astype("int32"),
+        "days_instalment": rng.integers(-3000, 0, n_inst).astype("float32"),
+        "days_entry_payment": np.where(rng.random(n_inst) < 0.1, np.nan, rng.integers(-3000, 0, n_inst)).astype("float32"),
+        "amt_instalment": rng.normal(5e3, 1e3, n_inst).round(2),
+        "amt_payment": np.where(rng.random(n_inst) < 0.1, np.nan, rng.normal(5e3, 1e3, n_inst).round(2)),
+    })
+    return {"bureau": bureau, "bureau_balance": balance, "installments_payments": installments}
+
+
+def split(rng, tables, share=0.2):
+    """Base + delta aleatórios por tabela (o delta é anexado ao fim na reconstrução completa)."""
+    base, delta = {}, {}
+    for name, df in tables.items():
+        mask = rng.random(len(df)) < share
+        base[name], delta[name] = df[~mask].reset_index(drop=True), df[mask].reset_index(drop=True)
+    return base, delta
+
+
+def build(dims, monkeypatch, root, tables, state, n_partitions=0):
+    bronze, silver = root / "bronze", root / "silver"
+    bronze.mkdir(parents=True)
+    silver.mkdir()
+    for name, df in tables.items():
+        df.to_parquet(bronze / f"{name}.parquet", index=False, row_group_size=500)
+    monkeypatch.setattr(dims, "BRONZE_PATH", str(bronze))
+    monkeypatch.setattr(dims, "SILVER_PATH", str(silver))
+    monkeypatch.setattr(dims, "DIMENSIONS_STATE", state)
+    dims.process_bureau()
+    dims.build_dimension("installments_payments", dims.aggregate_installments,
+                         "dim_installments.parquet", n_partitions=n_partitions)
+    return silver
+
+
+DIM_FILES = ["dim_bureau.parquet", "dim_installments.parquet"]
+
+
+@pytest.mark.parametrize("n_partitions", [0, 4])
+def test_state_build_is_identical_to_plain_build(dims, monkeypatch, tmp_path, n_partitions):
+    """Gravar o estado não muda as dimensões (em memória e particionado)."""
+    tables = make_bronze(np.random.default_rng(5))
+    plain = build(dims, monkeypatch, tmp_path / "plain", tables, state=False, n_partitions=n_partitions)
+    with_state = build(dims, monkeypatch, tmp_path / "state", tables, state=True, n_partitions=n_partitions)
+
+    for filename in DIM_FILES:
+        pd.testing.assert_frame_equal(pd.read_parquet(with_state / filename),
+                                      pd.read_parquet(plain / filename), check_exact=True)
+    assert (with_state / "_state" / "dim_bureau.json").exists()
+    assert not (plain / "_state").exists()
+
+
+def test_upsert_matches_full_rebuild(dims, monkeypatch, tmp_path):
+    """Base + deltas (empréstimos novos, meses de empréstimos conhecidos e pendentes) == reconstrução."""
+    rng = np.random.default_rng(9)
+    tables = make_bronze(rng)
+    base, delta = split(rng, tables)
+    full = {name: pd.concat([base[name], delta[name]], ignore_index=True) for name in tables}
+    expected = build(dims, monkeypatch, tmp_path / "full", full, state=False)
+
+    silver = build(dims, monkeypatch, tmp_path / "base", base, state=True)
+    # Em duas levas: meses pendentes no sidecar só encontram o empréstimo na segunda
+    first = delta["bureau_balance"].sample(frac=0.5, random_state=1)
+    affected = dims.upsert_bureau(balance_delta=first)
+    affected = np.union1d(affected, dims.upsert_bureau(
+        delta["bureau"], delta["bureau_balance"].drop(first.index)))
+    dims.upsert_dimension("installments_payments", delta["installments_payments"])
+
+    for filename in DIM_FILES:
+        result, target = pd.read_parquet(silver / filename), pd.read_parquet(expected / filename)
+        pd.testing.assert_frame_equal(result, target, check_exact=False, rtol=1e-9)
+    assert set(affected) <= set(full["bureau"]["sk_id_curr"])
+
+
+def test_upsert_without_state_fails(dims, monkeypatch, tmp_path):
+    build(dims, monkeypatch, tmp_path, make_bronze(np.random.default_rng(1)), state=False)
+    with pytest.raises(FileNotFoundError, match="DIMENSIONS_STATE=1"):
+        dims.upsert_dimension("installments_payments", pd.DataFrame())
@@ -0,0 +1,112 @@
+"""Testes da orquestração da ingestão (modo sequencial e paralelo)."""
+import functools
+import importlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+
+@pytest.fixture
+def ingestion(tmp_path, monkeypatch):
+    """Módulo de ingestão apontando para diretórios raw/bronze temporários."""
+    mod = importlib.import_module("src.01_ingestion")
+    raw, bronze = tmp_path / "raw", tmp_path / "bronze"
+    raw.mkdir()
+
+    pd.DataFrame({"SK_ID_CURR": [1, 2, 3], "AMT": [1.5, 2.5, 3.5]}).to_csv(raw / "a.csv", index=False)
+    pd.DataFrame({"SK_ID_BUREAU": [10, 11], "STATUS": ["C", "X"]}).to_csv(raw / "bureau_balance.csv", index=False)
+    (raw / "vazio.csv").write_text("")
+    (raw / "quebrado.csv").write_text('A,B\n1,"sem fim\n')
+
+    monkeypatch.setattr(mod, "RAW_PATH", str(raw))
+    monkeypatch.setattr(mod, "BRONZE_PATH", str(bronze))
+    monkeypatch.setattr(mod, "files_to_ingest",
+                        ["a.csv", "ausente.csv", "bureau_balance.csv", "vazio.csv", "quebrado.csv"])
+    return mod
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_run_ingestion_reports_results_in_order(ingestion, workers, monkeypatch):
+    """Resultados voltam na ordem de files_to_ingest, com falhas sinalizadas."""
+    # spawn: os workers não herdam os caminhos alterados acima, só o que for passado a eles
+    monkeypatch.setattr(ingestion, "ProcessPoolExecutor",
+                        functools.partial(ProcessPoolExecutor, mp_context=multiprocessing.get_context("spawn")))
+    results = ingestion.run_ingestion(workers=workers)
+
+    assert [r["file"] for r in results] == ingestion.files_to_ingest
+    assert [r["status"] for r in results] == ["SUCESSO", "PULADO", "SUCESSO", "PULADO", "ERRO"]
+    assert results[0]["rows"] == 3
+    assert ingestion.has_failures(results)
+
+    back = pd.read_parquet(f"{ingestion.BRONZE_PATH}/bureau_balance.parquet")
+    assert list(back.columns) == ["sk_id_bureau", "status"]
+    assert back["sk_id_bureau"].dtype == "int32"
+    assert isinstance(back["status"].dtype, pd.CategoricalDtype)
+
+
+def test_large_file_slots_respects_override(ingestion, monkeypatch):
+    monkeypatch.setattr(ingestion, "INGESTION_MAX_LARGE_PARALLEL", 2)
+    assert ingestion.large_file_slots() == 2
+
+    monkeypatch.setattr(ingestion, "INGESTION_MAX_LARGE_PARALLEL", 0)
+    assert ingestion.large_file_slots() >= 1
+
+
+def test_run_ingestion_skips_unchanged_sources(ingestion):
+    """Segunda execução pula origens inalteradas; --force e mudanças reprocessam."""
+    ingestion.run_ingestion()
+    output = f"{ingestion.BRONZE_PATH}/a.parquet"
+    manifest = ingestion.load_manifest(ingestion.manifest_path())
+    assert manifest["a.csv"]["rows"] == 3
+    assert manifest["a.csv"]["schema"] == [["sk_id_curr", "int64"], ["amt", "double"]]
+    assert "quebrado.csv" not in manifest
+
+    second = {r["file"]: r for r in ingestion.run_ingestion()}
+    assert second["a.csv"]["status"] == "PULADO"
+    assert second["a.csv"]["rows"] == 3
+
+    forced = {r["file"]: r for r in ingestion.run_ingestion(force=True)}
+    assert forced["a.csv"]["status"] == "SUCESSO"
+
+    raw_a = f"{ingestion.RAW_PATH}/a.csv"
+    pd.DataFrame({"SK_ID_CURR": [1, 2], "AMT": [1.5, 2.5]}).to_csv(raw_a, index=False)
+    changed = {r["file"]: r for r in ingestion.run_ingestion()}
+    assert changed["a.csv"]["status"] == "SUCESSO"
+    assert len(pd.read_parquet(output)) == 2
+
+
+def test_registered_categories_survive_numeric_looking_batches(ingestion, monkeypatch):
+    """Lotes com status só numéricos continuam texto/categoria (schema registrado)."""
+    raw = f"{ingestion.RAW_PATH}/bureau_balance.csv"
+    pd.DataFrame({
+        "SK_ID_BUREAU": [1, 1, 2, 2, 3],
+        "MONTHS_BALANCE": [0, -1, 0, -1, 0],
+        "STATUS": ["0", "1", "5", "C", None],
+    }).to_csv(raw, index=False)
+    monkeypatch.setattr(ingestion, "files_to_ingest", ["bureau_balance.csv"])
+    monkeypatch.setattr(ingestion, "INGESTION_BATCH_SIZE", 2)
+
+    [result] = ingestion.run_ingestion()
+    assert result["status"] == "SUCESSO"
+
+    back = pd.read_parquet(f"{ingestion.BRONZE_PATH}/bureau_balance.parquet")
+    assert back["months_balance"].dtype == "int8"
+    assert back["status"].astype(object).tolist()[:4] == ["0", "1", "5", "C"]
+    assert back["status"].isna().tolist() == [False] * 4 + [True]
+    assert result["manifest"]["schema"][2] == ["status", "dictionary<values=string, indices=int32, ordered=0>"]
+
+
+def test_bronze_write_options_change_reingests(ingestion, monkeypatch):
+    """PARQUET_BRONZE_OPTIONS entra na versão: CSV inalterado é regravado com as novas opções."""
+    monkeypatch.setattr(ingestion, "files_to_ingest", ["a.csv"])
+    ingestion.run_ingestion()
+    assert ingestion.run_ingestion()[0]["status"] == "PULADO"
+
+    monkeypatch.setitem(ingestion.PARQUET_WRITE_OPTIONS, "bronze", "codec=zstd")
+    assert ingestion.run_ingestion()[0]["status"] == "SUCESSO"
+    metadata = pq.read_metadata(f"{ingestion.BRONZE_PATH}/a.parquet")
+    assert metadata.row_group(0).column(0).compression == "ZSTD"
+    assert ingestion.run_ingestion()[0]["status"] == "PULADO"
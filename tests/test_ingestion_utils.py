@@ -4,6 +4,7 @@ import tempfile
 from pathlib import Path
 
 import pandas as pd
+import pytest
 
 
 def test_save_atomic_parquet_writes_valid_file():
@@ -18,3 +19,43 @@ def test_save_atomic_parquet_writes_valid_file():
         assert out.exists()
         back = pd.read_parquet(out)
         pd.testing.assert_frame_equal(back, df)
+
+
+def test_save_atomic_parquet_stream_matches_full_read():
+    """Ingestão em lotes gera o mesmo conteúdo da leitura completa do CSV."""
+    mod = importlib.import_module("src.01_ingestion")
+
+    csv = "SK_ID_CURR,AMT, STATUS\n" + "\n".join(
+        f"{i},{'' if i % 4 == 0 else i * 1.5},{'C' if i % 2 else 'X'}" for i in range(1, 11)
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        src = Path(tmp) / "in.csv"
+        src.write_text(csv)
+        out = Path(tmp) / "out.parquet"
+
+        n_rows = mod.save_atomic_parquet_stream(mod.iter_csv_batches(str(src), 3), str(out))
+        assert n_rows == 10
+        assert not Path(str(out) + ".tmp").exists()
+
+        expected = mod.normalize_columns(pd.read_csv(src))
+        pd.testing.assert_frame_equal(pd.read_parquet(out), expected)
+
+
+def test_save_atomic_parquet_stream_keeps_previous_file_on_error():
+    """Falha no meio do streaming não corrompe o arquivo existente nem deixa .tmp."""
+    mod = importlib.import_module("src.01_ingestion")
+
+    def batches():
+        yield pd.DataFrame({"a": [1, 2]})
+        yield pd.DataFrame({"a": ["texto"]})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp) / "out.parquet"
+        original = pd.DataFrame({"a": [9]})
+        mod.save_atomic_parquet(original, str(out))
+
+        with pytest.raises(ValueError, match="divergente"):
+            mod.save_atomic_parquet_stream(batches(), str(out))
+
+        assert not Path(str(out) + ".tmp").exists()
+        pd.testing.assert_frame_equal(pd.read_parquet(out), original)
@@ -0,0 +1,80 @@
+"""Testes da instrumentação (src/instrumentation.py)."""
+import time
+
+import numpy as np
+import pytest
+
+from src import instrumentation
+from src.scheduler import Stage
+
+
+@pytest.fixture
+def metrics(tmp_path, monkeypatch):
+    path = str(tmp_path / "metrics.jsonl")
+    monkeypatch.setattr(instrumentation, "METRICS_PATH", path)
+    monkeypatch.delenv(instrumentation.RUN_ID_ENV, raising=False)
+    monkeypatch.delenv(instrumentation.STAGE_ENV, raising=False)
+    return path
+
+
+def test_spans_outside_a_run_are_not_recorded(metrics):
+    with instrumentation.span("read_parquet") as event:
+        event["rows_out"] = 1
+    assert instrumentation.read_events(metrics) == []
+
+
+def test_events_and_critical_path(metrics, monkeypatch):
+    monkeypatch.setenv(instrumentation.RUN_ID_ENV, "teste")
+    stages = [
+        Stage("a", "m", "f", outputs=["x.parquet"]),
+        Stage("b", "m", "f", inputs=["x.parquet"], outputs=["y.parquet"]),
+        Stage("c", "m", "f", outputs=["z.parquet"]),
+    ]
+    with instrumentation.stage("a"):
+        with instrumentation.span("groupby_agg:a", rows_in=3) as event:
+            event["rows_out"] = 2
+    with instrumentation.stage("c"):
+        pass
+    with instrumentation.stage("b"):
+        time.sleep(0.01)
+
+    events = instrumentation.read_events(metrics, "teste")
+    op = next(e for e in events if e["kind"] == "op")
+    assert (op["stage"], op["rows_in"], op["rows_out"], op["status"]) == ("a", 3, 2, "ok")
+    assert op["duration"] >= 0 and "process_peak_rss_mb" in op
+
+    report = instrumentation.run_report(stages, "teste", path=metrics)
+    assert report["critical_path"] == ["a", "b"]
+    assert report["stages"]["a"]["slowest_ops"][0]["name"] == "groupby_agg:a"
+    assert "Caminho crítico" in instrumentation.format_report(report)
+
+
+@pytest.mark.skipif(instrumentation.current_rss_mb() is None, reason="sem /proc/self/statm")
+def test_stage_peak_rss_is_sampled_during_the_stage(metrics, monkeypatch):
+    monkeypatch.setenv(instrumentation.RUN_ID_ENV, "teste")
+    baseline = instrumentation.current_rss_mb()
+    with instrumentation.stage("pico"):
+        block = np.ones(200 * 1024**2 // 8)  # ~200 MB liberados antes do fim da etapa
+        time.sleep(0.3)
+        del block
+    with instrumentation.stage("leve"):
+        time.sleep(0.1)
+
+    events = {e["name"]: e for e in instrumentation.read_events(metrics, "teste")}
+    assert events["pico"]["stage_peak_rss_mb"] >= baseline + 150
+    # ru_maxrss guarda o pico do processo; o RSS amostrado é só o da etapa
+    assert events["leve"]["stage_peak_rss_mb"] < events["pico"]["stage_peak_rss_mb"] - 100
+    assert events["leve"]["process_peak_rss_mb"] >= events["pico"]["stage_peak_rss_mb"] - 1
+
+
+def test_each_run_starts_a_new_metrics_file(metrics, monkeypatch):
+    monkeypatch.setenv(instrumentation.RUN_ID_ENV, "")  # restaurado ao fim do teste
+    first = instrumentation.start_run()
+    with instrumentation.stage("a"):
+        pass
+    second = instrumentation.start_run()
+    with instrumentation.stage("a"):
+        pass
+
+    assert [e["run_id"] for e in instrumentation.read_events(metrics)] == [second]
+    assert [e["run_id"] for e in instrumentation.read_events(metrics + ".1")] == [first]
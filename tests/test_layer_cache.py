@@ -0,0 +1,90 @@
+"""Testes do cache de camadas em memória (src/layer_cache.py) e das leituras via storage."""
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from src import layer_cache
+from src.storage import iter_batches, read_parquet, write_parquet
+
+
+@pytest.fixture
+def cache():
+    with layer_cache.session(budget_mb=1) as stats:
+        yield stats
+
+
+def write(df, path):
+    """Grava como o pipeline: storage.write_parquet põe a tabela no cache (layer_cache.put)."""
+    write_parquet(df, str(path), "silver")
+    return str(path)
+
+
+def make_frame(n=2000, seed=5):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "sk_id_curr": np.arange(n),
+        "months_balance": rng.integers(-96, 0, n).astype("int8"),
+        "amt": np.where(rng.random(n) < 0.1, np.nan, rng.normal(0, 1, n)),
+        "status": pd.Categorical(rng.choice(["A", "B", None], n)),
+        "name": rng.choice(["x", "y"], n).astype(object),
+    })
+
+
+def test_reads_from_cache_match_disk(tmp_path, cache):
+    """Mesmo DataFrame que o Parquet, com e sem projeção/filtros; lotes idem."""
+    df = make_frame()
+    path = write(df, tmp_path / "t.parquet")
+    cases = [{}, {"columns": ["amt", "sk_id_curr"]},
+             {"columns": ["sk_id_curr", "status"], "filters": [("months_balance", ">=", -12)]}]
+
+    for kwargs in cases:
+        cached = read_parquet(path, **kwargs)
+        layer_cache.discard(path)
+        pd.testing.assert_frame_equal(cached, read_parquet(path, **kwargs))
+        write(df, path)
+    assert cache["hits"] == len(cases)
+
+    batches = list(iter_batches(path, columns=["sk_id_curr"], batch_size=500))
+    assert [b.num_rows for b in batches] == [500] * 4
+    assert cache["hits"] == len(cases) + 1
+
+
+def test_budget_evicts_least_recently_used(tmp_path, cache):
+    df = make_frame(n=20000)  # ~0,5 MB em Arrow: cabem duas num orçamento de 1 MB
+    first, second = write(df, tmp_path / "a.parquet"), write(df, tmp_path / "b.parquet")
+    assert layer_cache.get(first) is not None  # "a" passa a ser a mais recente
+    third = write(df, tmp_path / "c.parquet")
+
+    assert layer_cache.get(second) is None
+    assert layer_cache.get(first) is not None and layer_cache.get(third) is not None
+    assert cache["evictions"] == 1
+    # Despejada = lida do disco, com o mesmo conteúdo
+    pd.testing.assert_frame_equal(read_parquet(second), df)
+
+
+def test_rewritten_file_invalidates_entry(tmp_path, cache):
+    path = write(make_frame(), tmp_path / "t.parquet")
+    changed = make_frame(seed=6)
+    changed.to_parquet(path, index=False)
+    os.utime(path, ns=(0, 0))  # garante mtime diferente mesmo em sistemas de arquivos grosseiros
+
+    assert layer_cache.get(path) is None
+    pd.testing.assert_frame_equal(read_parquet(path), changed)
+
+
+def test_disabled_outside_session_and_in_child_pid(tmp_path, monkeypatch):
+    path = write(make_frame(), tmp_path / "t.parquet")
+    assert layer_cache.get(path) is None
+
+    with layer_cache.session(budget_mb=1):
+        collector = layer_cache.TableCollector()
+        collector.add(pa.table({"a": [1, 2]}))
+        pd.DataFrame({"a": [1, 2]}).to_parquet(path, index=False)
+        collector.commit(path)
+        assert layer_cache.get(path).num_rows == 2
+
+        monkeypatch.setattr(os, "getpid", lambda: -1)  # processo filho herdando o módulo
+        assert not layer_cache.enabled() and layer_cache.get(path) is None
@@ -0,0 +1,64 @@
+"""Testes da exportação pronta para treino (src/model_export.py)."""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import model_export
+
+
+def make_obt(n=300, seed=4, with_target=True):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "sk_id_curr": np.arange(100000, 100000 + n, dtype="int32"),
+        "amt_income_total": rng.lognormal(11, 0.5, n),
+        "flag_mobil": rng.integers(0, 2, n).astype("int8"),
+        "code_gender": pd.Categorical(rng.choice(["F", "M", None], n)),
+        "PREV_AMT_CREDIT_SUM": np.where(rng.random(n) < 0.3, np.nan, rng.normal(1e5, 1e4, n)).astype("float32"),
+        "name_income_type": rng.choice(["Working", "Pensioner"], n).astype(object),
+    })
+    if with_target:
+        df.insert(1, "target", rng.integers(0, 2, n).astype("int8"))
+    return df
+
+
+def test_export_roundtrip_is_column_major_and_memory_mapped(tmp_path):
+    df = make_obt()
+    path = model_export.export_matrix(df, str(tmp_path / "obt.matrix"))
+    matrix = model_export.ModelMatrix(path)
+
+    assert matrix.features == ["amt_income_total", "flag_mobil", "PREV_AMT_CREDIT_SUM"]
+    assert matrix.categorical == ["code_gender", "name_income_type"]
+    assert isinstance(matrix.X, np.memmap) and matrix.X.dtype == np.float32
+    assert matrix.X.flags.f_contiguous and matrix.feature("flag_mobil").flags.c_contiguous
+    expected = df[matrix.features].to_numpy(dtype=np.float32, na_value=np.nan)
+    np.testing.assert_array_equal(np.asarray(matrix.X), expected)
+
+    np.testing.assert_array_equal(matrix.ids, df["sk_id_curr"])
+    np.testing.assert_array_equal(matrix.target, df["target"])
+    labels = matrix.labels("code_gender")
+    assert list(labels) == [None if pd.isna(v) else v for v in df["code_gender"]]
+    assert list(matrix.labels("name_income_type")) == list(df["name_income_type"])
+    assert not os.path.exists(path + ".tmp")
+
+
+def test_export_without_target_replaces_previous(tmp_path):
+    path = str(tmp_path / "obt.matrix")
+    model_export.export_matrix(make_obt(n=50), path)
+    model_export.export_matrix(make_obt(n=20, with_target=False), path)
+
+    matrix = model_export.ModelMatrix(path)
+    assert len(matrix) == 20 and matrix.X.shape == (20, 3)
+    assert matrix.target is None and not os.path.exists(os.path.join(path, "target.npy"))
+
+
+def test_export_older_than_obt_is_refused(tmp_path):
+    df = make_obt(n=20)
+    path = model_export.export_matrix(df, str(tmp_path / "obt.matrix"))
+    obt = tmp_path / "obt.parquet"
+    df.to_parquet(obt, index=False)
+    os.utime(obt, (os.path.getmtime(os.path.join(path, "manifest.json")) + 10,) * 2)
+
+    with pytest.raises(RuntimeError, match="desatualizada"):
+        model_export.load_matrix("obt", str(tmp_path))
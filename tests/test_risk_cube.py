@@ -0,0 +1,47 @@
+"""Testes do cubo de agregados de risco (src/risk_cube.py)."""
+import numpy as np
+import pandas as pd
+
+from src.risk_cube import build_risk_cube, filter_cube, rate_by, summarize
+
+
+def make_obt(n=5000, seed=11):
+    rng = np.random.default_rng(seed)
+    score = rng.random(n)
+    score[rng.random(n) < 0.1] = np.nan  # score ausente vira célula própria
+    return pd.DataFrame({
+        "name_contract_type": pd.Categorical(rng.choice(["Cash loans", "Revolving loans"], n)),
+        "code_gender": pd.Categorical(rng.choice(["F", "M", "XNA"], n, p=[0.6, 0.39, 0.01])),
+        "name_education_type": pd.Categorical(rng.choice(["Higher education", "Secondary"], n)),
+        "amt_income_total": rng.lognormal(11.5, 0.5, n),
+        "years_birth": rng.uniform(21, 69, n),
+        "ext_source_mean": score,
+        "target": (rng.random(n) < 0.08).astype("int8"),
+    })
+
+
+def test_cube_answers_match_full_population():
+    """KPIs e taxas por faixa do cubo == cálculo direto sobre as linhas (sem amostragem)."""
+    obt = make_obt()
+    cube, bins = build_risk_cube(obt)
+    assert cube["n_clientes"].sum() == len(obt)
+
+    selections = {"code_gender": ["F"], "name_contract_type": ["Cash loans"], "name_education_type": []}
+    rows = obt[(obt["code_gender"] == "F") & (obt["name_contract_type"] == "Cash loans")]
+    kpis = summarize(filter_cube(cube, selections))
+    assert kpis["n_clientes"] == len(rows)
+    assert np.isclose(kpis["taxa_inadimplencia"], rows["target"].mean() * 100)
+    assert np.isclose(kpis["renda_media"], rows["amt_income_total"].mean())
+    assert np.isclose(kpis["idade_media"], rows["years_birth"].mean())
+
+    # Quartis de score com limites da população inteira (nulos fora do gráfico)
+    quartil = pd.cut(rows["ext_source_mean"], bins["score_quartil"]["edges"],
+                     labels=bins["score_quartil"]["labels"], include_lowest=True)
+    expected = rows.groupby(quartil, observed=True)["target"].mean() * 100
+    result = rate_by(filter_cube(cube, selections), "score_quartil")
+    assert list(result["score_quartil"]) == list(expected.index)
+    np.testing.assert_allclose(result["target"], expected.to_numpy())
+
+    # Quintis globais: cada faixa tem ~20% da população
+    shares = cube.groupby("faixa_renda", observed=True)["n_clientes"].sum() / len(obt)
+    np.testing.assert_allclose(shares, 0.2, atol=0.01)
@@ -0,0 +1,98 @@
+"""Testes do agendador de etapas (DAG) do pipeline."""
+import os
+import time
+
+import pytest
+
+from src.scheduler import Stage, dependencies, run_stages, source_files
+
+
+def copy_stage(inputs, outputs, fail=False):
+    """Etapa de teste: concatena as entradas em cada saída (ou falha)."""
+    if fail:
+        raise RuntimeError("falha proposital")
+    content = "".join(open(p).read() for p in inputs)
+    for path in outputs:
+        with open(path, "w") as f:
+            f.write(content + "|")
+
+
+def make_stages(tmp_path, fail_b=False):
+    path = lambda name: str(tmp_path / name)
+    stage = lambda name, inputs, outputs, **kw: Stage(
+        name=name, module="tests.test_scheduler", function="copy_stage",
+        inputs=[path(i) for i in inputs], outputs=[path(o) for o in outputs],
+        kwargs={"inputs": [path(i) for i in inputs], "outputs": [path(o) for o in outputs], **kw},
+    )
+    return [
+        stage("a", ["raw"], ["a.out"]),
+        stage("b", ["a.out"], ["b.out"], fail=fail_b),
+        stage("c", ["a.out"], ["c.out"]),
+        stage("d", ["b.out", "c.out"], ["d.out"]),
+    ]
+
+
+def test_dependencies_are_derived_from_files(tmp_path):
+    deps = dependencies(make_stages(tmp_path))
+    assert deps == {"a": [], "b": ["a"], "c": ["a"], "d": ["b", "c"]}
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_run_stages_skips_up_to_date_and_reruns_changed(tmp_path, workers):
+    (tmp_path / "raw").write_text("x")
+    state = str(tmp_path / "state.json")
+
+    first = run_stages(make_stages(tmp_path), workers=workers, state_path=state)
+    assert [r["status"] for r in first.values()] == ["SUCESSO"] * 4
+    assert (tmp_path / "d.out").read_text() == "x||x|||"
+
+    second = run_stages(make_stages(tmp_path), workers=workers, state_path=state)
+    assert [r["status"] for r in second.values()] == ["PULADO"] * 4
+
+    # Entrada mais nova que a saída de "c": só c e seus dependentes rodam
+    future = time.time() + 10
+    os.utime(tmp_path / "a.out", (future, future))
+    os.utime(tmp_path / "b.out", (future, future))
+    third = run_stages(make_stages(tmp_path), workers=workers, state_path=state)
+    assert [r["status"] for r in third.values()] == ["PULADO", "PULADO", "SUCESSO", "SUCESSO"]
+
+    forced = run_stages(make_stages(tmp_path), workers=workers, state_path=state, force=True)
+    assert [r["status"] for r in forced.values()] == ["SUCESSO"] * 4
+
+
+def test_failure_blocks_only_dependents(tmp_path):
+    (tmp_path / "raw").write_text("x")
+    results = run_stages(make_stages(tmp_path, fail_b=True), workers=2)
+
+    assert results["a"]["status"] == "SUCESSO"
+    assert results["b"]["status"] == "ERRO"
+    assert "falha proposital" in results["b"]["message"]
+    assert results["c"]["status"] == "SUCESSO"
+    assert results["d"]["status"] == "BLOQUEADO"
+
+
+def test_config_change_invalidates_stage(tmp_path):
+    (tmp_path / "raw").write_text("x")
+    state = str(tmp_path / "state.json")
+    run_stages(make_stages(tmp_path), state_path=state)
+
+    stages = make_stages(tmp_path)
+    stages[2].config = {"feature_store": True}  # c grava outra coisa: c e d rodam de novo
+    results = run_stages(stages, state_path=state)
+    assert [r["status"] for r in results.values()] == ["PULADO", "PULADO", "SUCESSO", "SUCESSO"]
+
+
+def test_version_covers_imported_src_modules():
+    """Editar um módulo auxiliar (storage, gold_sample...) muda a versão da etapa da OBT."""
+    files = {os.path.basename(f) for f in source_files("src.03_analytical_layer")}
+    assert {"03_analytical_layer.py", "storage.py", "risk_cube.py", "gold_sample.py",
+            "feature_store.py", "model_export.py", "config.py"} <= files
+    files = {os.path.basename(f) for f in source_files("src.02b_transform_dimensions")}
+    assert {"segment_agg.py", "storage.py"} <= files
+
+
+def test_state_file_in_missing_directory(tmp_path):
+    (tmp_path / "raw").write_text("x")
+    state = tmp_path / "novo" / "state.json"
+    run_stages(make_stages(tmp_path), state_path=str(state))
+    assert state.exists()
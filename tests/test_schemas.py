@@ -0,0 +1,41 @@
+"""Testes do registro de schemas da Bronze."""
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from src import schemas
+
+
+def test_apply_schema_downcasts_and_dictionary_encodes():
+    table = pa.Table.from_pandas(pd.DataFrame({
+        "sk_id_curr": [100001, 100002],
+        "credit_active": ["Active", None],
+        "days_credit": [-10.0, None],
+        "amt_credit_sum": [1234567.89, 10.0],
+        "coluna_nova": [1, 2],
+    }), preserve_index=False)
+
+    typed = schemas.apply_schema(table, "bureau.csv")
+
+    assert typed.schema.field("sk_id_curr").type == pa.int32()
+    assert typed.schema.field("credit_active").type == schemas.CATEGORY
+    assert typed.schema.field("days_credit").type == pa.int16()
+    assert typed.column("days_credit").null_count == 1
+    assert typed.schema.field("amt_credit_sum").type == pa.float64()
+    assert typed.schema.field("coluna_nova").type == pa.int64()
+
+    df = typed.to_pandas()
+    assert isinstance(df["credit_active"].dtype, pd.CategoricalDtype)
+    assert (df["credit_active"] == "Active").tolist() == [True, False]
+
+
+def test_apply_schema_refuses_lossy_integer_cast():
+    table = pa.table({"sk_id_curr": [1.5]})
+    with pytest.raises(pa.ArrowInvalid):
+        schemas.apply_schema(table, "bureau.csv")
+
+
+def test_application_test_schema_has_no_target():
+    assert "target" in schemas.get_schema("application_train.csv")
+    assert "target" not in schemas.get_schema("application_test.csv")
+    assert len(schemas.get_schema("application_train.csv")) == 122
@@ -0,0 +1,73 @@
+"""Testes do motor de agregação por segmentos (src/segment_agg.py)."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.segment_agg import aggregate_state, finalize_state, group_agg, merge_pairs, merge_state
+
+
+def make_frame(n=5000, seed=3):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "key": rng.integers(0, 400, n),
+        "sub": rng.integers(0, 30, n),
+        "i8": rng.integers(-100, 100, n).astype("int8"),
+        "i32": rng.integers(-10**6, 10**6, n).astype("int32"),
+        "f32": rng.normal(0, 1e3, n).astype("float32"),
+        "f64": rng.normal(0, 1e5, n),
+        "flag": rng.random(n) < 0.3,
+    })
+    df.loc[rng.random(n) < 0.1, ["f32", "f64"]] = np.nan
+    df.loc[df["key"] == 7, "f64"] = np.nan  # grupo sem nenhum valor
+    df.loc[rng.random(n) < 0.05, "sub"] = -1
+    df["sub_f"] = df["sub"].where(df["sub"] >= 0).astype("float64")
+    return df
+
+
+SPEC = {
+    "sub": ["nunique", "count"],
+    "sub_f": "nunique",
+    "i8": ["min", "max", "sum", "mean"],
+    "i32": ["min", "max", "sum", "mean"],
+    "f32": ["min", "max", "sum", "mean", "count"],
+    "f64": ["min", "max", "sum", "mean", "count"],
+    "flag": ["sum", "mean", "max"],
+}
+
+
+@pytest.mark.parametrize("presorted", [False, True])
+def test_segment_reductions_match_pandas(presorted):
+    """Mesmas colunas, dtypes e valores do groupby().agg(), com e sem a chave já ordenada."""
+    df = make_frame()
+    if presorted:
+        df = df.sort_values("key", kind="stable", ignore_index=True)
+    expected = df.groupby("key").agg(SPEC)
+    result = group_agg(df, "key", SPEC, engine="numpy")
+    # float32: o pandas acumula em float32 (Kahan), aqui em float64 -> diferenças no último dígito
+    pd.testing.assert_frame_equal(result, expected, check_exact=False, rtol=1e-5, atol=1e-3)
+    assert np.isnan(result.loc[7, ("f64", "mean")]) and result.loc[7, ("f64", "sum")] == 0
+
+
+@pytest.mark.parametrize("spec", [{"i32": "count"}, {"i32": "sum", "f64": "max"}])
+def test_flat_spec_keeps_flat_columns(spec):
+    df = make_frame(n=300)
+    pd.testing.assert_frame_equal(group_agg(df, "key", spec, engine="numpy"), df.groupby("key").agg(spec))
+
+
+def test_empty_frame_and_unknown_function():
+    empty = make_frame().iloc[:0]
+    assert group_agg(empty, "key", {"f64": ["sum"]}, engine="numpy").empty
+    with pytest.raises(ValueError):
+        group_agg(make_frame(n=50), "key", {"f64": ["median"]}, engine="numpy")
+
+
+def test_merged_state_finalizes_to_group_agg():
+    """Estados de fatias (com chaves repetidas entre fatias) combinados == agregação do todo."""
+    df = make_frame()
+    chunks = [aggregate_state(df.iloc[i:i + 2000], "key", SPEC) for i in range(0, len(df), 2000)]
+    state = merge_state([c[0] for c in chunks], "key")
+    pairs = {column: merge_pairs([c[1][column] for c in chunks], "key") for column in chunks[0][1]}
+
+    result = finalize_state(state, pairs, "key", SPEC, chunks[0][2])
+    expected = group_agg(df, "key", SPEC, engine="numpy")
+    pd.testing.assert_frame_equal(result, expected, check_exact=False, rtol=1e-9)
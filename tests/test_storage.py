@@ -0,0 +1,112 @@
+"""Testes da leitura compartilhada das camadas (projeção, filtros e datasets particionados)."""
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from src import storage
+
+
+def write_sample(path):
+    df = pd.DataFrame({
+        "sk_id_curr": range(1000),
+        "months_balance": [-(i % 24) for i in range(1000)],
+        "texto": [f"linha {i}" for i in range(1000)],
+    })
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), path, row_group_size=250)
+    return df
+
+
+def test_read_parquet_projects_columns_and_pushes_filters(tmp_path):
+    path = str(tmp_path / "t.parquet")
+    df = write_sample(path)
+
+    back = storage.read_parquet(path, columns=["sk_id_curr"], filters=[("sk_id_curr", ">=", 900)])
+
+    assert list(back.columns) == ["sk_id_curr"]
+    pd.testing.assert_frame_equal(back.reset_index(drop=True),
+                                  df.loc[df.sk_id_curr >= 900, ["sk_id_curr"]].reset_index(drop=True))
+
+
+def test_projected_bytes_counts_only_needed_chunks(tmp_path):
+    path = str(tmp_path / "t.parquet")
+    write_sample(path)
+
+    everything = storage.projected_bytes(path)
+    one_column = storage.projected_bytes(path, columns=["sk_id_curr"])
+    one_row_group = storage.projected_bytes(path, columns=["sk_id_curr"], filters=[("sk_id_curr", "<", 100)])
+
+    assert one_column < everything
+    assert 0 < one_row_group < one_column / 2
+    assert storage.available_columns(path) == ["sk_id_curr", "months_balance", "texto"]
+
+
+def test_partitioned_dataset_prunes_and_replaces_atomically(tmp_path):
+    rng = np.random.default_rng(5)
+    df = pd.DataFrame({
+        "sk_id_curr": rng.permutation(2000),
+        "name_education_type": pd.Categorical(rng.choice(["Higher education", "Secondary / secondary special"], 2000)),
+        "code_gender": pd.Categorical(rng.choice(["F", "M"], 2000)),
+        "target": rng.integers(0, 2, 2000),
+    })
+    path = str(tmp_path / "obt")
+    storage.write_partitioned_atomic(df, path, ["code_gender"], sort_by=["sk_id_curr"], row_group_size=200)
+    assert os.path.exists(os.path.join(path, "_metadata"))
+
+    filters = [("code_gender", "==", "F"), ("sk_id_curr", "<", 300)]
+    back = storage.read_dataset(path, filters=filters)
+    expected = df[(df.code_gender == "F") & (df.sk_id_curr < 300)]
+    assert sorted(back.sk_id_curr) == sorted(expected.sk_id_curr)
+    assert back.sk_id_curr.is_monotonic_increasing
+
+    dataset = storage.open_dataset(path)
+    expression = pq.filters_to_expression(filters)
+    kept = [rg for f in dataset.get_fragments(filter=expression) for rg in f.split_by_row_group(filter=expression, schema=dataset.schema)]
+    # Só a partição F (~5 row groups de 200 linhas) e só os row groups com sk_id_curr < 300
+    assert all("code_gender=F" in rg.path for rg in kept)
+    assert 1 <= len(kept) < 3
+
+    # Reescrita substitui o dataset inteiro, sem sobras de .tmp/.old
+    storage.write_partitioned_atomic(df.head(10), path, ["code_gender"])
+    assert len(storage.read_dataset(path)) == 10
+    assert sorted(os.listdir(tmp_path)) == ["obt"]
+
+
+def test_write_options_layer_and_overrides(monkeypatch):
+    monkeypatch.setitem(storage.PARQUET_WRITE_OPTIONS, "gold", "codec=zstd level=7 sort_by=b,a statistics=0")
+    options = storage.write_options("gold", level=None, row_group_size=100)
+    assert options["codec"] == "zstd" and options["level"] == 7 and options["row_group_size"] == 100
+    assert options["sort_by"] == ["b", "a"] and options["statistics"] is False and options["dictionary"]
+    assert storage.write_options("bronze") == storage.DEFAULT_WRITE_OPTIONS
+    with pytest.raises(ValueError, match="Codec"):
+        storage.parse_write_options("codec=xz")
+    with pytest.raises(ValueError, match="inválida"):
+        storage.parse_write_options("compressao=zstd")
+
+
+def test_write_parquet_applies_options_atomically(tmp_path):
+    path = str(tmp_path / "t.parquet")
+    df = pd.DataFrame({"k": np.arange(1000)[::-1], "v": np.arange(1000) % 7})
+
+    storage.write_parquet(df, path, codec="zstd", level=3, row_group_size=300, sort_by=["k"])
+    metadata = pq.read_metadata(path)
+    assert metadata.num_row_groups == 4
+    assert metadata.row_group(0).column(0).compression == "ZSTD"
+    assert pd.read_parquet(path)["k"].is_monotonic_increasing
+
+    # Erro na escrita: exceção propagada, destino anterior intacto e sem .tmp
+    with pytest.raises(Exception):
+        storage.write_parquet(pd.DataFrame({"x": [object()]}), path)
+    assert not os.path.exists(path + ".tmp") and pq.read_metadata(path).num_rows == 1000
+
+
+def test_write_parquet_batches_streams_row_groups(tmp_path):
+    path = str(tmp_path / "t.parquet")
+    frames = [pd.DataFrame({"a": [i, i + 1]}) for i in range(3)]
+    assert storage.write_parquet_batches(iter(frames), path, codec="lz4") == (6, 1)
+    assert pq.read_metadata(path).num_row_groups == 3
+    with pytest.raises(ValueError, match="Nenhum lote"):
+        storage.write_parquet_batches(iter([]), str(tmp_path / "vazio.parquet"))
@@ -0,0 +1,58 @@
+"""Testes do gerador de dados sintéticos (src/synthetic_data.py)."""
+import importlib
+import os
+
+import pandas as pd
+import pytest
+
+from src import schemas
+from src.synthetic_data import DAYS_SENTINEL, generate
+
+ingestion = importlib.import_module("src.01_ingestion")
+
+
+@pytest.fixture(scope="module")
+def raw_dir(tmp_path_factory):
+    out = str(tmp_path_factory.mktemp("raw"))
+    generate(out, scale=0.003, seed=7, chunk_clients=400)  # vários blocos
+    return out
+
+
+def read(raw_dir, name):
+    df = pd.read_csv(os.path.join(raw_dir, name))
+    df.columns = df.columns.str.lower()
+    return df
+
+
+def test_generates_all_files_with_registered_types(raw_dir):
+    """Todos os arquivos de files_to_ingest, com as colunas do registro e tipos que passam no cast."""
+    for file_name in ingestion.files_to_ingest:
+        assert read(raw_dir, file_name).columns.tolist() == list(schemas.get_schema(file_name))
+        path = os.path.join(raw_dir, file_name)
+        for table in ingestion.iter_typed_batches(path, file_name, 5000):
+            for name, dtype in schemas.get_schema(file_name).items():
+                assert table.schema.field(name).type == dtype
+
+
+def test_keys_nulls_and_sentinel(raw_dir):
+    train = read(raw_dir, "application_train.csv")
+    test = read(raw_dir, "application_test.csv")
+    bureau = read(raw_dir, "bureau.csv")
+    balance = read(raw_dir, "bureau_balance.csv")
+    prev = read(raw_dir, "previous_application.csv")
+    installments = read(raw_dir, "installments_payments.csv")
+
+    clients = set(train["sk_id_curr"]) | set(test["sk_id_curr"])
+    assert len(clients) == len(train) + len(test)
+    assert set(bureau["sk_id_curr"]) <= clients
+    assert bureau["sk_id_bureau"].is_unique and set(balance["sk_id_bureau"]) <= set(bureau["sk_id_bureau"])
+    assert set(prev["sk_id_curr"]) <= clients and prev["sk_id_prev"].is_unique
+    # Filhos de previous herdam o cliente do pedido
+    merged = installments.merge(prev[["sk_id_prev", "sk_id_curr"]], on="sk_id_prev", suffixes=("", "_prev"))
+    assert len(merged) == len(installments) and (merged["sk_id_curr"] == merged["sk_id_curr_prev"]).all()
+
+    assert 3 < len(bureau) / len(clients) < 7
+    assert 0.4 < train["ext_source_1"].isna().mean() < 0.7
+    assert (train["days_employed"] == DAYS_SENTINEL).mean() > 0.1
+    assert (prev["days_first_drawing"] == DAYS_SENTINEL).any()
+    assert 0.03 < train["target"].mean() < 0.15